@@ -1,12 +1,41 @@
 # adk.py - Agent Development Kit
-from typing import Any, Dict
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
 
+from utils.serialization import dumps, loads
+
+@dataclass(slots=True, eq=False)
 class Message:
-    """Message object for agent communication."""
-    def __init__(self, sender: str, receiver: str, content: Dict[str, Any]):
-        self.sender = sender
-        self.receiver = receiver
-        self.content = content
+    """
+    Message object for agent communication.
+
+    Slotted, so a message is three pointers rather than an instance dict.
+    ``content`` is passed by reference from stage to stage and never copied:
+    a dict payload (see agents/schemas.py for the pipeline's), or for the
+    first stage the raw log itself, including bytes, memoryview or mmap
+    buffers that diagnostics searches without decoding. Messages compare
+    by identity.
+    """
+    sender: str
+    receiver: str
+    content: Any
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize for another process (compact JSON, via orjson when installed).
+
+        Byte payloads are written as text, so a raw log should stay behind
+        (as a file path or shared mapping) and only stage results travel.
+        """
+        return dumps((self.sender, self.receiver, self.content))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Message":
+        """Rebuild a message written by to_bytes."""
+        sender, receiver, content = loads(data)
+        return cls(sender, receiver, content)
 
 class Agent:
     """Base agent class."""
@@ -15,4 +44,258 @@ class Agent:
     
     def process(self, message: Message) -> Message:
         """Process incoming message and return response."""
-        raise NotImplementedError("Subclasses must implement process method")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement process method")
+
+    async def aprocess(self, message: Message) -> Message:
+        """
+        Async variant of process.
+
+        The default runs process in a worker thread so blocking agents do not
+        stall the event loop; I/O-bound agents override it with native awaits.
+        Threads cannot be interrupted: when such a call times out or is
+        cancelled, only the awaiting task stops and process keeps running in
+        its thread until it returns.
+        """
+        return await asyncio.to_thread(self.process, message)
+
+class OrchestrationError(Exception):
+    """Raised when agents fail, time out or are cancelled during orchestration."""
+    def __init__(self, errors: Dict[str, BaseException], results: Dict[str, Message]):
+        details = ", ".join(f"{name} ({type(e).__name__}: {e})" for name, e in errors.items())
+        super().__init__(f"Orchestration failed: {details}")
+        self.errors = errors
+        self.results = results
+
+class AgentDependencySkipped(Exception):
+    """Recorded for agents that never ran because a dependency failed."""
+
+def _merge_contents(messages: Iterable[Message]) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {}
+    for message in messages:
+        if isinstance(message.content, dict):
+            merged.update(message.content)
+    return merged
+
+@dataclass(slots=True, eq=False)
+class _Run:
+    """State of one orchestration run: its loop, agent tasks and cancel flag."""
+    loop: asyncio.AbstractEventLoop
+    tasks: List[asyncio.Task] = field(default_factory=list)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        if not self.loop.is_closed():
+            for task in list(self.tasks):
+                self.loop.call_soon_threadsafe(task.cancel)
+
+class AgentOrchestrator:
+    """
+    Runs a set of agents in one of two modes.
+
+    Routing mode (no ``dependencies``): the initial message is delivered to
+    the agent whose name or class name matches ``Message.receiver`` and each
+    reply is routed the same way until it addresses an unknown receiver.
+
+    Graph mode: ``dependencies`` maps an agent name to the names it depends
+    on. Agents whose dependencies are satisfied run concurrently on the event
+    loop (blocking agents in worker threads via ``Agent.aprocess``). An agent
+    with one dependency receives that dependency's output; one with several
+    receives their dict contents merged; one with none receives the initial
+    message.
+
+    In both modes ``timeouts`` (per agent name) or ``default_timeout`` bound
+    each agent in seconds, and ``cancel()`` stops the runs in progress. Runs
+    may overlap (e.g. one per request on a shared orchestrator); each keeps
+    its own tasks and cancel flag. A timeout or cancel stops the awaiting
+    task, but an agent running in a worker thread (the default
+    ``Agent.aprocess``) carries on in that thread until process returns.
+    """
+    def __init__(
+        self,
+        agents: List[Agent],
+        dependencies: Optional[Dict[str, Iterable[str]]] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: Optional[float] = None,
+        max_hops: int = 32,
+    ):
+        self.agents: Dict[str, Agent] = {agent.name: agent for agent in agents}
+        self._receivers: Dict[str, Agent] = {type(agent).__name__: agent for agent in agents}
+        self._receivers.update(self.agents)
+        self.dependencies = {name: list(deps) for name, deps in (dependencies or {}).items()}
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.max_hops = max_hops
+        self._lock = threading.Lock()
+        self._runs: List[_Run] = []
+        self._cancel_next = False
+        self._validate_graph()
+
+    def _validate_graph(self) -> None:
+        for name, deps in self.dependencies.items():
+            for dep in [name, *deps]:
+                if dep not in self.agents:
+                    raise ValueError(f"Unknown agent in dependency graph: {dep}")
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at agent: {name}")
+            visiting.add(name)
+            for dep in self.dependencies.get(name, []):
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.agents:
+            visit(name)
+
+    def cancel(self) -> None:
+        """
+        Cancel every run in progress; safe to call from any thread.
+
+        Called while no run is in progress, it cancels the next run instead
+        of being lost.
+        """
+        with self._lock:
+            runs = list(self._runs)
+            if not runs:
+                self._cancel_next = True
+        for run in runs:
+            run.cancel()
+
+    async def _run_agent(self, agent: Agent, message: Message) -> Message:
+        timeout = self.timeouts.get(agent.name, self.default_timeout)
+        return await asyncio.wait_for(agent.aprocess(message), timeout)
+
+    @staticmethod
+    def _track(run: _Run, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        run.tasks.append(task)
+        # Checked after appending, so a concurrent cancel() sees the task or we see its flag
+        if run.cancelled.is_set():
+            task.cancel()
+        return task
+
+    async def astart(self, message: Message) -> Message:
+        """
+        Run the orchestration and return the final message.
+
+        The final message comes from the last agent (routing mode) or from the
+        orchestrator (graph mode); its content merges the dict outputs of every
+        agent that ran, so callers see e.g. ``failed_tests`` and ``plan`` together.
+        """
+        if self.dependencies:
+            results = await self.arun_graph(message)
+            return Message(
+                sender=self.__class__.__name__,
+                receiver=message.sender,
+                content=_merge_contents(results.values())
+            )
+        return await self.aroute(message)
+
+    async def aroute(self, message: Message) -> Message:
+        """Follow Message.receiver from agent to agent until no agent matches."""
+        run = self._begin_run()
+        history: List[Message] = []
+        try:
+            for _ in range(self.max_hops):
+                agent = self._receivers.get(message.receiver)
+                if agent is None:
+                    break
+                try:
+                    message = await self._track(run, self._run_agent(agent, message))
+                except asyncio.CancelledError as e:
+                    if not run.cancelled.is_set():
+                        raise
+                    raise OrchestrationError({agent.name: e}, {m.sender: m for m in history}) from e
+                except Exception as e:
+                    raise OrchestrationError({agent.name: e}, {m.sender: m for m in history}) from e
+                history.append(message)
+            else:
+                error = RuntimeError(f"exceeded {self.max_hops} hops")
+                raise OrchestrationError({message.receiver: error}, {m.sender: m for m in history})
+        finally:
+            self._end_run(run)
+        if not history:
+            return message
+        return Message(message.sender, message.receiver, _merge_contents(history))
+
+    async def arun_graph(self, message: Message) -> Dict[str, Message]:
+        """
+        Run every agent over the dependency graph and return outputs by agent name.
+
+        Raises
+        ------
+        OrchestrationError
+            If any agent failed, timed out or was cancelled; agents depending
+            on it are skipped. Completed outputs are available on the error.
+        """
+        run = self._begin_run()
+        pending = {name: set(self.dependencies.get(name, [])) for name in self.agents}
+        results: Dict[str, Message] = {}
+        errors: Dict[str, BaseException] = {}
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready() -> None:
+            for name in list(pending):
+                deps = pending[name]
+                failed = [dep for dep in deps if dep in errors]
+                if failed or run.cancelled.is_set():
+                    reason = f"dependency {failed[0]} failed" if failed else "orchestration cancelled"
+                    errors[name] = AgentDependencySkipped(reason)
+                    del pending[name]
+                elif deps <= results.keys():
+                    del pending[name]
+                    inputs = [results[dep] for dep in self.dependencies.get(name, [])]
+                    if not inputs:
+                        agent_input = message
+                    elif len(inputs) == 1:
+                        agent_input = inputs[0]
+                    else:
+                        agent_input = Message(",".join(m.sender for m in inputs), name, _merge_contents(inputs))
+                    running[self._track(run, self._run_agent(self.agents[name], agent_input))] = name
+
+        try:
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    if task.cancelled():
+                        errors[name] = asyncio.CancelledError("agent cancelled")
+                    elif task.exception() is not None:
+                        errors[name] = task.exception()
+                    else:
+                        results[name] = task.result()
+                launch_ready()
+        finally:
+            for task in running:
+                task.cancel()
+            self._end_run(run)
+        if errors:
+            raise OrchestrationError(errors, results)
+        return results
+
+    def _begin_run(self) -> _Run:
+        run = _Run(asyncio.get_running_loop())
+        with self._lock:
+            if self._cancel_next:
+                self._cancel_next = False
+                run.cancelled.set()
+            self._runs.append(run)
+        return run
+
+    def _end_run(self, run: _Run) -> None:
+        with self._lock:
+            self._runs.remove(run)
+
+    def start(self, message: Message) -> Message:
+        """Synchronous wrapper around astart for callers without an event loop."""
+        return asyncio.run(self.astart(message))
+
+    def run_graph(self, message: Message) -> Dict[str, Message]:
+        """Synchronous wrapper around arun_graph."""
+        return asyncio.run(self.arun_graph(message))
@@ -1,29 +1,44 @@
 # agents/action_planner_agent.py
 from adk import Agent, Message
-from tools.jira_tool import create_jira_ticket
-from typing import Any
+from agents.schemas import ActionResult
+from tools.ticket_manager import TicketManager, get_ticket_manager
+from typing import Any, Optional
+from utils.fingerprint import fingerprint, normalize_failure
 from utils.logger import get_logger
 class ActionPlannerAgent(Agent):
     """
     Agent that proposes fixes or creates JIRA tickets based on root cause analysis.
 
+    Tickets go through a TicketManager: one per failure signature, with
+    repeats added as comments, created in the background so the agent does
+    not wait on the tracker. Runs without failed tests are not ticketed.
+
     Methods
     -------
     process(message: Message) -> Message
-        Proposes remediation and creates JIRA ticket.
+        Proposes remediation and queues a JIRA ticket or comment.
     """
-    def __init__(self, name: str):
+    def __init__(self, name: str, ticket_manager: Optional[TicketManager] = None):
         super().__init__(name)
         self.logger = get_logger(self.__class__.__name__)
+        self.tickets = ticket_manager or get_ticket_manager()
 
     def process(self, message: Message) -> Message:
         analysis: Any = message.content["analysis"]
-        remediation_plan: str = "Recommended Action: restart failing jobs, or fix test modules."
-        ticket_url: str = create_jira_ticket(summary="QA Failure", description=analysis)
-        self.logger.info(f"Remediation plan: {remediation_plan}, Ticket: {ticket_url}")
+        failed_tests = message.content.get("failed_tests") or []
+        signature: str = message.content.get("signature") or fingerprint(str(analysis))
+        if not failed_tests:
+            # A clean run has nothing to track
+            result: ActionResult = {"plan": "No action needed: no failed tests.", "ticket": "", "ticket_status": "skipped"}
+        else:
+            summary = f"QA Failure: {normalize_failure(failed_tests[0])[:120]}"
+            remediation_plan: str = "Recommended Action: restart failing jobs, or fix test modules."
+            ticket = self.tickets.submit(signature, summary, str(analysis))
+            self.logger.info("Remediation plan: %s, Ticket: %s %s", remediation_plan, ticket['status'], ticket['url'])
+            result = {"plan": remediation_plan, "ticket": ticket["url"], "ticket_status": ticket["status"]}
         return Message(
             sender=self.name,
             receiver="LoggerAgent",
-            content={"plan": remediation_plan, "ticket": ticket_url}
+            content=result
         )
-# End of agents/action_planner_agent.py
\ No newline at end of file
+# End of agents/action_planner_agent.py
@@ -1,32 +1,211 @@
 
 from adk import Agent, Message
-from typing import Dict
+from agents.schemas import AnalysisResult
+from typing import Any, Dict, Generator, List, Optional, Tuple
 from utils.logger import get_logger
-from utils.llm_factory import run_llm
+from utils.config import (
+    RCA_CLASSIFIER_THRESHOLD, RCA_INDEX_MIN_SIMILARITY, RCA_INDEX_NPROBE, RCA_INDEX_REUSE_SIMILARITY,
+    RCA_INDEX_TOP_K, RCA_PROMPT_MAX_TOKENS,
+)
+from utils.fingerprint import failure_signature
+from utils.llm_factory import arun_llm, run_llm, run_llm_stream
+from utils.prompt_builder import build_rca_prompt
 import os
+import threading
 from opentelemetry import trace
 tracer = trace.get_tracer("RootCauseAnalyzerAgent")
 class RootCauseAnalyzerAgent(Agent):
     """
     Agent that uses LiteLLM to summarize root causes of test failures.
+
+    When a local failure classifier has been trained (see train.py), known
+    failures it labels with at least ``confidence_threshold`` probability
+    are answered with the label's stored analysis, without an LLM call.
+
+    Every LLM analysis is also added to a similar-incident index. Later
+    failures reuse the analysis of a past one at least ``reuse_similarity``
+    alike, and otherwise get up to ``top_k`` past incidents at least
+    ``min_similarity`` alike in their prompt.
     """
-    def __init__(self, name: str) -> None:
+    _UNSET = object()
+
+    def __init__(
+        self,
+        name: str,
+        max_prompt_tokens: int = RCA_PROMPT_MAX_TOKENS,
+        classifier=_UNSET,
+        confidence_threshold: float = RCA_CLASSIFIER_THRESHOLD,
+        similar_index=_UNSET,
+        top_k: int = RCA_INDEX_TOP_K,
+        min_similarity: float = RCA_INDEX_MIN_SIMILARITY,
+        reuse_similarity: float = RCA_INDEX_REUSE_SIMILARITY,
+        nprobe: int = RCA_INDEX_NPROBE,
+    ) -> None:
         super().__init__(name)
         self.logger = get_logger(self.__class__.__name__)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.confidence_threshold = confidence_threshold
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.reuse_similarity = reuse_similarity
+        self.nprobe = nprobe
+        self._classifier = classifier
+        self._similar_index = similar_index
+        self._index_lock = threading.Lock()
 
-    def process(self, message: Message) -> Message:
-        failed_tests = message.content["failed_tests"]
-        prompt = f"Summarize root causes from logs: {failed_tests}"
+    @property
+    def classifier(self):
+        # Loaded on first use: the model (and NumPy) stay off the import path.
+        if self._classifier is self._UNSET:
+            from utils.failure_classifier import get_failure_classifier
+            self._classifier = get_failure_classifier()
+        return self._classifier
+
+    @property
+    def similar_index(self):
+        # Owned by the agent (one per predictor), created on first use
+        if self._similar_index is self._UNSET:
+            with self._index_lock:
+                if self._similar_index is self._UNSET:
+                    from utils.vector_index import load_incident_index
+                    self._similar_index = load_incident_index()
+        return self._similar_index
+
+    def _classify(self, text: str) -> Tuple[Optional[str], Optional[float]]:
+        """Return the classifier's (category, confidence), or (None, None) without a model."""
+        if self.classifier is None:
+            return None, None
+        category, confidence = self.classifier.predict(text)
+        return category, round(confidence, 4)
+
+    def _similar(self, text: str) -> List[Dict[str, Any]]:
+        """Return past incidents alike enough to help, best first, including earlier runs of this very failure."""
+        if self.similar_index is None or not text:
+            return []
+        neighbours = self.similar_index.search(text, self.top_k + 1, self.nprobe)
+        return [n for n in neighbours if n["similarity"] >= self.min_similarity]
+
+    def _triage(self, content: Dict) -> Tuple[Optional[Message], Dict[str, Any]]:
+        """
+        Check the local fast paths before the LLM.
+
+        Returns (message, context): message is set when the LLM can be
+        skipped; context carries the failure text, category, confidence and
+        similar incidents for the prompt and the response.
+        """
+        from utils.failure_classifier import failure_text
+        text = failure_text(content)
+        category, confidence = self._classify(text)
+        neighbours = self._similar(text)
+        signature = failure_signature(content["failed_tests"])
+        # An earlier run of the same failure may be reused, but telling the
+        # LLM about it as a "similar incident" would only repeat the failure.
+        context = {"text": text, "category": category, "confidence": confidence,
+                   "similar": [n for n in neighbours if n["signature"] != signature][:self.top_k]}
+        if confidence is not None and confidence >= self.confidence_threshold and category in self.classifier.analyses:
+            return self._respond(self.classifier.analyses[category], content, context, "classifier"), context
+        if neighbours and neighbours[0]["similarity"] >= self.reuse_similarity:
+            context = dict(context, similar=neighbours[:self.top_k])
+            return self._respond(neighbours[0]["analysis"], content, context, "similar"), context
+        return None, context
+
+    def _prompt(self, content: Dict, context: Dict[str, Any]) -> str:
+        # Normalized, de-duplicated lines keep the prompt (and so the LLM
+        # cache key) stable across runs that differ only in timestamps etc.
+        failures = content.get("failures") or [{"line": line} for line in content["failed_tests"]]
+        log_tail = content.get("log_tail", "").split("\n")
+        return build_rca_prompt(failures, log_tail, max_tokens=self.max_prompt_tokens,
+                                similar_incidents=context["similar"])
+
+    def _respond(self, analysis_text: str, content: Dict, context: Dict[str, Any], source: str = "llm") -> Message:
+        self.logger.info("Analysis completed (%s): %.100s...", source, analysis_text)
+        failed_tests = content["failed_tests"]
+        signature = failure_signature(failed_tests)
+        if source == "llm" and failed_tests and self.similar_index is not None:
+            self.similar_index.add(signature, context["text"], analysis_text)
+        # The signature lets the action planner deduplicate tickets
+        result: AnalysisResult = {
+            "analysis": analysis_text,
+            "failed_tests": failed_tests,
+            "signature": signature,
+            "category": context["category"],
+            "confidence": context["confidence"],
+            "analysis_source": source,
+            "similar_incidents": [
+                {"signature": n["signature"], "similarity": n["similarity"]} for n in context["similar"]
+            ],
+        }
+        return Message(sender=self.name, receiver="ActionPlannerAgent", content=result)
+
+    def _prepare(self, content: Dict) -> Tuple[Optional[Message], Dict[str, Any], str, str]:
+        """
+        Steps shared by every entry point before the LLM call.
+
+        Returns (known, context, prompt, model): ``known`` is the finished
+        message when a fast path answered, and then no prompt is built.
+        """
+        known, context = self._triage(content)
+        if known is not None:
+            return known, context, "", ""
         model = os.getenv("LLM_MODEL", "gemini/gemini-2.5-flash-lite")
+        return None, context, self._prompt(content, context), model
+
+    def _fallback(self, content: Dict, error: Exception) -> str:
+        """Log an LLM failure and return the analysis used instead."""
+        self.logger.error("LLM error: %s", error)
+        return f"Fallback analysis due to error: {content['failed_tests']}"
+
+    def process(self, message: Message) -> Message:
+        known, context, prompt, model = self._prepare(message.content)
+        if known is not None:
+            return known
         with tracer.start_as_current_span("llm_root_cause_analysis"):
             try:
-                analysis_text = run_llm(prompt, model)
+                analysis_text, source = run_llm(prompt, model), "llm"
             except Exception as e:
-                self.logger.error(f"LLM error: {e}")
-                analysis_text = f"Fallback analysis due to error: {failed_tests}"
-        self.logger.info(f"Analysis completed: {analysis_text[:100]}...")
-        return Message(
-            sender=self.name,
-            receiver="ActionPlannerAgent",
-            content={"analysis": analysis_text}
-        )
+                analysis_text, source = self._fallback(message.content, e), "fallback"
+        return self._respond(analysis_text, message.content, context, source)
+
+    async def aprocess(self, message: Message) -> Message:
+        known, context, prompt, model = self._prepare(message.content)
+        if known is not None:
+            return known
+        with tracer.start_as_current_span("llm_root_cause_analysis"):
+            try:
+                analysis_text, source = await arun_llm(prompt, model), "llm"
+            except Exception as e:
+                analysis_text, source = self._fallback(message.content, e), "fallback"
+        return self._respond(analysis_text, message.content, context, source)
+
+    def stream(self, message: Message) -> Generator[str, None, Message]:
+        """
+        Streaming variant of process.
+
+        Yields the analysis text as the LLM produces it and returns the same
+        Message as process (use ``result = yield from agent.stream(msg)``).
+        If the LLM fails before producing text, the fallback analysis is
+        yielded instead; if it fails part-way, the partial text is kept.
+        """
+        known, context, prompt, model = self._prepare(message.content)
+        if known is not None:
+            yield known.content["analysis"]
+            return known
+        chunks = []
+        source = "llm"
+        span = tracer.start_span("llm_root_cause_analysis")
+        try:
+            for chunk in run_llm_stream(prompt, model):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            if not chunks:
+                chunks.append(self._fallback(message.content, e))
+                source = "fallback"
+                yield chunks[0]
+            else:
+                self.logger.error("LLM error: %s", e)
+                # Incomplete, so not worth reusing for similar failures
+                source = "partial"
+        finally:
+            span.end()
+        return self._respond("".join(chunks), message.content, context, source)
@@ -0,0 +1,63 @@
+"""
+Payload schemas for the messages passed between pipeline agents.
+
+These are ``TypedDict`` types: the payloads stay plain dicts (so agents,
+``AgentOrchestrator`` merging and JSON transport are unchanged) and the
+schemas cost nothing at runtime. They document, and let type checkers
+verify, what each stage reads and writes.
+
+Stage inputs and outputs:
+
+- ``TestDiagnosticsAgent``: ``LogPayload`` -> ``DiagnosticsResult``
+- ``RootCauseAnalyzerAgent``: ``DiagnosticsResult`` -> ``AnalysisResult``
+- ``ActionPlannerAgent``: ``AnalysisResult`` -> ``ActionResult``
+"""
+
+from typing import List, NotRequired, Optional, TypedDict
+
+from utils.log_stream import LogSource
+
+# Raw log handed to diagnostics. Byte buffers (bytes, bytearray, memoryview,
+# mmap) are searched in place; only the failing lines are decoded.
+LogPayload = LogSource
+
+
+class FailureRecord(TypedDict):
+    """One failing log line, as found by :class:`utils.failure_matcher.FailureMatcher`."""
+    line_number: int
+    line: str
+    test_id: Optional[str]
+    severity: str
+    category: str
+    rule: str
+    signature: str
+    frames: NotRequired[List[str]]
+
+
+class DiagnosticsResult(TypedDict):
+    failed_tests: List[str]
+    failures: List[FailureRecord]
+    log_tail: str
+
+
+class SimilarIncident(TypedDict):
+    signature: str
+    similarity: float
+
+
+class AnalysisResult(TypedDict):
+    analysis: str
+    # The same list object as DiagnosticsResult["failed_tests"], not a copy
+    failed_tests: List[str]
+    signature: str
+    category: Optional[str]
+    confidence: Optional[float]
+    analysis_source: str
+    similar_incidents: List[SimilarIncident]
+
+
+class ActionResult(TypedDict):
+    plan: str
+    ticket: str
+    # queued, commented, or skipped when there were no failed tests
+    ticket_status: str
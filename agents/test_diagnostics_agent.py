@@ -1,25 +1,207 @@
+import mmap
+import os
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from adk import Agent, Message
+from agents.schemas import DiagnosticsResult, FailureRecord
+from utils.config import DIAGNOSTICS_PARALLEL_MIN_BYTES, DIAGNOSTICS_PROCESSES, RCA_TAIL_LINES
+from utils.failure_matcher import FailureMatcher, FailureRule, count_newlines, find_stack_frames
+from utils.fingerprint import fingerprint
 from utils.logger import get_logger
+from utils.log_stream import LogSource, as_byte_buffer, iter_log_blocks, open_log, split_line_ranges
+from utils.memory_handler import get_context_window
+from utils.process_pool import get_process_pool
+
+# Shards per worker process, so a shard dense with failures doesn't leave
+# the other workers idle at the end
+SHARDS_PER_PROCESS = 4
+
+_shard_matchers: Dict[Tuple[FailureRule, ...], FailureMatcher] = {}
+
+def _scan_shard(path: str, start: int, end: int, rules: Tuple[FailureRule, ...], frame_window: int):
+    """
+    Process-pool worker: scan bytes ``[start, end)`` of a log file in place.
+
+    The file is memory-mapped here, so workers share the page cache and only
+    offsets and the (small) results cross the process boundary. Line numbers
+    are relative to the shard, whose first line is 1. Only stack frames that
+    could be attached to a failure are returned: those near a failure in this
+    shard and those in the first ``frame_window`` lines, which may belong to
+    a failure at the end of the previous shard.
+
+    Returns
+    -------
+    tuple
+        ``(newline count, failure records, (line number, frame) pairs)``
+    """
+    matcher = _shard_matchers.get(rules)
+    if matcher is None:
+        matcher = _shard_matchers[rules] = FailureMatcher(rules)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        failures = []
+        for match in matcher.scan_buffer(buffer, start=start, end=end):
+            record = match.to_dict()
+            record["signature"] = fingerprint(match.line)
+            failures.append(record)
+        starts = [record["line_number"] for record in failures]
+        frames = []
+        for line_number, frame in find_stack_frames(buffer, start=start, end=end):
+            index = bisect_right(starts, line_number) - 1
+            if line_number <= frame_window or (index >= 0 and line_number - starts[index] <= frame_window):
+                frames.append((line_number, frame))
+        return count_newlines(buffer, start, end), failures, frames
 
 class TestDiagnosticsAgent(Agent):
     __test__ = False
     """
     Agent that parses CI logs to identify failed tests.
+
+    Plain log files of at least ``parallel_min_bytes`` passed as a path are
+    split into line-aligned shards scanned by ``processes`` worker processes
+    (see :meth:`process_file`).
     """
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        matcher: Optional[FailureMatcher] = None,
+        tail_lines: int = RCA_TAIL_LINES,
+        frame_window: int = 50,
+        frames_per_failure: int = 12,
+        processes: int = DIAGNOSTICS_PROCESSES,
+        parallel_min_bytes: int = DIAGNOSTICS_PARALLEL_MIN_BYTES,
+    ):
         super().__init__(name)
         self.logger = get_logger(self.__class__.__name__)
+        self.matcher = matcher or FailureMatcher()
+        self.tail_lines = tail_lines
+        self.frame_window = frame_window
+        self.frames_per_failure = frames_per_failure
+        self.processes = processes
+        self.parallel_min_bytes = parallel_min_bytes
+
+    def stream(self, logs: LogSource) -> Iterator[Dict[str, Any]]:
+        """
+        Yield failed-test records incrementally with bounded memory.
+
+        ``logs`` may be a string, a file object, an iterable of chunks such
+        as a chunked HTTP request body, or a byte buffer (bytes, bytearray,
+        memoryview, or a memory-mapped file from
+        :func:`utils.log_stream.open_log`), which is searched in place.
+        Each record carries the line number, line, test id, severity,
+        category, matching rule and the stable failure signature.
+        """
+        buffer = as_byte_buffer(logs)
+        if buffer is not None:
+            matches = self.matcher.scan_buffer(buffer)
+        else:
+            matches = self.matcher.scan_blocks(iter_log_blocks(logs))
+        for match in matches:
+            record = match.to_dict()
+            record["signature"] = fingerprint(match.line)
+            yield record
+
+    def _attach_frames(self, frames, failures: List[Dict[str, Any]], starts: List[int]) -> None:
+        """Attach ``(line_number, frame)`` pairs to the nearest preceding failure within ``frame_window`` lines."""
+        for line_number, frame in frames:
+            index = bisect_right(starts, line_number) - 1
+            if index < 0 or line_number - starts[index] > self.frame_window:
+                continue
+            attached = failures[index].setdefault("frames", [])
+            if len(attached) < self.frames_per_failure:
+                attached.append(frame)
 
     def process(self, message: Message) -> Message:
         """
         Parse logs and extract failed tests.
+
+        Besides the failure records, the result carries the stack frames that
+        follow each failure and the tail of the log, for the root-cause prompt.
+        Byte payloads are scanned in place and never decoded as a whole; a
+        path (``os.PathLike``) is read with :meth:`process_file`.
         """
         logs = message.content
-        failed_tests = [line for line in logs.split("\n") if "FAIL" in line]
-        self.logger.info(f"Extracted failed tests: {failed_tests}")
+        if isinstance(logs, os.PathLike):
+            return self.process_file(logs)
+        buffer = as_byte_buffer(logs)
+        if buffer is not None:
+            return self._process_buffer(buffer)
+        failures: List[Dict[str, Any]] = []
+        starts: List[int] = []
+        recent = deque(maxlen=2)
+
+        def blocks():
+            first_line = 1
+            for block in iter_log_blocks(logs):
+                yield block
+                # Resumed once the matcher has consumed the block, so its
+                # failures are already recorded.
+                recent.append(block)
+                if starts and starts[-1] >= first_line - self.frame_window:
+                    self._attach_frames(find_stack_frames(block, first_line), failures, starts)
+                first_line += block.count("\n")
+
+        for match in self.matcher.scan_blocks(blocks()):
+            record = match.to_dict()
+            record["signature"] = fingerprint(match.line)
+            failures.append(record)
+            starts.append(match.line_number)
+        return self._result(failures, get_context_window("".join(recent), self.tail_lines))
+
+    def _process_buffer(self, buffer: Union[bytes, bytearray, mmap.mmap]) -> Message:
+        """Diagnose a byte buffer (e.g. a memory-mapped log) without decoding more than the lines it reports."""
+        failures = list(self.stream(buffer))
+        if failures:
+            starts = [record["line_number"] for record in failures]
+            self._attach_frames(find_stack_frames(buffer), failures, starts)
+        return self._result(failures, get_context_window(buffer, self.tail_lines))
+
+    def process_file(self, path: Union[str, os.PathLike]) -> Message:
+        """
+        Diagnose a log file, in parallel when it is large.
+
+        Compressed logs are streamed and smaller plain files are scanned in
+        place in this process. Plain files of at least ``parallel_min_bytes``
+        are cut into line-aligned byte ranges that the shared process pool
+        (see utils.process_pool) scans, each worker memory-mapping the file
+        itself; results are merged in file order with absolute line numbers,
+        so the output is the same as a single-process scan.
+        """
+        path = os.fspath(path)
+        with open_log(path) as source:
+            if isinstance(source, mmap.mmap) and self.processes > 1 and len(source) >= self.parallel_min_bytes:
+                return self._process_shards(path, source)
+            return self.process(Message(self.name, self.name, source))
+
+    def _process_shards(self, path: str, buffer: mmap.mmap) -> Message:
+        ranges = split_line_ranges(buffer, self.processes * SHARDS_PER_PROCESS)
+        failures: List[FailureRecord] = []
+        frames: List[Tuple[int, str]] = []
+        first_line = 1
+        pool = get_process_pool(self.processes)
+        futures = [
+            pool.submit(_scan_shard, path, start, end, self.matcher.rules, self.frame_window)
+            for start, end in ranges
+        ]
+        for future in futures:
+            newlines, shard_failures, shard_frames = future.result()
+            offset = first_line - 1
+            for record in shard_failures:
+                record["line_number"] += offset
+            failures.extend(shard_failures)
+            frames.extend((line_number + offset, frame) for line_number, frame in shard_frames)
+            first_line += newlines
+        self._attach_frames(frames, failures, [record["line_number"] for record in failures])
+        return self._result(failures, get_context_window(buffer, self.tail_lines))
+
+    def _result(self, failures: List[FailureRecord], log_tail: str) -> Message:
+        failed_tests = [record["line"] for record in failures]
+        self.logger.info("Extracted %d failed tests", len(failed_tests))
+        self.logger.debug("Failed tests: %s", failed_tests)
+        content: DiagnosticsResult = {"failed_tests": failed_tests, "failures": failures, "log_tail": log_tail}
         return Message(
             sender=self.name,
             receiver="RootCauseAnalyzerAgent",
-            content={"failed_tests": failed_tests}
+            content=content
         )
-# End of agents/test_diagnostics_agent.py
\ No newline at end of file
+# End of agents/test_diagnostics_agent.py
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+ASGI web service for QAOps Multi-Agent System
+Serves the same API as serve.py on an event loop, so one process keeps many
+pipelines in flight while they wait on the LLM.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 9696
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Telemetry is initialized ONCE at the entry point.
+# Agent modules should only emit spans/traces.
+import json
+import os
+from observability import init_telemetry
+init_telemetry("multiagent-orchestrator")
+
+from predict import QAOpsPredictor
+from utils.config import METRICS_DIR, METRICS_FLUSH_SECONDS
+from utils.llm_factory import llm_limits, warm_llm_clients
+from utils.logger import correlation_scope, get_correlation_id, get_logger, logging_stats
+from utils.metrics import CONTENT_TYPE, registry
+from utils.serialization import dumps
+
+logger = get_logger("QAOpsASGI")
+
+# Initialize predictor
+try:
+    predictor = QAOpsPredictor()
+    warm_llm_clients()
+    logger.info("QAOps predictor initialized successfully")
+except Exception as e:
+    logger.error(f"Failed to initialize predictor: {e}")
+    predictor = None
+
+# With METRICS_DIR set (e.g. uvicorn --workers N), each scrape merges every process's metrics
+if METRICS_DIR:
+    registry.share(METRICS_DIR, METRICS_FLUSH_SECONDS)
+if predictor:
+    registry.register_stats("qaops_coalescing", predictor.coalescer.stats,
+                            counters=("calls", "executions", "coalesced"), documentation="Request coalescing")
+registry.register_stats("qaops_logging", logging_stats, counters=("dropped", "suppressed"), documentation="Log records")
+
+
+async def _send_json(send, payload: dict, status: int = 200) -> None:
+    body = dumps(payload)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    (b"x-correlation-id", (get_correlation_id() or "").encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> list:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return chunks
+
+
+async def predict(scope, receive, send) -> None:
+    """
+    Prediction endpoint
+    Expects JSON: {"ci_logs": "log content here"} or a raw text/plain body
+    Returns: {"failed_tests": [...], "analysis": "...", "remediation_plan": "..."}
+    """
+    if not predictor:
+        await _send_json(send, {"error": "Predictor not initialized"}, 500)
+        return
+
+    headers = dict(scope.get("headers", []))
+    chunks = await _read_body(receive)
+    if headers.get(b"content-type", b"").startswith(b"application/json"):
+        try:
+            data = json.loads(b"".join(chunks))
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or 'ci_logs' not in data:
+            await _send_json(send, {"error": "Missing 'ci_logs' field in request body"}, 400)
+            return
+        ci_logs = data['ci_logs']
+        if not isinstance(ci_logs, str) or not ci_logs.strip():
+            await _send_json(send, {"error": "ci_logs must be a non-empty string"}, 400)
+            return
+    else:
+        ci_logs = chunks
+
+    result = await predictor.apredict(ci_logs)
+    await _send_json(send, result, 500 if result.get("status") == "error" else 200)
+
+
+async def health(scope, receive, send) -> None:
+    """Health check endpoint"""
+    await _send_json(send, {
+        "status": "healthy",
+        "service": "QAOps Multi-Agent Orchestrator",
+        "version": "1.0",
+        "coalescing": predictor.coalescer.stats() if predictor else None,
+        "llm_limits": llm_limits.stats()
+    })
+
+
+async def metrics(scope, receive, send) -> None:
+    """Prometheus metrics (text exposition format), merged over processes when METRICS_DIR is set"""
+    body = registry.render().encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", CONTENT_TYPE.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def root(scope, receive, send) -> None:
+    """Root endpoint with API documentation"""
+    await _send_json(send, {
+        "service": "QAOps Multi-Agent Orchestrator (ASGI)",
+        "version": "1.0",
+        "endpoints": {
+            "GET /health": "Health check",
+            "GET /metrics": "Prometheus metrics",
+            "POST /predict": "Analyze CI/CD logs and generate remediation plan",
+            "GET /": "This documentation"
+        }
+    })
+
+
+ROUTES = {
+    ("GET", "/health"): health,
+    ("GET", "/metrics"): metrics,
+    ("POST", "/predict"): predict,
+    ("GET", "/"): root,
+}
+
+
+async def app(scope, receive, send) -> None:
+    """ASGI application entry point"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        await _send_json(send, {"error": "Not found"}, 404)
+        return
+    # Each request runs in its own task, so the ID is bound for this request only
+    headers = dict(scope.get("headers", []))
+    with correlation_scope(headers.get(b"x-correlation-id", b"").decode("latin-1")[:128] or None):
+        try:
+            await handler(scope, receive, send)
+        except Exception as e:
+            logger.error("ASGI endpoint error: %s", e)
+            await _send_json(send, {"error": "Internal server error", "details": str(e)}, 500)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 9696))
+    logger.info(f"Starting QAOps ASGI server on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Load test: blocking predict() workers vs one event loop running apredict().
+
+The LLM is replaced by a stub that sleeps for --llm-latency seconds, so the
+numbers show pipeline concurrency rather than provider speed. The sync side
+models a Flask deployment with --workers blocking worker threads; the async
+side keeps every pipeline in flight on a single event loop.
+
+Usage:
+    python benchmarks/bench_async_pipeline.py [--pipelines 200] [--workers 4] [--llm-latency 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import agents.root_cause_agent as root_cause_agent
+from predict import QAOpsPredictor
+
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_logs', 'jenkins_failure.log')
+
+
+def install_stub_llm(latency: float) -> None:
+    def run_llm(prompt, model=None, use_cache=True):
+        time.sleep(latency)
+        return "Root cause: stubbed analysis"
+
+    async def arun_llm(prompt, model=None, use_cache=True):
+        await asyncio.sleep(latency)
+        return "Root cause: stubbed analysis"
+
+    root_cause_agent.run_llm = run_llm
+    root_cause_agent.arun_llm = arun_llm
+
+
+def run_sync(predictor, logs, pipelines: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda _: predictor.predict(logs), range(pipelines)))
+    assert all(r["status"] == "success" for r in results)
+    return time.perf_counter() - start
+
+
+async def run_async(predictor, logs, pipelines: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(predictor.apredict(logs) for _ in range(pipelines)))
+    assert all(r["status"] == "success" for r in results)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipelines", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4, help="Blocking worker threads for the sync baseline")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    install_stub_llm(args.llm_latency)
+    with open(SAMPLE_LOG) as f:
+        logs = f.read()
+    predictor = QAOpsPredictor()
+
+    sync_elapsed = run_sync(predictor, logs, args.pipelines, args.workers)
+    async_elapsed = asyncio.run(run_async(predictor, logs, args.pipelines))
+
+    print(f"{args.pipelines} pipelines, stub LLM latency {args.llm_latency * 1000:.0f} ms")
+    print(f"{'mode':<34} {'seconds':>9} {'pipelines/s':>12}")
+    print(f"{f'sync predict ({args.workers} workers)':<34} {sync_elapsed:>9.2f} {args.pipelines / sync_elapsed:>12.1f}")
+    print(f"{'async apredict (1 event loop)':<34} {async_elapsed:>9.2f} {args.pipelines / async_elapsed:>12.1f}")
+    print(f"Speedup: {sync_elapsed / async_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
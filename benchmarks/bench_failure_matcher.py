@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: failure-matcher throughput in MB/s.
+
+Scales data/sample_logs/jenkins_failure.log up to the requested size, padded
+with passing-build noise lines, and compares:
+
+- the original ``"FAIL" in line`` scan (one marker, no classification),
+- a per-line loop running every default rule's regex, and
+- the compiled single-pass FailureMatcher (same rules, plus test ids).
+
+Usage:
+    python benchmarks/bench_failure_matcher.py [--size-mb 64] [--noise-lines 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.failure_matcher import DEFAULT_RULES, FailureMatcher
+from utils.log_stream import iter_log_blocks
+
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_logs', 'jenkins_failure.log')
+NOISE_LINE = "[2025-11-28 10:31:02] INFO: [surefire] Tests run: 12, Failures: 0, Skipped: 0, Time elapsed: 0.84 s\n"
+
+
+def build_log(size_mb: int, noise_lines: int = 200) -> str:
+    with open(SAMPLE_LOG) as f:
+        sample = f.read()
+    if not sample.endswith("\n"):
+        sample += "\n"
+    unit = NOISE_LINE * noise_lines + sample
+    return unit * max(1, (size_mb * 1024 * 1024) // len(unit))
+
+
+def substring_scan(logs: str) -> int:
+    return sum(1 for line in logs.split("\n") if "FAIL" in line)
+
+
+def per_rule_scan(logs: str) -> int:
+    searches = [re.compile(rule.pattern).search for rule in DEFAULT_RULES]
+    hits = 0
+    for line in logs.split("\n"):
+        for search in searches:
+            if search(line):
+                hits += 1
+                break
+    return hits
+
+
+def matcher_scan(logs: str) -> int:
+    matcher = FailureMatcher()
+    return sum(1 for _ in matcher.scan_blocks(iter_log_blocks(logs)))
+
+
+def timed(func, logs: str):
+    start = time.perf_counter()
+    hits = func(logs)
+    return hits, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--noise-lines", type=int, default=200, help="Passing lines per sample failure block")
+    args = parser.parse_args()
+
+    logs = build_log(args.size_mb, args.noise_lines)
+    size_mb = len(logs.encode()) / (1024 * 1024)
+    print(f"Input: {size_mb:.1f} MB, {logs.count(chr(10))} lines")
+    print(f"{'scanner':<24} {'matches':>10} {'seconds':>9} {'MB/s':>9}")
+    scanners = (
+        ('"FAIL" in line', substring_scan),
+        ("per-rule regex loop", per_rule_scan),
+        ("FailureMatcher", matcher_scan),
+    )
+    for name, func in scanners:
+        hits, elapsed = timed(func, logs)
+        print(f"{name:<24} {hits:>10} {elapsed:>9.2f} {size_mb / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold vs warm LLM client latency against a local stub server.
+
+Starts a keep-alive HTTP stub that answers Gemini generateContent and
+OpenAI chat-completion requests, then times:
+
+- Gemini generate_content with a new genai.Client per call vs the shared
+  LLMClientRegistry client;
+- litellm acompletion (the async litellm route of arun_llm) with a fresh
+  HTTP client per call vs the registry's shared async session.
+
+No network or API key is needed.
+
+Usage:
+    python benchmarks/bench_llm_clients.py [--calls 200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from utils.llm_clients import LLMClientRegistry, llm_clients
+
+STUB_RESPONSE = json.dumps({
+    "candidates": [{"content": {"role": "model", "parts": [{"text": "Root cause: stub"}]}}]
+}).encode()
+STUB_CHAT_RESPONSE = json.dumps({
+    "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "Root cause: stub"}}],
+    "usage": {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7},
+}).encode()
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = STUB_CHAT_RESPONSE if self.path.endswith("/chat/completions") else STUB_RESPONSE
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def new_client(base_url: str):
+    from google import genai
+    return genai.Client(api_key="stub-key", http_options={"base_url": base_url})
+
+
+def measure(get_client, calls: int):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client = get_client("gemini/stub")
+        client.models.generate_content(model="stub", contents="Summarize root causes")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def ameasure(base_url: str, calls: int, shared: bool):
+    import litellm
+    from litellm import acompletion
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        if shared:
+            llm_clients.get("litellm_async", "openai/stub")
+        else:
+            # What every call paid before: litellm builds a new client (and connection)
+            litellm.aclient_session = None
+            litellm.in_memory_llm_clients_cache.flush_cache()
+        await acompletion(model="openai/stub", api_base=f"{base_url}/v1", api_key="stub-key",
+                          messages=[{"role": "user", "content": "Summarize root causes"}])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    start = time.perf_counter()
+    new_client(base_url)
+    first_import_ms = (time.perf_counter() - start) * 1000
+
+    registry = LLMClientRegistry({"gemini": lambda model: new_client(base_url)})
+    results = {
+        "cold (client per call)": measure(lambda model: new_client(base_url), args.calls),
+        "warm (registry)": measure(lambda model: registry.get("gemini", model), args.calls),
+    }
+    # One untimed call pays litellm's import and first-request setup
+    asyncio.run(ameasure(base_url, 1, shared=False))
+    results["async cold (client per call)"] = asyncio.run(ameasure(base_url, args.calls, shared=False))
+    llm_clients.clear()
+    results["async warm (registry)"] = asyncio.run(ameasure(base_url, args.calls, shared=True))
+    server.shutdown()
+
+    print(f"First client construction incl. import: {first_import_ms:.1f} ms")
+    print(f"{'mode':<30} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, latencies in results.items():
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(f"{name:<30} {statistics.median(latencies):>8.2f} {p99:>8.2f} {statistics.fmean(latencies):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: file ingestion modes for diagnostics.
+
+Writes a synthetic Jenkins log of --size-mb (mostly passing output with the
+sample failure repeated through it) plus a gzip copy, then scans it in a
+fresh subprocess per mode and reports throughput and peak RSS:
+
+  read   f.read() into a Python string, then scan it
+  mmap   open_log() memory-maps the file and scans the bytes in place
+         (mapped pages count toward RSS but are clean, reclaimable page cache)
+  gzip   open_log() decompresses the .gz copy as a stream
+
+Usage:
+    python benchmarks/bench_log_ingest.py [--size-mb 512] [--noise-ratio 50]
+"""
+
+import argparse
+import gzip
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_logs', 'jenkins_failure.log')
+
+
+def write_log(path: str, size_mb: int, noise_ratio: int) -> None:
+    with open(SAMPLE_LOG, "rb") as f:
+        sample = f.read().rstrip(b"\n") + b"\n"
+    noise = b"".join(
+        b"[2025-11-28 10:31:%02d] INFO: [module-%d] compiled 12 sources, 0 warnings\n" % (i % 60, i)
+        for i in range(noise_ratio * sample.count(b"\n"))
+    )
+    block = (noise + sample) * max(1, (1024 * 1024) // len(noise + sample))
+    with open(path, "wb") as f:
+        written = 0
+        while written < size_mb * 1024 * 1024:
+            f.write(block)
+            written += len(block)
+
+
+def run_one(mode: str, path: str) -> None:
+    """Child-process entry point: diagnose one file and print stats."""
+    from adk import Message
+    from agents.test_diagnostics_agent import TestDiagnosticsAgent
+    from utils.log_stream import open_log
+
+    agent = TestDiagnosticsAgent("TestDiagnostics")
+    agent.logger.disabled = True
+    start = time.perf_counter()
+    if mode == "read":
+        with open(path, encoding="utf-8") as f:
+            content = agent.process(Message("Bench", "TestDiagnostics", f.read())).content
+    else:
+        with open_log(path) as source:
+            content = agent.process(Message("Bench", "TestDiagnostics", source)).content
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{len(content['failures'])},{elapsed:.2f},{peak_kb / 1024:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--noise-ratio", type=int, default=50, help="Passing lines per sample-log line")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "build.log")
+        write_log(path, args.size_mb, args.noise_ratio)
+        with open(path, "rb") as f, gzip.open(path + ".gz", "wb", compresslevel=1) as out:
+            while chunk := f.read(1024 * 1024):
+                out.write(chunk)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        print(f"{size_mb:.0f} MB log")
+        print(f"{'mode':>6} {'failures':>10} {'seconds':>9} {'MB/s':>8} {'peak RSS MB':>12}")
+        for mode, target in (("read", path), ("mmap", path), ("gzip", path + ".gz")):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, target],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            failures, elapsed, peak = out.split(",")
+            print(f"{mode:>6} {failures:>10} {elapsed:>9} {size_mb / max(float(elapsed), 1e-9):>8.1f} {peak:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: logging cost on the request thread.
+
+Logs the line the diagnostics agent used to write for every request (the
+full failed-test list, formatted eagerly with an f-string) and the lazy
+count line that replaced it, through a synchronous stream handler, the
+async queue handler, and with sampling under a sustained burst. Output
+goes to /dev/null; only the calling thread's time is measured (the async
+writer is drained afterwards and reported separately).
+
+Usage:
+    python benchmarks/bench_logging.py [--lines 20000] [--tests 200] [--json]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logger import LOG_FORMAT, AsyncHandler, CorrelationIdFilter, JsonFormatter, SamplingFilter, correlation_scope
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--tests", type=int, default=200, help="Failed tests per log line")
+    parser.add_argument("--json", action="store_true", help="Use the JSON formatter")
+    args = parser.parse_args()
+
+    failed_tests = [f"[ERROR] tests/test_suite{i}.py::test_case{i} FAILED AssertionError" for i in range(args.tests)]
+    devnull = open(os.devnull, "w")
+
+    def stream():
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(JsonFormatter() if args.json else logging.Formatter(LOG_FORMAT))
+        return handler
+
+    def eager(logger):
+        logger.info(f"Extracted failed tests: {failed_tests}")
+
+    def lazy(logger):
+        logger.info("Extracted %d failed tests", len(failed_tests))
+        logger.debug("Failed tests: %s", failed_tests)
+
+    def verbose_lazy(logger):
+        logger.info("Extracted failed tests: %s", failed_tests)
+
+    variants = []
+    for name, emit, handler, sampler in [
+        ("sync, eager full list", eager, stream(), None),
+        ("sync, lazy count", lazy, stream(), None),
+        ("async, lazy full list", verbose_lazy, AsyncHandler(stream(), max_records=args.lines * 2), None),
+        ("sync, lazy full list, sampled", verbose_lazy, stream(), SamplingFilter(burst=100, every=100)),
+    ]:
+        if sampler:
+            handler.addFilter(sampler)
+        handler.addFilter(CorrelationIdFilter())
+        variants.append((name, emit, handler, make_logger(f"bench.{len(variants)}", handler)))
+
+    print(f"{args.lines:,} lines x {args.tests} failed tests ({'json' if args.json else 'text'})")
+    for name, emit, handler, logger in variants:
+        with correlation_scope("bench"):
+            start = time.perf_counter()
+            for _ in range(args.lines):
+                emit(logger)
+            elapsed = time.perf_counter() - start
+        line = f"{name:<32} {elapsed / args.lines * 1e6:8.1f} us/line on the request thread"
+        if isinstance(handler, AsyncHandler):
+            start = time.perf_counter()
+            handler.close()
+            line += f"   (writer drained in {time.perf_counter() - start:.2f} s, dropped {handler.dropped})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
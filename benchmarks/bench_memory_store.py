@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory-bank update cost at scale.
+
+Loads --issues distinct issues into the SQLite store in batches, then times
+single increments, batched increments and point lookups against the full
+bank. The legacy JSON read-modify-write is timed at --json-issues (it is
+O(bank size) per update, so 1M entries is impractical) for comparison.
+
+Usage:
+    python benchmarks/bench_memory_store.py [--issues 1000000] [--json-issues 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.memory_store import JSONMemoryStore, SQLiteMemoryStore
+
+
+def timed(label: str, func, repeat: int) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed / repeat * 1e6:>12.1f} us/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=1_000_000)
+    parser.add_argument("--json-issues", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteMemoryStore(os.path.join(tmp, "memory.db"))
+        start = time.perf_counter()
+        for offset in range(0, args.issues, args.batch):
+            store.increment_many(f"test_{i} FAILED" for i in range(offset, min(offset + args.batch, args.issues)))
+        load = time.perf_counter() - start
+        print(f"SQLite: loaded {args.issues} distinct issues in {load:.1f}s ({args.issues / load:,.0f} issues/s)")
+
+        rng = random.Random(7)
+        timed("SQLite increment (existing issue)", lambda: store.increment(f"test_{rng.randrange(args.issues)} FAILED"), 2000)
+        timed("SQLite increment (new issue)", lambda: store.increment(f"new_{rng.random()} FAILED"), 2000)
+        batch = [f"test_{rng.randrange(args.issues)} FAILED" for _ in range(50)]
+        timed("SQLite increment_many (50 issues)", lambda: store.increment_many(batch), 200)
+        timed("SQLite get", lambda: store.get(f"test_{rng.randrange(args.issues)} FAILED"), 5000)
+
+        legacy = JSONMemoryStore(os.path.join(tmp, "memory_bank.json"))
+        legacy.increment_many(f"test_{i} FAILED" for i in range(args.json_issues))
+        timed(f"JSON increment ({args.json_issues} issues in bank)",
+              lambda: legacy.increment(f"test_{rng.randrange(args.json_issues)} FAILED"), 20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-message overhead of adk.Message and its payloads.
+
+1. Creating --messages messages and reading their fields, with the old
+   dict-backed class and the slotted one, plus memory per message.
+2. Encoding and decoding one diagnostics result for another process with
+   pickle, json and Message.to_bytes (orjson when installed).
+3. Diagnosing a raw log received as bytes: decoded up front to a str,
+   decoded block by block (what bytes payloads used to go through; a
+   BytesIO takes that path now), or searched in place as bytes / a
+   memoryview, with the time and the peak memory allocated.
+
+Usage:
+    python benchmarks/bench_message.py [--messages 1000000] [--failures 200] [--log-mb 50]
+"""
+
+import argparse
+import io
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adk import Message
+from agents.test_diagnostics_agent import TestDiagnosticsAgent
+from utils import serialization
+
+
+class DictMessage:
+    """adk.Message before it was slotted."""
+    def __init__(self, sender, receiver, content):
+        self.sender = sender
+        self.receiver = receiver
+        self.content = content
+
+
+def synthetic_log(target_bytes: int, failure_every: int = 50) -> bytes:
+    lines, size, i = [], 0, 0
+    while size < target_bytes:
+        if i % failure_every == 0:
+            line = f"[ERROR] tests/test_suite{i % 500}.py::test_case{i % 97} FAILED AssertionError: expected 200 got 503"
+        else:
+            line = f"[INFO] step {i}: collected fixtures and ran setup for module{i % 50}"
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--failures", type=int, default=200, help="Failure records in the serialized result")
+    parser.add_argument("--log-mb", type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"1. {args.messages:,} messages")
+    content = {"analysis": "x"}
+    for name, cls in [("dict-backed", DictMessage), ("slotted", Message)]:
+        elapsed, _ = timed(lambda: [cls("RootCause", "ActionPlannerAgent", content) for _ in range(args.messages)])
+        messages = [cls("RootCause", "ActionPlannerAgent", content) for _ in range(args.messages)]
+        read, _ = timed(lambda: sum(len(m.sender) + len(m.receiver) for m in messages))
+        tracemalloc.start()
+        sample = [cls("RootCause", "ActionPlannerAgent", content) for _ in range(100_000)]
+        size = tracemalloc.get_traced_memory()[0] / len(sample)
+        tracemalloc.stop()
+        del messages, sample
+        print(f"   {name:<12} create {elapsed / args.messages * 1e9:6.0f} ns   "
+              f"read fields {read / args.messages * 1e9:5.0f} ns   {size:5.0f} bytes/message")
+
+    log = synthetic_log(args.failures * 4000)
+    agent = TestDiagnosticsAgent("Bench")
+    result = agent.process(Message("Bench", "TestDiagnostics", log))
+    result.content["failures"] = result.content["failures"][:args.failures]
+    result.content["failed_tests"] = result.content["failed_tests"][:args.failures]
+    print(f"2. diagnostics result with {len(result.content['failures'])} failures, encode / decode")
+    codecs = [
+        ("pickle", lambda: pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        ("json", lambda: json.dumps([result.sender, result.receiver, result.content]).encode(), json.loads),
+        (f"to_bytes ({'orjson' if serialization.orjson else 'json'})", result.to_bytes, Message.from_bytes),
+    ]
+    for name, encode, decode in codecs:
+        encoded_in, data = timed(encode, 200)
+        decoded_in, _ = timed(lambda: decode(data), 200)
+        print(f"   {name:<18} {encoded_in * 1e6:7.0f} us / {decoded_in * 1e6:7.0f} us   {len(data):,} bytes")
+
+    raw = synthetic_log(int(args.log_mb * 2 ** 20))
+    print(f"3. diagnose a {len(raw) / 2 ** 20:.0f} MiB byte body")
+    for name, payload in [
+        ("str, decoded", lambda: raw.decode("utf-8")),
+        ("chunked decode", lambda: io.BytesIO(raw)),
+        ("bytes in place", lambda: raw),
+        ("memoryview", lambda: memoryview(raw)),
+    ]:
+        tracemalloc.start()
+        elapsed, content = timed(lambda: agent.process(Message("Bench", "TestDiagnostics", payload())).content)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"   {name:<16} {elapsed:6.2f} s   peak {peak / 2 ** 20:7.1f} MiB   "
+              f"{len(content['failed_tests']):,} failed tests")
+
+
+if __name__ == "__main__":
+    main()
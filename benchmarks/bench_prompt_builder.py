@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: root-cause prompt size and log-tail cost on large logs.
+
+Builds a synthetic CI log with --failures failing tests (each followed by a
+stack frame) around --noise-lines of ordinary output, then compares the old
+prompt (the repr of every failed line) with the token-budgeted prompt, and
+times the log tail computed by a full split versus reverse search.
+
+Usage:
+    python benchmarks/bench_prompt_builder.py [--failures 50000] [--noise-lines 500000] [--max-tokens 2000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adk import Message
+from agents.test_diagnostics_agent import TestDiagnosticsAgent
+from utils.memory_handler import get_context_window
+from utils.prompt_builder import build_rca_prompt, estimate_tokens
+
+
+def synthetic_log(failures: int, noise_lines: int) -> str:
+    noise_per_failure = max(noise_lines // max(failures, 1), 1)
+    parts = []
+    for i in range(failures):
+        parts.extend(f"2025-11-28 10:{j % 60:02d}:00 INFO: compiled module {j}\n" for j in range(noise_per_failure))
+        parts.append(f"2025-11-28 10:{i % 60:02d}:01 ERROR: Test failed: com.example.Suite{i % 200}.testCase build #{i}\n")
+        parts.append(f"\tat com.example.Suite{i % 200}.testCase(Suite.java:{i % 90 + 10})\n")
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--failures", type=int, default=50_000)
+    parser.add_argument("--noise-lines", type=int, default=500_000)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    args = parser.parse_args()
+
+    logs = synthetic_log(args.failures, args.noise_lines)
+    agent = TestDiagnosticsAgent("TestDiagnostics")
+    agent.logger.setLevel(logging.WARNING)
+    content = agent.process(Message("Bench", "TestDiagnostics", logs)).content
+
+    naive = f"Summarize root causes from logs: {content['failed_tests']}"
+    start = time.perf_counter()
+    prompt = build_rca_prompt(content["failures"], content["log_tail"].split("\n"), max_tokens=args.max_tokens)
+    build = time.perf_counter() - start
+    print(f"log: {len(logs) / 1e6:.1f} MB, {len(content['failures'])} failures")
+    print(f"naive prompt:    {estimate_tokens(naive):>12,} tokens")
+    print(f"budgeted prompt: {estimate_tokens(prompt):>12,} tokens (built in {build * 1000:.1f} ms)")
+
+    start = time.perf_counter()
+    for _ in range(20):
+        "\n".join(logs.strip().split("\n")[-20:])
+    split = (time.perf_counter() - start) / 20
+    start = time.perf_counter()
+    for _ in range(20):
+        get_context_window(logs, 20)
+    reverse = (time.perf_counter() - start) / 20
+    print(f"tail via split:  {split * 1000:>9.2f} ms")
+    print(f"tail via rfind:  {reverse * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
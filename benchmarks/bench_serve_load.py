@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Load test: /predict latency at a fixed request rate against a stub LLM.
+
+Starts a local Gemini stub that answers generateContent after --llm-latency
+seconds, launches the service pointed at it (GEMINI_BASE_URL), waits for
+/health, then sends POST /predict at --rps for --duration seconds. Requests
+are open-loop: each one is scheduled at its own start time and its latency
+is measured from that time, so a stalled server cannot hide queueing delay
+(no coordinated omission). Reports p50/p90/p99/max latency, errors and the
+achieved rate per server mode:
+
+  flask     python serve.py (Flask development server)
+  gunicorn  gunicorn -c gunicorn.conf.py serve:app (--workers x --threads)
+
+Usage:
+    python benchmarks/bench_serve_load.py [--modes flask,gunicorn] [--rps 20] [--duration 20]
+                                          [--workers 2] [--threads 8] [--llm-latency 0.2]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+SAMPLE_LOG = os.path.join(ROOT, 'data', 'sample_logs', 'jenkins_failure.log')
+
+STUB_RESPONSE = json.dumps({
+    "candidates": [{"content": {"role": "model", "parts": [{"text": "Root cause: stub"}]}}]
+}).encode()
+
+
+def stub_handler(latency: float):
+    class StubGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+            self.end_headers()
+            self.wfile.write(STUB_RESPONSE)
+
+        def log_message(self, *args):
+            pass
+
+    return StubGeminiHandler
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode: str, port: int, stub_url: str, args) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        GEMINI_BASE_URL=stub_url,
+        GOOGLE_API_KEY="stub-key",
+        LLM_MODEL="gemini/stub",
+        # Every request must reach the stub LLM
+        LLM_CACHE_ENABLED="false",
+        WEB_WORKERS=str(args.workers),
+        WEB_THREADS=str(args.threads),
+    )
+    if mode == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "serve:app"]
+    else:
+        command = [sys.executable, "serve.py"]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not become healthy")
+
+
+def run_load(url: str, body: dict, rps: float, duration: float):
+    local = threading.local()
+    total = int(rps * duration)
+    start = time.perf_counter() + 0.5
+
+    def send(index: int):
+        scheduled = start + index / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            ok = session.post(url, json=body, timeout=60).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - scheduled, ok
+
+    with ThreadPoolExecutor(max_workers=min(total, 256)) as pool:
+        results = list(pool.map(send, range(total)))
+    elapsed = time.perf_counter() - start
+    return sorted(latency for latency, _ in results), sum(not ok for _, ok in results), total / elapsed
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="flask,gunicorn")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per mode")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), stub_handler(args.llm_latency))
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    with open(SAMPLE_LOG) as f:
+        body = {"ci_logs": f.read()}
+
+    print(f"{args.rps:g} req/s for {args.duration:g}s, stub LLM latency {args.llm_latency * 1000:.0f} ms")
+    print(f"{'mode':<22} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'req/s':>7}")
+    for mode in args.modes.split(","):
+        port = free_port()
+        server = start_server(mode, port, stub_url, args)
+        try:
+            latencies, errors, achieved = run_load(f"http://127.0.0.1:{port}/predict", body, args.rps, args.duration)
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+        label = f"gunicorn {args.workers}x{args.threads}" if mode == "gunicorn" else mode
+        print(f"{label:<22} {percentile(latencies, 0.5) * 1000:>8.0f} {percentile(latencies, 0.9) * 1000:>8.0f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.0f} {latencies[-1] * 1000:>8.0f} {errors:>7} {achieved:>7.1f}")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sharded diagnostics of one huge log file.
+
+Writes a --size-mb synthetic log (failures with stack traces among INFO
+noise) to a temporary directory, diagnoses it with
+TestDiagnosticsAgent.process_file in one process, then with 2, 4, ...
+processes up to the CPU count (or --processes), checks every run returns
+the same result as the single-process scan, and prints the speedup.
+
+Speedup is bounded by the number of physical cores and by how fast the
+file can be read: run it on a warm page cache (the first, single-process
+pass warms it) and a multi-core machine.
+
+Usage:
+    python benchmarks/bench_sharded_diagnostics.py [--size-mb 2048] [--processes 1 2 4 8] [--keep PATH]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.test_diagnostics_agent import TestDiagnosticsAgent, _scan_shard
+from utils.process_pool import get_process_pool
+
+
+def write_log(path: str, target_bytes: int, failure_every: int = 200) -> None:
+    block = []
+    for i in range(failure_every * 10):
+        if i % failure_every == 0:
+            block.append(f"[ERROR] tests/test_suite{i % 500}.py::test_case{i % 97} FAILED AssertionError: expected 200 got 503")
+            block.extend(f"\tat com.example.Service{j}.call(Service{j}.java:{i % 300 + j})" for j in range(4))
+        else:
+            block.append(f"[INFO] step {i}: collected fixtures and ran setup for module{i % 50}")
+    data = ("\n".join(block) + "\n").encode("utf-8")
+    with open(path, "wb") as f:
+        written = 0
+        while written < target_bytes:
+            f.write(data)
+            written += len(data)
+
+
+def timed(agent, path):
+    start = time.perf_counter()
+    content = agent.process_file(path).content
+    return time.perf_counter() - start, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=2048)
+    parser.add_argument("--processes", type=int, nargs="+",
+                        help="Process counts to compare (default: powers of two up to the CPU count)")
+    parser.add_argument("--keep", help="Write the log here and keep it instead of using a temporary file")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    counts = args.processes or sorted({min(2 ** k, cpus) for k in range(1, cpus.bit_length() + 1)} - {1})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.keep or os.path.join(tmp, "huge.log")
+        if not os.path.exists(path):
+            write_log(path, int(args.size_mb * 2 ** 20))
+        size = os.path.getsize(path)
+        print(f"{size / 2 ** 20:,.0f} MiB log, {cpus} CPUs")
+
+        baseline, expected = timed(TestDiagnosticsAgent("Bench", processes=1), path)
+        print(f"   1 process    {baseline:7.2f} s   {size / 2 ** 20 / baseline:7.0f} MiB/s   "
+              f"{len(expected['failures']):,} failures")
+        for processes in counts:
+            agent = TestDiagnosticsAgent("Bench", processes=processes, parallel_min_bytes=0)
+            # The pool is long-lived: start its workers (and their imports) outside the timing
+            pool = get_process_pool(processes)
+            for future in [pool.submit(_scan_shard, path, 0, 0, agent.matcher.rules, 0) for _ in range(processes)]:
+                future.result()
+            elapsed, content = timed(agent, path)
+            assert content == expected, f"{processes} processes returned a different result"
+            print(f"{processes:4d} processes  {elapsed:7.2f} s   {size / 2 ** 20 / elapsed:7.0f} MiB/s   "
+                  f"speedup {baseline / elapsed:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of streaming diagnostics vs input size.
+
+Each size runs in a fresh subprocess that feeds a synthetic Jenkins log
+through TestDiagnosticsAgent.stream() as a chunk generator, then reports the
+process peak RSS. With streaming ingestion the peak should stay flat from
+1 MB to 1 GB.
+
+Usage:
+    python benchmarks/bench_streaming_diagnostics.py [--sizes 1,10,100,1024]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_logs', 'jenkins_failure.log')
+
+
+def generate_log(size_bytes: int, chunk_size: int = 1024 * 1024):
+    """Yield ~chunk_size byte chunks of repeated sample log until size_bytes is reached."""
+    with open(SAMPLE_LOG, "rb") as f:
+        sample = f.read()
+    if not sample.endswith(b"\n"):
+        sample += b"\n"
+    block = sample * max(1, chunk_size // len(sample))
+    produced = 0
+    while produced < size_bytes:
+        yield block
+        produced += len(block)
+
+
+def run_one(size_mb: int) -> None:
+    """Child-process entry point: stream one synthetic log and print stats."""
+    from agents.test_diagnostics_agent import TestDiagnosticsAgent
+
+    agent = TestDiagnosticsAgent("TestDiagnostics")
+    start = time.perf_counter()
+    failures = sum(1 for _ in agent.stream(generate_log(size_mb * 1024 * 1024)))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{size_mb},{failures},{elapsed:.2f},{peak_kb / 1024:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100,1024", help="Comma-separated input sizes in MB")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_one(args.child)
+        return
+
+    print(f"{'input MB':>10} {'failures':>10} {'seconds':>9} {'MB/s':>8} {'peak RSS MB':>12}")
+    for size_mb in (int(s) for s in args.sizes.split(",")):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(size_mb)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        _, failures, elapsed, peak = out.split(",")
+        throughput = size_mb / max(float(elapsed), 1e-9)
+        print(f"{size_mb:>10} {failures:>10} {elapsed:>9} {throughput:>8.1f} {peak:>12}")
+
+
+if __name__ == "__main__":
+    main()
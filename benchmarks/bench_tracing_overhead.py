@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request tracing overhead on the calling thread.
+
+Each synthetic request opens a root span with --children child spans (the
+shape of one pipeline run: diagnostics, root cause, LLM call, ...), sets a
+few attributes and ends them. The same loop is timed with no tracing, with
+the old synchronous console exporter (written to /dev/null), and with the
+buffered pipeline at full, head-sampled and tail-sampled rates. Export
+cost for the buffered variants is paid on the exporter thread and reported
+separately as the time to drain.
+
+Usage:
+    python benchmarks/bench_tracing_overhead.py [--requests 5000] [--children 5] [--ratio 0.1]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from utils.telemetry import SpanExportBuffer, TailSampler, head_sampler
+
+
+def run(tracer, requests: int, children: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        with tracer.start_as_current_span("predict") as root:
+            root.set_attribute("request.id", i)
+            for c in range(children):
+                with tracer.start_as_current_span(f"stage-{c}") as span:
+                    span.set_attribute("stage.index", c)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--children", type=int, default=5)
+    parser.add_argument("--ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    spans_per_request = args.children + 1
+    buffer_size = args.requests * spans_per_request
+
+    def buffered(sampler=None, tail_ratio=None):
+        exporter = InMemorySpanExporter()
+        buffer = SpanExportBuffer([exporter], max_spans=buffer_size)
+        processor = TailSampler(buffer, ratio=tail_ratio) if tail_ratio is not None else buffer
+        provider = TracerProvider(sampler=sampler)
+        provider.add_span_processor(processor)
+        return provider, buffer, exporter
+
+    variants = []
+    variants.append(("no tracing", trace.NoOpTracerProvider(), None, None))
+    console = TracerProvider()
+    console.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter(out=devnull)))
+    variants.append(("sync console exporter", console, None, None))
+    variants.append(("buffered, all spans", *buffered()))
+    variants.append((f"buffered, head {args.ratio:g}", *buffered(sampler=head_sampler(args.ratio))))
+    variants.append((f"buffered, tail {args.ratio:g}", *buffered(tail_ratio=args.ratio)))
+
+    print(f"{args.requests:,} requests x {spans_per_request} spans")
+    for name, provider, buffer, exporter in variants:
+        tracer = provider.get_tracer("bench")
+        run(tracer, min(200, args.requests), args.children)  # warm up
+        if exporter is not None:
+            buffer.force_flush()
+            exporter.clear()
+        elapsed = run(tracer, args.requests, args.children)
+        line = f"{name:<24} {elapsed / args.requests * 1e6:8.1f} us/request"
+        if buffer is not None:
+            start = time.perf_counter()
+            buffer.force_flush()
+            drain = time.perf_counter() - start
+            line += f"   exported {len(exporter.get_finished_spans()):,} spans, drain {drain * 1000:.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: similar-incident query latency at scale.
+
+Embeds --templates synthetic failure texts with the hashing vectorizer,
+fills an index with --entries variants of them (template vector plus
+noise, so they are distinct but clustered like real recurring failures),
+then times top-k queries for fresh failure texts with exact search and,
+after partitioning, with approximate search, reporting recall against the
+exact results.
+
+Usage:
+    python benchmarks/bench_vector_index.py [--entries 1000000] [--dim 256] [--queries 200] [--nprobe 16]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.vector_index import VectorIndex
+
+ERRORS = [
+    "TimeoutError: request to {svc} timed out after 30s",
+    "ConnectionRefusedError: connection refused to {svc}:5432",
+    "AssertionError: expected status 200 but got 503 from {svc}",
+    "OSError: No space left on device while writing {svc} artifacts",
+    "socket.gaierror: Name or service not known: {svc}.internal",
+    "MemoryError: worker killed while loading {svc} fixtures",
+    "PermissionError: Permission denied: /srv/{svc}/config.yaml",
+    "ModuleNotFoundError: No module named '{svc}_client'",
+    "NoSuchElementException: Unable to locate element #{svc}-submit",
+]
+SERVICES = ["auth", "billing", "search", "cart", "profile", "inventory", "payments", "gateway", "mailer", "reports"]
+
+
+def failure_text(i: int) -> str:
+    error = ERRORS[i % len(ERRORS)].format(svc=SERVICES[(i // len(ERRORS)) % len(SERVICES)])
+    return f"[ERROR] tests/test_suite{i % 500}.py::test_case{i % 97} FAILED {error}\n  File app/module{i % 50}.py, line {i % 90}"
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--templates", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=16)
+    args = parser.parse_args()
+
+    index = VectorIndex(dim=args.dim)
+    start = time.perf_counter()
+    templates = index.vectorizer.transform([failure_text(i) for i in range(args.templates)])
+    embed = time.perf_counter() - start
+    print(f"embedded {args.templates:,} texts in {embed:.2f} s ({embed / args.templates * 1e6:.0f} us/text)")
+
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for offset in range(0, args.entries, 100_000):
+        count = min(100_000, args.entries - offset)
+        vectors = templates[rng.integers(0, len(templates), count)]
+        vectors += rng.normal(scale=0.02, size=vectors.shape).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        names = [str(offset + i) for i in range(count)]
+        index.add_vectors(names, vectors, names, names)
+    print(f"indexed {len(index):,} entries x {args.dim} dims in {time.perf_counter() - start:.2f} s "
+          f"({index._vectors[:len(index)].nbytes / 2 ** 20:,.0f} MiB of vectors)")
+
+    queries = [failure_text(args.templates + i * 7) for i in range(args.queries)]
+    exact, exact_hits = [], []
+    for text in queries:
+        start = time.perf_counter()
+        exact_hits.append({r["signature"] for r in index.search(text, args.k)})
+        exact.append(time.perf_counter() - start)
+    p50, p99 = percentiles(exact)
+    print(f"exact  top-{args.k}: p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+    start = time.perf_counter()
+    index.partition()
+    print(f"partitioned into {index.stats()['partitions']:,} clusters in {time.perf_counter() - start:.2f} s")
+    approx, recall = [], 0
+    for text, expected in zip(queries, exact_hits):
+        start = time.perf_counter()
+        found = {r["signature"] for r in index.search(text, args.k, nprobe=args.nprobe)}
+        approx.append(time.perf_counter() - start)
+        recall += len(found & expected) / max(len(expected), 1)
+    p50, p99 = percentiles(approx)
+    print(f"nprobe={args.nprobe} top-{args.k}: p50 {p50:8.2f} ms   p99 {p99:8.2f} ms   "
+          f"recall@{args.k} {recall / len(queries):.3f}")
+
+
+if __name__ == "__main__":
+    main()
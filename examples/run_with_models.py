@@ -1,5 +1,9 @@
 import os
 import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SAMPLE_LOG = os.path.join(ROOT, "data", "sample_logs", "jenkins_failure.log")
 
 models = [
     "gemini/gemini-2.5-flash",
@@ -11,4 +15,4 @@ for model in models:
     print(f"\n--- Running orchestrator with model: {model} ---")
     env = os.environ.copy()
     env["LLM_MODEL"] = model
-    subprocess.run(["python", "predict.py", "sample_ci_logs.txt"], env=env)
+    subprocess.run([sys.executable, os.path.join(ROOT, "predict.py"), SAMPLE_LOG], env=env, cwd=ROOT)
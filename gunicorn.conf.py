@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration for serving serve.py in production
+
+Run with: gunicorn -c gunicorn.conf.py serve:app
+
+The app is preloaded: serve.py is imported once in the master, so litellm,
+monocle, the agents, the QAOpsPredictor and the warmed LLM clients are built
+before the workers fork and their memory is shared copy-on-write. No LLM
+request is made before forking, so no pooled connection is shared between
+workers. Each worker runs WEB_THREADS threads (gthread workers), so a worker
+keeps serving while some of its requests wait on the LLM.
+
+Signals (sent to the master):
+  HUP          re-read this file and gracefully replace every worker
+  TTIN / TTOU  add / remove one worker
+  USR2, WINCH  start a new master with the new code, then drain the old
+               workers; QUIT the old master once the new one is healthy.
+               With preload_app, code changes need this path since HUP
+               re-forks from the already-loaded master.
+  TERM         graceful shutdown (waits up to WEB_GRACEFUL_TIMEOUT seconds)
+"""
+
+import gc
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '9696')}"
+workers = int(os.environ.get("WEB_WORKERS") or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get("WEB_THREADS", "4"))
+worker_class = "gthread"
+preload_app = os.environ.get("WEB_PRELOAD", "true").lower() == "true"
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", "5"))
+# Recycle workers after this many requests (0 disables), jittered so they
+# don't all restart together.
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get("WEB_ACCESS_LOG") or None
+
+# Workers write their metrics here and GET /metrics merges them, so any
+# worker answering a scrape reports the whole server. Scrape it like a
+# single process; counters survive worker restarts until the server restarts.
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"qaops-metrics-{bind.rsplit(':', 1)[-1]}"))
+
+
+def when_ready(server):
+    # Counts from a previous run of the server start over. The master serves
+    # no requests, so it reports nothing itself.
+    if "utils.metrics" in sys.modules:
+        sys.modules["utils.metrics"].registry.forget_process()
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, "*.json*")):
+            os.remove(path)
+
+    # The preloaded app now lives in the master. Freezing it moves those
+    # objects out of the collector's reach, so garbage collection in the
+    # workers does not write to (and un-share) their pages.
+    gc.freeze()
@@ -1,4 +1,18 @@
-from .agentcore_integration import AgentCoreIntegration
-from .okahu_integration import OkahuTracer, tracer
+import importlib
 
-__all__ = ['AgentCoreIntegration', 'OkahuTracer', 'tracer']
\ No newline at end of file
+_EXPORTS = {
+    'AgentCoreIntegration': '.agentcore_integration',
+    'OkahuTracer': '.okahu_integration',
+    'tracer': '.okahu_integration',
+}
+
+__all__ = ['AgentCoreIntegration', 'OkahuTracer', 'tracer']
+
+
+def __getattr__(name):
+    # Integrations are imported on first access so importing the package stays cheap.
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,13 +1,20 @@
 """AWS AgentCore Integration for QAOps Orchestrator"""
 import os
-import boto3
 from typing import Dict, Any
 
 class AgentCoreIntegration:
     def __init__(self):
-        self.client = boto3.client('bedrock-agentcore-runtime')
+        self._client = None
         self.runtime_id = os.getenv('AGENTCORE_RUNTIME_ID')
     
+    @property
+    def client(self):
+        """boto3 client, created on first use (importing boto3 is slow)"""
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('bedrock-agentcore-runtime')
+        return self._client
+    
     def invoke_agent(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         response = self.client.invoke_runtime(
             runtimeId=self.runtime_id,
@@ -1,12 +1,16 @@
 from adk import AgentOrchestrator, Message
 from agents import TestDiagnosticsAgent, RootCauseAnalyzerAgent, ActionPlannerAgent
-from utils.logger import setup_logger
-from utils.telemetry import init_telemetry
-from utils.memory_handler import update_memory
+from utils.logger import correlation_scope, get_logger
+from observability import init_telemetry
+from opentelemetry import trace
+from utils.memory_handler import update_memory_batch
+from utils.fingerprint import normalize_failure
 from flask import Flask
 
-logger = setup_logger(__name__)
-tracer, meter = init_telemetry()
+logger = get_logger(__name__)
+# Same telemetry setup as predict.py/serve.py (spans are exported off-thread)
+init_telemetry("multiagent-orchestrator")
+tracer = trace.get_tracer(__name__)
 app = Flask(__name__)
 
 def run_qaops_pipeline(ci_logs: str):
@@ -21,7 +25,7 @@ def run_qaops_pipeline(ci_logs: str):
         - RootCauseAnalyzerAgent ("RootCause") for root cause analysis of detected issues.
         - ActionPlannerAgent ("ActionPlanner") for remediation planning and recommended actions.
     - Sends an initial system message containing the provided CI logs to kick off the pipeline.
-    - Persists recurring failure signals by calling `update_memory` for each identified failed test.
+    - Persists recurring failure signals by calling `update_memory_batch` with the identified failed tests.
 
     Parameters:
     - ci_logs (str): Raw CI pipeline logs (e.g., build, test, runner output) used as input for diagnostics.
@@ -36,7 +40,8 @@ def run_qaops_pipeline(ci_logs: str):
     Side Effects:
     - Emits logs via the module-level `logger`.
     - Creates an OpenTelemetry span for distributed tracing.
-    - Calls `update_memory(test)` for each detected recurring failed test to update long-term memory.
+    - Calls `update_memory_batch` once with the normalized failed tests, so recurring failures that differ
+        only in timestamps, durations or addresses share one memory key.
 
     Notes:
     - Expects the orchestrator and agents to adhere to a message-passing interface where `content`
@@ -44,7 +49,7 @@ def run_qaops_pipeline(ci_logs: str):
     - The presence of the "failed_tests" key in `result.content` triggers memory updates for those tests.
     """
     try:
-        with tracer.start_as_current_span("qaops_pipeline"):
+        with correlation_scope(), tracer.start_as_current_span("qaops_pipeline"):
             logger.info("Starting QA triage pipeline")
             # Initialize agents
             orchestrator = AgentOrchestrator(agents=[
@@ -61,12 +66,14 @@ def run_qaops_pipeline(ci_logs: str):
             result = orchestrator.start(initial_message)
             # Update memory for recurring issues
             if "failed_tests" in result.content:
-                for test in result.content["failed_tests"]:
-                    update_memory(test)
-            logger.info(f"Pipeline completed: {result.content}")
+                update_memory_batch(normalize_failure(test) for test in result.content["failed_tests"])
+            content = result.content if isinstance(result.content, dict) else {}
+            logger.info("Pipeline completed: %d failed tests, signature %s",
+                        len(content.get("failed_tests", [])), content.get("signature", "-"))
+            logger.debug("Pipeline result: %s", result.content)
             return result
     except Exception as e:
-        logger.error(f"Pipeline error: {e}")
+        logger.error("Pipeline error: %s", e)
         raise
 
 if __name__ == "__main__":
@@ -5,18 +5,112 @@ Telemetry is initialized ONCE per process via init_telemetry().
 Agent modules should only emit spans/traces and MUST NOT initialize telemetry.
 """
 
-from monocle_apptrace import setup_monocle_telemetry
+import logging
+
+logger = logging.getLogger("Observability")
 
 _initialized = False
 
+def _skip_streamed(wrapper):
+    """
+    Bypass monocle's werkzeug Response wrapper for streamed responses.
+
+    To record the response body it reads ``Response.data``, which drains a
+    streaming response: the client would get an empty body, and only after
+    the whole stream (e.g. a server-sent event feed) had been generated.
+    """
+    def guarded(wrapped, instance, args, kwargs):
+        if getattr(instance, "is_streamed", False):
+            return wrapped(*args, **kwargs)
+        return wrapper(wrapped, instance, args, kwargs)
+    return guarded
+
+def _wrap_on_import(module: str, name: str, wrapper) -> None:
+    """Apply a monocle wrapper when ``module`` is imported (at once if it already is)."""
+    import wrapt
+
+    if (module, name) == ("werkzeug.wrappers.response", "Response.__call__"):
+        wrapper = _skip_streamed(wrapper)
+
+    def hook(mod):
+        try:
+            wrapt.wrap_function_wrapper(mod, name, wrapper)
+        except Exception as e:
+            logger.debug(f"Could not instrument {module}.{name}: {e}")
+
+    wrapt.register_post_import_hook(hook, module)
+
+def _span_pipeline():
+    """Build the span processor chain: tail sampling, then the bounded export buffer."""
+    from utils.config import (
+        TRACE_BUFFER_SPANS, TRACE_EXPORT_BATCH_SIZE, TRACE_EXPORT_INTERVAL_SECONDS, TRACE_EXPORTERS,
+        TRACE_FILE_PATH, TRACE_SLOW_SECONDS, TRACE_TAIL_SAMPLE_RATIO,
+    )
+    from utils.metrics import registry
+    from utils.telemetry import SpanExportBuffer, TailSampler, build_exporters
+
+    buffer = SpanExportBuffer(
+        build_exporters(TRACE_EXPORTERS, TRACE_FILE_PATH),
+        max_spans=TRACE_BUFFER_SPANS,
+        batch_size=TRACE_EXPORT_BATCH_SIZE,
+        interval_seconds=TRACE_EXPORT_INTERVAL_SECONDS,
+    )
+    sampler = TailSampler(buffer, ratio=TRACE_TAIL_SAMPLE_RATIO, slow_seconds=TRACE_SLOW_SECONDS,
+                          max_spans=TRACE_BUFFER_SPANS)
+    registry.register_stats("qaops_trace_export", buffer.stats,
+                            counters=("queued", "dropped", "exported", "batches", "export_errors"),
+                            documentation="Span export buffer")
+    registry.register_stats("qaops_trace_sampling", sampler.stats,
+                            counters=("traces_kept", "traces_dropped", "spans_dropped"),
+                            documentation="Tail sampling")
+    return sampler
+
 def init_telemetry(workflow_name: str):
+    """
+    Set up tracing for this process; the single telemetry entry point.
+
+    Spans go through one pipeline (see utils/telemetry.py): head sampling
+    (TRACE_SAMPLE_RATIO) when a trace starts, tail sampling
+    (TRACE_TAIL_SAMPLE_RATIO, always keeping errors and traces slower than
+    TRACE_SLOW_SECONDS) when it ends, then a bounded buffer exported by a
+    background thread to TRACE_EXPORTERS. A request never waits on an
+    exporter; when the buffer is full, spans are dropped and counted.
+
+    Monocle instruments ~170 library methods and by default imports every
+    installed library to do so (litellm alone takes seconds). Here each
+    method is instrumented by an import hook instead, so a library is only
+    loaded, and then wrapped, when the application first imports it.
+    """
     global _initialized
     if _initialized:
         return
 
-    setup_monocle_telemetry(workflow_name=workflow_name)
-    _initialized = True
+    from monocle_apptrace import setup_monocle_telemetry
+    span_processors = [_span_pipeline()]
+    try:
+        from monocle_apptrace.instrumentation.common import instrumentor
+        eager_wrap = instrumentor.wrap_function_wrapper
+    except (ImportError, AttributeError):
+        setup_monocle_telemetry(workflow_name=workflow_name, span_processors=span_processors)
+    else:
+        instrumentor.wrap_function_wrapper = _wrap_on_import
+        try:
+            setup_monocle_telemetry(workflow_name=workflow_name, span_processors=span_processors)
+        finally:
+            instrumentor.wrap_function_wrapper = eager_wrap
 
+    from opentelemetry import trace
+    from utils.config import TRACE_SAMPLE_RATIO
+    from utils.telemetry import head_sampler
+    sampler = head_sampler(TRACE_SAMPLE_RATIO)
+    provider = trace.get_tracer_provider()
+    if sampler is not None and hasattr(provider, "sampler"):
+        # Read by the SDK whenever a tracer is created (module-level proxies
+        # resolve on first use); tracers monocle already created are updated
+        provider.sampler = sampler
+        for tracer in list(getattr(provider, "_tracers", {}).values()):
+            tracer.sampler = sampler
+    _initialized = True
 
 if __name__ == "__main__":
     print("Initializing telemetry...")
@@ -8,24 +8,54 @@ Loads trained agents and runs inference
 from dotenv import load_dotenv
 load_dotenv()
 
-# Telemetry is initialized ONCE at the entry point.
-# Agent modules should only emit spans/traces.
-from observability import init_telemetry
-init_telemetry("multiagent-orchestrator")
-
 import json
+import os
+import time
+from collections import Counter, deque
 from pathlib import Path
+from typing import Iterable, Iterator
 
 from adk import Message
 from agents.test_diagnostics_agent import TestDiagnosticsAgent
 from agents.root_cause_agent import RootCauseAnalyzerAgent
 from agents.action_planner_agent import ActionPlannerAgent
-from utils.logger import get_logger
+from utils.fingerprint import failure_signature, fingerprint, get_failure_index
+from utils.log_stream import find_log_files
+from utils.logger import correlation_scope, get_logger
+from utils.metrics import registry
+from utils.process_pool import get_process_pool
+from utils.single_flight import SingleFlight
+
+agent_seconds = registry.histogram("qaops_agent_seconds", "Agent processing latency", ("agent",))
+predict_seconds = registry.histogram("qaops_predict_seconds", "End-to-end prediction latency", ("mode", "status"))
+analyses_total = registry.counter("qaops_analyses_total", "Predictions by root-cause analysis source", ("source",))
+memory_seconds = registry.histogram("qaops_memory_store_seconds", "Memory store operation latency",
+                                    ("store", "operation"))
+
+_worker_diagnostics = None
+
+def _diagnose(ci_logs, correlation_id: str = None) -> dict:
+    """Process-pool worker: run diagnostics on one log and return the message content"""
+    global _worker_diagnostics
+    if _worker_diagnostics is None:
+        _worker_diagnostics = TestDiagnosticsAgent("TestDiagnostics")
+    with correlation_scope(correlation_id):
+        return _worker_diagnostics.process(Message("Input", "TestDiagnostics", ci_logs)).content
+
+def _job_fields(job: dict, index: int):
+    """Accept {"job_id"|"request_id"|"id", "ci_logs"|"logs"|"body"} batch records"""
+    job_id = job.get("job_id", job.get("request_id", job.get("id", index)))
+    ci_logs = job.get("ci_logs", job.get("logs", job.get("body")))
+    return job_id, ci_logs
+
 class QAOpsPredictor:
     def __init__(self, model_path="models"):
         self.logger = get_logger("QAOpsPredictor")
         self.model_path = Path(model_path)
         self.agents = self._initialize_agents()
+        self.failure_index = get_failure_index()
+        # Concurrent requests with the same failure signature share one RCA/action run
+        self.coalescer = SingleFlight()
         # Removed LLM agent selection as per new architecture
     
     def _select_llm_agent(self):
@@ -43,59 +73,328 @@ class QAOpsPredictor:
         self.logger.info("Agents initialized successfully")
         return agents
     
-    def predict(self, ci_logs: str) -> dict:
+    def predict(self, ci_logs) -> dict:
         """
         Run full QAOps pipeline prediction
         
         Args:
-            ci_logs: Raw CI/CD logs as string
+            ci_logs: Raw CI/CD logs as a string or bytes, a file object / chunk
+                iterable that diagnostics reads incrementally, or a pathlib.Path
+                to a log file
             
         Returns:
-            dict: Prediction results with analysis and remediation plan
+            dict: Prediction results with analysis and remediation plan. If an
+                identical failure signature is already being analyzed, the
+                call waits for that run and shares it ("coalesced": true).
+        
+        Every agent logs under the caller's correlation ID, or a new one if
+        none is bound (see utils.logger.correlation_scope).
         """
+        with correlation_scope():
+            return self._predict(ci_logs)
+
+    def _predict(self, ci_logs) -> dict:
+        """predict, inside the request's correlation scope"""
+        started = time.perf_counter()
         try:
             # Step 1: Diagnostics
             diag_message = Message("Input", "TestDiagnostics", ci_logs)
-            diag_result = self.agents['diagnostics'].process(diag_message)
+            with agent_seconds.time(agent="diagnostics"):
+                diag_result = self.agents['diagnostics'].process(diag_message)
             
-            # Step 2: Root Cause Analysis
-            rca_result = self.agents['root_cause'].process(diag_result)
+            # Steps 2-3: Root Cause Analysis and Action Planning, once per
+            # in-flight failure signature
+            signature = failure_signature(diag_result.content.get("failed_tests", []))
+            (rca_result, action_result), coalesced = self.coalescer.do(
+                signature, lambda: self._analyze(diag_result)
+            )
             
-            # Step 3: Action Planning
-            action_result = self.agents['action_planner'].process(rca_result)
+            self._remember(diag_result, rca_result)
+            prediction = {"signature": signature, "coalesced": coalesced,
+                          **self._combine(diag_result, rca_result, action_result)}
             
-            # Combine results
-            prediction = {
-                "failed_tests": diag_result.content.get("failed_tests", []),
-                "analysis": rca_result.content.get("analysis", ""),
-                "remediation_plan": action_result.content.get("plan", ""),
-                "ticket_url": action_result.content.get("ticket", ""),
-                "confidence": 0.85,
-                "status": "success"
-            }
+        except Exception as e:
+            prediction = self._error(e)
+        predict_seconds.observe(time.perf_counter() - started, mode="sync", status=prediction["status"])
+        return prediction
+    
+    def predict_stream(self, ci_logs) -> Iterator[dict]:
+        """
+        Run the pipeline, yielding {"event", "data"} records as results become available
+        
+        Events, in order: "diagnostics" (failed tests and signature), one
+        "analysis" per chunk of RCA text as the LLM streams it, then "result"
+        with the same payload as predict, or "error". Streamed calls are not
+        coalesced, since each caller needs its own token stream.
+        
+        Args:
+            ci_logs: Same as for predict
+        """
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with agent_seconds.time(agent="diagnostics"):
+                diag_result = self.agents['diagnostics'].process(Message("Input", "TestDiagnostics", ci_logs))
+            failed_tests = diag_result.content.get("failed_tests", [])
+            signature = failure_signature(failed_tests)
+            yield {"event": "diagnostics", "data": {"signature": signature, "failed_tests": failed_tests}}
             
-            self.logger.info("Prediction completed successfully")
-            return prediction
+            stream = self.agents['root_cause'].stream(diag_result)
+            # Includes the time the client takes to read each chunk
+            rca_started = time.perf_counter()
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as done:
+                    rca_result = done.value
+                    break
+                yield {"event": "analysis", "data": {"text": chunk}}
+            agent_seconds.observe(time.perf_counter() - rca_started, agent="root_cause")
+            with agent_seconds.time(agent="action_planner"):
+                action_result = self.agents['action_planner'].process(rca_result)
             
+            self._remember(diag_result, rca_result)
+            result = {"signature": signature, "coalesced": False,
+                      **self._combine(diag_result, rca_result, action_result)}
+            status = "success"
+            yield {"event": "result", "data": result}
         except Exception as e:
-            self.logger.error(f"Prediction failed: {e}")
-            return {
-                "status": "error",
-                "error": str(e),
-                "confidence": 0.0
-            }
+            yield {"event": "error", "data": self._error(e)}
+        finally:
+            predict_seconds.observe(time.perf_counter() - started, mode="stream", status=status)
+    
+    def predict_path(self, path: str) -> Iterator[dict]:
+        """
+        Triage a log file, or every file under a directory, yielding one result per file
+        
+        Plain files are memory-mapped and scanned in place, split across
+        processes when large (see TestDiagnosticsAgent.process_file); gzip/zstd
+        archives are decompressed as a stream. Neither is loaded into a Python string.
+        
+        Args:
+            path: Log file or directory (searched recursively)
+        """
+        for log_path in find_log_files(path):
+            yield {"path": log_path, **self.predict(Path(log_path))}
+    
+    def predict_batch(self, jobs: Iterable[dict], processes: int = None) -> Iterator[dict]:
+        """
+        Triage many CI logs at once, yielding one result per job as it completes
+        
+        Diagnostics run across a process pool. Jobs whose failures share a
+        signature share a single RCA/action-planning call, so N jobs broken by
+        the same failure cost one LLM round trip. A final {"summary": ...}
+        record reports job and signature counts and how each signature was
+        analyzed ("llm" includes answers from the LLM response cache).
+        
+        Jobs are read from the iterable as the pool frees up, so only a few
+        logs per worker process are held in memory at a time.
+        
+        Args:
+            jobs: Dicts with a "job_id" and "ci_logs" (see _job_fields for aliases)
+            processes: Diagnostics worker processes (default: CPU count)
+        """
+        analyses = {}
+        failures = {}
+        errors = 0
+        count = 0
+        # Each job logs under its job_id, in the diagnostics workers too
+        jobs = (_job_fields(job, index) for index, job in enumerate(jobs))
+        for job_id, diagnosis in self._diagnose_batch(jobs, processes):
+            count += 1
+            if isinstance(diagnosis, Exception):
+                errors += 1
+                yield {"job_id": job_id, **self._error(diagnosis)}
+                continue
+            failed_tests = diagnosis.get("failed_tests", [])
+            # Counted by fingerprint, so repeats differing only in timestamps, ids etc. count once
+            fingerprints = {record["signature"] for record in diagnosis.get("failures", [])}
+            for key in fingerprints or {fingerprint(test) for test in failed_tests}:
+                failures[key] = failures.get(key, 0) + 1
+            signature = failure_signature(failed_tests)
+            coalesced = signature in analyses
+            diag_result = Message("TestDiagnostics", "RootCauseAnalyzerAgent", diagnosis)
+            with correlation_scope(str(job_id)):
+                try:
+                    if not coalesced:
+                        analyses[signature] = self._analyze(diag_result)
+                    rca_result, action_result = analyses[signature]
+                    self._remember(diag_result, rca_result)
+                    prediction = self._combine(diag_result, rca_result, action_result)
+                except Exception as e:
+                    errors += 1
+                    prediction = self._error(e)
+            yield {"job_id": job_id, "signature": signature, "coalesced": coalesced, **prediction}
+        sources = Counter(rca_result.content.get("analysis_source", "llm") for rca_result, _ in analyses.values())
+        yield {"summary": {
+            "jobs": count,
+            "errors": errors,
+            "unique_failures": len(failures),
+            "unique_signatures": len(analyses),
+            "analysis_sources": dict(sources),
+        }}
+    
+    def _diagnose_batch(self, jobs: Iterable, processes: int = None) -> Iterator:
+        """
+        Run diagnostics over (job_id, ci_logs) pairs, yielding (job_id, content or
+        exception) in order; in the shared process pool unless processes is 1,
+        with at most two jobs per worker submitted ahead
+        """
+        processes = processes or os.cpu_count() or 1
+        if processes <= 1:
+            for job_id, ci_logs in jobs:
+                try:
+                    yield job_id, _diagnose(ci_logs, str(job_id))
+                except Exception as e:
+                    yield job_id, e
+            return
+        pool = get_process_pool(processes)
+        window = deque()
+        
+        def collect():
+            job_id, future = window.popleft()
+            try:
+                return job_id, future.result()
+            except Exception as e:
+                return job_id, e
+        
+        try:
+            for job_id, ci_logs in jobs:
+                window.append((job_id, pool.submit(_diagnose, ci_logs, str(job_id))))
+                if len(window) >= 2 * processes:
+                    yield collect()
+            while window:
+                yield collect()
+        finally:
+            # The caller stopped early (e.g. the client disconnected)
+            for _, future in window:
+                future.cancel()
+    
+    def _analyze(self, diag_result):
+        """Run root cause analysis and action planning for one diagnostics result"""
+        with agent_seconds.time(agent="root_cause"):
+            rca_result = self.agents['root_cause'].process(diag_result)
+        with agent_seconds.time(agent="action_planner"):
+            action_result = self.agents['action_planner'].process(rca_result)
+        return rca_result, action_result
+    
+    async def _aanalyze(self, diag_result):
+        """Async variant of _analyze"""
+        with agent_seconds.time(agent="root_cause"):
+            rca_result = await self.agents['root_cause'].aprocess(diag_result)
+        with agent_seconds.time(agent="action_planner"):
+            action_result = await self.agents['action_planner'].aprocess(rca_result)
+        return rca_result, action_result
+    
+    async def apredict(self, ci_logs) -> dict:
+        """
+        Async variant of predict for use on an event loop (see asgi.py)
+        
+        Each stage is awaited, so while one pipeline waits on the LLM the
+        loop keeps other pipelines moving.
+        """
+        with correlation_scope():
+            return await self._apredict(ci_logs)
+
+    async def _apredict(self, ci_logs) -> dict:
+        """apredict, inside the request's correlation scope"""
+        started = time.perf_counter()
+        try:
+            diag_message = Message("Input", "TestDiagnostics", ci_logs)
+            with agent_seconds.time(agent="diagnostics"):
+                diag_result = await self.agents['diagnostics'].aprocess(diag_message)
+            signature = failure_signature(diag_result.content.get("failed_tests", []))
+            (rca_result, action_result), coalesced = await self.coalescer.ado(
+                signature, lambda: self._aanalyze(diag_result)
+            )
+            self._remember(diag_result, rca_result)
+            prediction = {"signature": signature, "coalesced": coalesced,
+                          **self._combine(diag_result, rca_result, action_result)}
+            
+        except Exception as e:
+            prediction = self._error(e)
+        predict_seconds.observe(time.perf_counter() - started, mode="async", status=prediction["status"])
+        return prediction
+    
+    def _remember(self, diag_result, rca_result) -> None:
+        """Record the job's failure signatures and their latest RCA in the fingerprint index"""
+        with memory_seconds.time(store="fingerprint_index", operation="record_failures"):
+            signatures = self.failure_index.record_failures(diag_result.content.get("failures", []))
+        with memory_seconds.time(store="fingerprint_index", operation="set_rca"):
+            self.failure_index.set_rca(signatures, rca_result.content.get("analysis", ""))
+    
+    def _combine(self, diag_result, rca_result, action_result) -> dict:
+        """Combine stage outputs into the prediction payload"""
+        prediction = {
+            "failed_tests": diag_result.content.get("failed_tests", []),
+            "analysis": rca_result.content.get("analysis", ""),
+            "remediation_plan": action_result.content.get("plan", ""),
+            "ticket_url": action_result.content.get("ticket", ""),
+            "ticket_status": action_result.content.get("ticket_status", ""),
+            # Failure-category probability from the local classifier (None
+            # until one is trained); "classifier" and "similar" answers skipped the LLM
+            "category": rca_result.content.get("category"),
+            "confidence": rca_result.content.get("confidence"),
+            "analysis_source": rca_result.content.get("analysis_source", "llm"),
+            "similar_incidents": rca_result.content.get("similar_incidents", []),
+            "status": "success"
+        }
+        
+        analyses_total.inc(source=prediction["analysis_source"])
+        self.logger.info("Prediction completed successfully")
+        return prediction
+    
+    def _error(self, e: Exception) -> dict:
+        self.logger.error("Prediction failed: %s", e)
+        return {
+            "status": "error",
+            "error": str(e),
+            "confidence": 0.0
+        }
 
 def main():
     """CLI interface for predictions"""
+    import argparse
     import sys
     
-    if len(sys.argv) < 2:
-        print("Usage: python predict.py '<ci_logs>'")
+    parser = argparse.ArgumentParser(
+        description="QAOps prediction CLI",
+        usage="python predict.py '<ci_logs>' | python predict.py <log file|dir> | python predict.py --batch <jobs.jsonl|->"
+    )
+    parser.add_argument("ci_logs", nargs="?",
+                        help="Raw CI/CD log content, or a log file/directory (plain, .gz or .zst) to read from disk")
+    parser.add_argument("--batch", metavar="JSONL",
+                        help="JSONL file of {\"job_id\", \"ci_logs\"} records ('-' for stdin); results stream as NDJSON")
+    parser.add_argument("--processes", type=int, default=None, help="Diagnostics worker processes for --batch")
+    args = parser.parse_args()
+    
+    if not args.ci_logs and not args.batch:
+        parser.print_usage()
         sys.exit(1)
     
+    # Telemetry is initialized ONCE at the entry point (here, not on import,
+    # so importing QAOpsPredictor from serve.py/asgi.py stays cheap).
+    # Agent modules should only emit spans/traces.
+    from observability import init_telemetry
+    init_telemetry("multiagent-orchestrator")
+    
     predictor = QAOpsPredictor()
-    logs = sys.argv[1]
-    result = predictor.predict(logs)
+    if args.batch:
+        stream = sys.stdin if args.batch == "-" else open(args.batch)
+        with stream:
+            jobs = (json.loads(line) for line in stream if line.strip())
+            for result in predictor.predict_batch(jobs, processes=args.processes):
+                print(json.dumps(result), flush=True)
+        return
+    
+    if os.path.isdir(args.ci_logs):
+        for result in predictor.predict_path(args.ci_logs):
+            print(json.dumps(result), flush=True)
+        return
+    if os.path.isfile(args.ci_logs):
+        result = next(predictor.predict_path(args.ci_logs))
+    else:
+        result = predictor.predict(args.ci_logs)
     
     print(json.dumps(result, indent=2))
 
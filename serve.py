@@ -2,6 +2,10 @@
 """
 Flask web service for QAOps Multi-Agent System
 Provides REST API endpoints for CI/CD failure analysis
+
+Development: python serve.py
+Production:  gunicorn -c gunicorn.conf.py serve:app
+             (preforked workers sharing the preloaded predictor; see gunicorn.conf.py)
 """
 
 from dotenv import load_dotenv
@@ -13,9 +17,20 @@ import os
 from observability import init_telemetry
 init_telemetry("multiagent-orchestrator")
 
-from flask import Flask, request, jsonify
+import functools
+import itertools
+import json
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from predict import QAOpsPredictor
-from utils.logger import get_logger
+from utils.config import (JOBS_DB_PATH, JOB_LEASE_SECONDS, JOB_MAX_PENDING, JOB_RETENTION_SECONDS, JOB_WORKERS,
+                          METRICS_DIR, METRICS_FLUSH_SECONDS)
+from utils.job_queue import FINISHED, JobQueue, QueueFull
+from utils.llm_factory import llm_limits, warm_llm_clients
+from utils.log_stream import DEFAULT_CHUNK_SIZE
+from utils.logger import (correlation_scope, get_correlation_id, get_logger, logging_stats, reset_correlation_id,
+                          set_correlation_id)
+from utils.metrics import CONTENT_TYPE, registry
+from utils.serialization import dumps
 
 app = Flask(__name__)
 logger = get_logger("QAOpsAPI")
@@ -23,32 +38,121 @@ logger = get_logger("QAOpsAPI")
 # Initialize predictor
 try:
     predictor = QAOpsPredictor()
+    warm_llm_clients()
     logger.info("QAOps predictor initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize predictor: {e}")
     predictor = None
 
+# Background jobs for POST /jobs; workers start on first use in each process
+jobs = JobQueue(
+    JOBS_DB_PATH,
+    lambda ci_logs: predictor.predict(ci_logs),
+    concurrency=JOB_WORKERS,
+    max_pending=JOB_MAX_PENDING,
+    retention_seconds=JOB_RETENTION_SECONDS,
+    lease_seconds=JOB_LEASE_SECONDS,
+) if predictor else None
+
+# Read at scrape time by GET /metrics (LLM cache and limiter register themselves);
+# with METRICS_DIR set, every worker's metrics are merged into each scrape
+if METRICS_DIR:
+    registry.share(METRICS_DIR, METRICS_FLUSH_SECONDS)
+if predictor:
+    registry.register_stats("qaops_coalescing", predictor.coalescer.stats,
+                            counters=("calls", "executions", "coalesced"), documentation="Request coalescing")
+    registry.register_stats("qaops_tickets", predictor.agents['action_planner'].tickets.stats,
+                            counters=("submitted", "created", "commented", "retries", "failed"),
+                            documentation="Ticket manager")
+if jobs:
+    registry.register_stats("qaops_jobs", jobs.stats, documentation="Background jobs")
+registry.register_stats("qaops_logging", logging_stats, counters=("dropped", "suppressed"), documentation="Log records")
+
+# Bodies streamed through diagnostics as a raw log; anything else must be JSON {"ci_logs": ...}
+RAW_LOG_TYPES = ("text/plain", "application/octet-stream")
+
+@app.before_request
+def bind_correlation_id():
+    """Log the request under the caller's X-Correlation-ID, or a new one"""
+    g.correlation_token = set_correlation_id(request.headers.get("X-Correlation-ID", "")[:128] or None)
+
+@app.after_request
+def echo_correlation_id(response):
+    response.headers["X-Correlation-ID"] = get_correlation_id() or ""
+    return response
+
+@app.teardown_request
+def unbind_correlation_id(exc):
+    # Worker threads serve many requests; don't leak this ID into the next
+    token = g.pop("correlation_token", None)
+    if token is not None:
+        reset_correlation_id(token)
+
+def _raw_log_body():
+    """
+    The body of a text/plain or application/octet-stream request as an
+    iterator of chunks, read lazily. Returns None for other content types
+    and for a blank body (only the leading whitespace is read to tell).
+    """
+    if request.mimetype not in RAW_LOG_TYPES:
+        return None
+    read = functools.partial(request.stream.read, DEFAULT_CHUNK_SIZE)
+    head = []
+    for chunk in iter(read, b""):
+        head.append(chunk)
+        if chunk.strip():
+            return itertools.chain(head, iter(read, b""))
+    return None
+
+def _keep_correlation_id(chunks):
+    """Bind the request's correlation ID while a streamed body is generated, after teardown"""
+    correlation_id = get_correlation_id()
+    def generate():
+        with correlation_scope(correlation_id):
+            yield from chunks
+    return generate()
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
         "service": "QAOps Multi-Agent Orchestrator",
-        "version": "1.0"
+        "version": "1.0",
+        "coalescing": predictor.coalescer.stats() if predictor else None,
+        "llm_limits": llm_limits.stats(),
+        "jobs": jobs.stats() if jobs else None
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics (text exposition format): all workers combined when
+    METRICS_DIR is set (the gunicorn default), else this worker process's
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
     Prediction endpoint
     Expects JSON: {"ci_logs": "log content here"}
+    or a raw text/plain (or application/octet-stream) body, optionally chunked,
+    that is streamed through diagnostics
     Returns: {"failed_tests": [...], "analysis": "...", "remediation_plan": "..."}
     """
     try:
         if not predictor:
             return jsonify({"error": "Predictor not initialized"}), 500
         
-        data = request.get_json()
+        if request.mimetype in RAW_LOG_TYPES:
+            body = _raw_log_body()
+            if body is None:
+                return jsonify({"error": "Request body is empty"}), 400
+            result = predictor.predict(body)
+            return jsonify(result), 500 if result.get("status") == "error" else 200
+        
+        data = request.get_json(silent=True)
         if not data or 'ci_logs' not in data:
             return jsonify({
                 "error": "Missing 'ci_logs' field in request body"
@@ -69,12 +173,163 @@ def predict():
         return jsonify(result), 200
         
     except Exception as e:
-        logger.error(f"Prediction endpoint error: {e}")
+        logger.error("Prediction endpoint error: %s", e)
         return jsonify({
             "error": "Internal server error",
             "details": str(e)
         }), 500
 
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """
+    Streaming prediction endpoint (server-sent events)
+    Expects the same body as /predict
+    Returns: a "diagnostics" event, "analysis" events carrying the root-cause
+    text as the LLM generates it, then a "result" event with the /predict
+    payload (or an "error" event)
+    """
+    if not predictor:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    
+    if request.mimetype in RAW_LOG_TYPES:
+        ci_logs = _raw_log_body()
+        if ci_logs is None:
+            return jsonify({"error": "Request body is empty"}), 400
+    else:
+        data = request.get_json(silent=True)
+        ci_logs = data.get('ci_logs') if isinstance(data, dict) else None
+        if not isinstance(ci_logs, str) or not ci_logs.strip():
+            return jsonify({"error": "ci_logs must be a non-empty string"}), 400
+    
+    events = predictor.predict_stream(ci_logs)
+    return Response(
+        stream_with_context(_keep_correlation_id(f"event: {e['event']}\ndata: {dumps(e['data']).decode()}\n\n" for e in events)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Batch prediction endpoint
+    Expects JSON {"jobs": [{"job_id": ..., "ci_logs": "..."}, ...]} or an NDJSON body
+    with one job per line, read as the jobs are diagnosed
+    Returns: NDJSON, one prediction per job (jobs with the same failure signature
+    share one RCA call), followed by a {"summary": {...}} record; an invalid
+    NDJSON line ends the stream with an {"error": ...} record instead
+    """
+    if not predictor:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    
+    if request.is_json:
+        data = request.get_json()
+        jobs = data.get('jobs') if isinstance(data, dict) else None
+        if not isinstance(jobs, list):
+            return jsonify({"error": "Missing 'jobs' list in request body"}), 400
+    else:
+        jobs = (json.loads(line) for line in request.stream if line.strip())
+    
+    def results():
+        try:
+            for result in predictor.predict_batch(jobs):
+                yield dumps(result) + b"\n"
+        except ValueError as e:
+            yield dumps({"error": f"Invalid NDJSON body: {e}"}) + b"\n"
+    
+    return Response(stream_with_context(results()), mimetype="application/x-ndjson")
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Asynchronous prediction endpoint
+    Expects the same body as /predict (JSON {"ci_logs": ...} or raw text)
+    Returns: 202 {"job_id": "...", "status": "queued"} with a Location header;
+    503 with Retry-After when the queue is full
+    """
+    if not jobs:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    
+    if request.is_json:
+        data = request.get_json()
+        ci_logs = data.get('ci_logs') if isinstance(data, dict) else None
+    else:
+        ci_logs = request.get_data(as_text=True)
+    if not isinstance(ci_logs, str) or not ci_logs.strip():
+        return jsonify({"error": "ci_logs must be a non-empty string"}), 400
+    
+    try:
+        job_id = jobs.submit(ci_logs)
+    except QueueFull as e:
+        return jsonify({"error": "Job queue is full", "details": str(e)}), 503, {"Retry-After": "5"}
+    return jsonify({"job_id": job_id, "status": "queued"}), 202, {"Location": f"/jobs/{job_id}"}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Job status endpoint
+    Optional ?wait=<seconds> (at most 60) long-polls until the job finishes
+    Returns: {"id", "status", "result", "error", "created_at", "started_at", "finished_at"}
+    """
+    if not jobs:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    
+    wait = min(request.args.get('wait', 0, type=float), 60.0)
+    job = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-sent events for a job
+    Emits a "status" event on each status change and closes after the final
+    one (done or failed), which carries the result; comments keep idle
+    connections alive
+    """
+    if not jobs:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    
+    def events(job):
+        while True:
+            yield f"event: status\ndata: {dumps(job).decode()}\n\n"
+            if job["status"] in FINISHED:
+                return
+            status = job["status"]
+            while job is not None and job["status"] == status:
+                job = jobs.wait(job_id, 15, status=status)
+                if job is not None and job["status"] == status:
+                    yield ": keep-alive\n\n"
+            if job is None:
+                return
+    
+    return Response(
+        stream_with_context(events(job)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/diagnostics/stream', methods=['POST'])
+def diagnostics_stream():
+    """
+    Streaming diagnostics endpoint
+    Expects the raw log as the request body (plain or chunked transfer encoding)
+    Returns: NDJSON, one {"line_number", "line", "test_id", "severity", "category", "rule"}
+    record per failing line
+    """
+    if not predictor:
+        return jsonify({"error": "Predictor not initialized"}), 500
+    
+    diagnostics = predictor.agents['diagnostics']
+    records = diagnostics.stream(request.stream)
+    return Response(
+        stream_with_context(_keep_correlation_id(dumps(record) + b"\n" for record in records)),
+        mimetype="application/x-ndjson"
+    )
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint with API documentation"""
@@ -83,7 +338,14 @@ def root():
         "version": "1.0",
         "endpoints": {
             "GET /health": "Health check",
+            "GET /metrics": "Prometheus metrics (stage, LLM, cache, queue and memory-store latencies)",
             "POST /predict": "Analyze CI/CD logs and generate remediation plan",
+            "POST /predict/stream": "Same as /predict, streamed as server-sent events as the LLM responds",
+            "POST /predict/batch": "Triage many CI logs at once (NDJSON in/out, coalesced RCA)",
+            "POST /jobs": "Queue a prediction; returns a job id immediately",
+            "GET /jobs/<id>": "Job status and result (?wait=<seconds> to long-poll)",
+            "GET /jobs/<id>/events": "Job status changes as server-sent events",
+            "POST /diagnostics/stream": "Stream failed-test records (NDJSON) from a raw log body",
             "GET /": "This documentation"
         },
         "example_request": {
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import os
 import pytest
@@ -33,3 +34,65 @@ def test_action_planner_agent():
     result = agent.process(message)
     assert "plan" in result.content
     assert result.sender == "ActionPlanner"
+
+
+def test_test_diagnostics_agent_stream():
+    agent = TestDiagnosticsAgent(name="TestDiagnostics")
+    chunks = [b"[INFO] Build started\n[ERROR] test_lo", b"gin FAILED\n[INFO] Build ", b"finished\n"]
+    records = list(agent.stream(iter(chunks)))
+    assert len(records) == 1
+    assert records[0]["line_number"] == 2
+    assert records[0]["line"] == "[ERROR] test_login FAILED"
+    assert records[0]["test_id"] == "test_login"
+
+
+def test_agents_async_process():
+    diagnostics = TestDiagnosticsAgent(name="TestDiagnostics")
+    root_cause = RootCauseAnalyzerAgent(name="RootCause")
+    message = Message(sender="Test", receiver="TestDiagnostics", content="[ERROR] test_login FAILED")
+    diag_result = asyncio.run(diagnostics.aprocess(message))
+    rca_result = asyncio.run(root_cause.aprocess(diag_result))
+    assert diag_result.content["failed_tests"] == ["[ERROR] test_login FAILED"]
+    assert "analysis" in rca_result.content
+
+
+@pytest.mark.parametrize("llm_fails", [False, True])
+def test_root_cause_entry_points_agree(monkeypatch, llm_fails):
+    import agents.root_cause_agent as root_cause_agent
+
+    def run_llm(prompt, model):
+        if llm_fails:
+            raise ConnectionError("provider down")
+        return "Auth service overloaded"
+
+    async def arun_llm(prompt, model):
+        return run_llm(prompt, model)
+
+    def run_llm_stream(prompt, model):
+        yield from [run_llm(prompt, model)]
+
+    monkeypatch.setattr(root_cause_agent, "run_llm", run_llm)
+    monkeypatch.setattr(root_cause_agent, "arun_llm", arun_llm)
+    monkeypatch.setattr(root_cause_agent, "run_llm_stream", run_llm_stream)
+    content = {"failed_tests": ["[ERROR] test_login FAILED TimeoutError"], "log_tail": ""}
+
+    def drain(agent):
+        stream = agent.stream(Message("TestDiagnostics", "RootCause", content))
+        while True:
+            try:
+                next(stream)
+            except StopIteration as stop:
+                return stop.value
+
+    from utils.vector_index import VectorIndex
+    results = []
+    for call in (
+        lambda agent: agent.process(Message("TestDiagnostics", "RootCause", content)),
+        lambda agent: asyncio.run(agent.aprocess(Message("TestDiagnostics", "RootCause", content))),
+        drain,
+    ):
+        agent = RootCauseAnalyzerAgent("RootCause", classifier=None, similar_index=VectorIndex(dim=64))
+        results.append(call(agent).content)
+        # Only LLM analyses are added to the similar-incident index
+        assert len(agent.similar_index) == (0 if llm_fails else 1)
+    assert results[0] == results[1] == results[2]
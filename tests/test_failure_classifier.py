@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import agents.root_cause_agent as root_cause_agent
+from adk import Message
+from agents.root_cause_agent import RootCauseAnalyzerAgent
+from utils.failure_classifier import FailureClassifier, failure_text
+
+TEXTS = [
+    "[ERROR] test_login FAILED TimeoutError: request timed out after 30s",
+    "[ERROR] test_checkout FAILED TimeoutError: read timed out after 60s",
+    "[ERROR] test_search FAILED TimeoutError: timed out waiting for page",
+    "[ERROR] test_db FAILED ConnectionRefusedError: connection refused to db:5432",
+    "[ERROR] test_cache FAILED ConnectionRefusedError: connection refused to redis:6379",
+    "[ERROR] test_queue FAILED ConnectionRefusedError: connection refused to broker",
+]
+LABELS = ["timeout"] * 3 + ["connection"] * 3
+ANALYSES = {"timeout": "Slow dependency", "connection": "Service down"}
+
+
+def _model():
+    return FailureClassifier.fit(TEXTS, LABELS, ANALYSES)
+
+
+def test_fit_predicts_training_labels():
+    model = _model()
+    label, confidence = model.predict("[ERROR] test_profile FAILED TimeoutError: timed out after 45s")
+    assert label == "timeout"
+    assert confidence > 0.5
+    assert model.predict("connection refused to postgres")[0] == "connection"
+
+
+def test_unknown_text_has_zero_confidence():
+    assert _model().predict("zzz qqq")[1] == 0.0
+
+
+def test_save_load_round_trip(tmp_path):
+    model = _model()
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = FailureClassifier.load(path)
+    assert loaded.labels == model.labels
+    assert loaded.analyses == ANALYSES
+    assert (loaded.predict_proba(TEXTS) == model.predict_proba(TEXTS)).all()
+
+
+def test_failure_text_includes_frames():
+    content = {"failed_tests": ["[ERROR] a"], "failures": [{"frames": ["File x.py, line 1"]}]}
+    assert failure_text(content) == "[ERROR] a\nFile x.py, line 1"
+
+
+def test_confident_match_skips_llm(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("LLM called")
+
+    monkeypatch.setattr(root_cause_agent, "run_llm", fail)
+    agent = RootCauseAnalyzerAgent("RootCause", classifier=_model(), confidence_threshold=0.5)
+    content = {"failed_tests": ["[ERROR] test_x FAILED TimeoutError: timed out after 30s"], "log": ""}
+    result = agent.process(Message("TestDiagnostics", "RootCause", content)).content
+    assert result["analysis"] == "Slow dependency"
+    assert result["category"] == "timeout"
+    assert result["analysis_source"] == "classifier"
+    stream = agent.stream(Message("TestDiagnostics", "RootCause", content))
+    assert list(stream) == ["Slow dependency"]
+
+
+def test_low_confidence_goes_to_llm(monkeypatch):
+    monkeypatch.setattr(root_cause_agent, "run_llm", lambda prompt, model: "LLM analysis")
+    agent = RootCauseAnalyzerAgent("RootCause", classifier=_model(), confidence_threshold=1.01)
+    content = {"failed_tests": ["[ERROR] test_x FAILED TimeoutError: timed out after 30s"], "log": ""}
+    result = agent.process(Message("TestDiagnostics", "RootCause", content)).content
+    assert result["analysis"] == "LLM analysis"
+    assert result["category"] == "timeout"
+    assert result["analysis_source"] == "llm"
+
+
+def test_train_classifier_writes_model(tmp_path):
+    import train
+    output = tmp_path / "classifier.npz"
+    report = train.train_classifier(output_path=str(output))
+    assert output.exists()
+    assert report["accuracy"] > 0.7
+    assert FailureClassifier.load(str(output)).analyses
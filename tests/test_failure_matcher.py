@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.failure_matcher import FailureMatcher, FailureRule, extract_test_id, find_stack_frames
+
+
+def test_matcher_classifies_markers():
+    logs = (
+        "[INFO] Build started\n"
+        "tests/test_api.py::test_create FAILED\n"
+        "Traceback (most recent call last):\n"
+        "AssertionError: expected 200\n"
+        "<failure message=\"boom\"/>\n"
+        "[INFO] Build finished"
+    )
+    matches = list(FailureMatcher().scan(logs))
+    assert [m.line_number for m in matches] == [2, 3, 4, 5]
+    assert [m.category for m in matches] == ["test_failure", "exception", "assertion", "junit"]
+    assert matches[0].test_id == "tests/test_api.py::test_create"
+
+
+def test_matcher_keeps_line_numbers_across_blocks():
+    blocks = ["ok\nERROR one\n", "ok\n", "ok\nERROR two\n"]
+    matches = list(FailureMatcher().scan_blocks(blocks))
+    assert [(m.line_number, m.line) for m in matches] == [(2, "ERROR one"), (5, "ERROR two")]
+
+
+def test_matcher_custom_rules():
+    matcher = FailureMatcher([FailureRule("flaky", r"flaky", "flaky", "warning", ignore_case=True)])
+    matches = list(matcher.scan("ok\nFLAKY selector\nERROR ignored"))
+    assert len(matches) == 1
+    assert (matches[0].rule, matches[0].severity) == ("flaky", "warning")
+
+
+def test_extract_test_id_dotted_name():
+    line = "ERROR: Test failed: com.example.tests.TestLogin.testUserAuthentication"
+    assert extract_test_id(line) == "com.example.tests.TestLogin.testUserAuthentication"
+
+
+def test_scan_buffer_matches_text_scan():
+    logs = (
+        "[INFO] Build started\n"
+        "tests/test_api.py::test_create FAILED\n"
+        "café AssertionError: expected 200\n"
+        "\tat com.example.Api.create(Api.java:12)\n"
+        "[INFO] Build finished"
+    )
+    matcher = FailureMatcher()
+    assert list(matcher.scan_buffer(logs.encode("utf-8"))) == list(matcher.scan(logs))
+
+
+def test_scan_buffer_range_matches_scanning_the_slice():
+    logs = (
+        "tests/test_a.py::test_one FAILED\n"
+        "\tat com.example.A.run(A.java:1)\n"
+        "[INFO] between\n"
+        "tests/test_b.py::test_two FAILED\n"
+        "\tat com.example.B.run(B.java:2)\n"
+    ).encode("utf-8")
+    start = logs.index(b"[INFO]")
+    end = len(logs) - len(b"\tat com.example.B.run(B.java:2)\n")
+    matcher = FailureMatcher()
+    assert list(matcher.scan_buffer(logs, first_line=3, start=start, end=end)) == \
+        list(matcher.scan_buffer(logs[start:end], first_line=3))
+    frames = logs.index(b"\tat com.example.B")
+    assert list(find_stack_frames(logs, first_line=5, start=frames)) == [(5, "\tat com.example.B.run(B.java:2)")]
+    assert list(find_stack_frames(logs, start=0, end=frames)) == [(2, "\tat com.example.A.run(A.java:1)")]
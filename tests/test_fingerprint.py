@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.fingerprint import FingerprintIndex, fingerprint, normalize_failure
+
+
+def test_volatile_tokens_share_one_signature():
+    first = "2024-01-15 10:30:45 [ERROR] test_login FAILED after 1.23s at 0x7f3a2c in /tmp/pytest-12/run"
+    second = "2024-03-02 08:01:09 [ERROR] test_login FAILED after 45ms at 0x11ff00 in /tmp/pytest-98/run"
+    assert normalize_failure(first) == normalize_failure(second)
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint("2024-01-15 10:30:45 [ERROR] test_logout FAILED")
+
+
+def test_normalization_keeps_short_numbers():
+    line = 'File "app.py", line 42, in handler'
+    assert normalize_failure(line) == line
+
+
+def test_index_counts_and_seen_times():
+    index = FingerprintIndex()
+    sig = index.record("10:00:00 test_a FAILED after 3s", "test_a", now=100.0)
+    assert index.record("11:15:02 test_a FAILED after 9s", "test_a", now=250.0) == sig
+    index.record("test_b FAILED", "test_b", now=120.0)
+
+    record = index.get(sig)
+    assert record["count"] == 2
+    assert record["first_seen"] == 100.0
+    assert record["last_seen"] == 250.0
+    assert record["tests"] == ["test_a"]
+    assert len(index) == 2
+    assert [r["signature"] for r in index.by_test("test_a")] == [sig]
+    assert index.by_test("missing") == []
+
+
+def test_record_failures_and_rca():
+    index = FingerprintIndex()
+    signatures = index.record_failures([
+        {"line": "test_a FAILED id 123456", "test_id": "test_a"},
+        {"line": "test_a FAILED id 654321", "test_id": "test_a"},
+    ])
+    assert signatures[0] == signatures[1]
+    index.set_rca(signatures, "flaky network")
+    assert index.get(signatures[0])["last_rca"] == "flaky network"
+
+
+def test_workers_sharing_a_path_share_counts(tmp_path):
+    path = str(tmp_path / "fingerprints.db")
+    first, second = FingerprintIndex(path), FingerprintIndex(path)
+    sig = first.record("test_a FAILED", "test_a", now=1.0)
+    assert second.record("test_a FAILED", "test_b", now=2.0) == sig
+    second.set_rca([sig], "root cause")
+
+    record = FingerprintIndex(path).get(sig)
+    assert record["count"] == 2
+    assert record["tests"] == ["test_a", "test_b"]
+    assert record["last_rca"] == "root cause"
+    assert [r["signature"] for r in first.by_test("test_b")] == [sig]
+
+
+def test_legacy_json_index_is_imported(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    path.write_text(json.dumps([{
+        "signature": "abc", "normalized": "test_a FAILED", "tests": ["test_a"], "count": 3,
+        "first_seen": 1.0, "last_seen": 5.0, "last_rca": "root cause",
+    }]))
+    index = FingerprintIndex(str(path))
+    assert index.get("abc")["count"] == 3
+    assert index.by_test("test_a")[0]["last_rca"] == "root cause"
+    assert (tmp_path / "fingerprints.json.json.bak").exists()
+
+
+def test_old_and_excess_signatures_are_dropped():
+    index = FingerprintIndex(max_entries=2, ttl_seconds=100, prune_every=1)
+    old = index.record("test_old FAILED", "test_old", now=0.0)
+    index.record("test_a FAILED", "test_a", now=150.0)
+    assert index.get(old) is None and index.by_test("test_old") == []
+    index.record("test_b FAILED", now=160.0)
+    index.record("test_c FAILED", now=170.0)
+    assert len(index) == 2
+    assert index.by_test("test_a") == []
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Generous enough for a slow CI runner; an eager litellm/monocle import
+# alone costs several seconds.
+IMPORT_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ("litellm", "monocle_apptrace", "boto3", "google.genai")
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    # In-memory spans, so telemetry tests don't write trace files into the repo
+    env = dict(os.environ, LITELLM_LOCAL_MODEL_COST_MAP="True", MONOCLE_EXPORTER="memory")
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def test_predict_import_time_budget():
+    result = _run("import predict", "-X", "importtime")
+    line = [l for l in result.stderr.splitlines() if l.rstrip().endswith("| predict")][-1]
+    cumulative_us = int(line.split("|")[1])
+    assert cumulative_us / 1e6 < IMPORT_BUDGET_SECONDS, line
+
+
+def test_heavy_modules_load_lazily():
+    code = (
+        "import sys, predict, integrations\n"
+        "integrations.AgentCoreIntegration()\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert _run(code).stdout.strip() == ""
+
+
+def test_telemetry_instruments_libraries_on_import():
+    code = (
+        "import sys, observability\n"
+        "observability.init_telemetry('import-test')\n"
+        "assert 'litellm' not in sys.modules and 'google.genai' not in sys.modules\n"
+        "from google.genai import models\n"
+        "print(type(models.Models.__dict__['generate_content']).__name__)"
+    )
+    assert _run(code).stdout.strip().endswith("FunctionWrapper")
+
+
+def test_telemetry_keeps_streamed_flask_responses():
+    code = (
+        "import observability\n"
+        "observability.init_telemetry('stream-test')\n"
+        "from flask import Flask, Response\n"
+        "app = Flask('stream-test')\n"
+        "app.add_url_rule('/s', 's', lambda: Response(iter(['a', 'b'])))\n"
+        "app.add_url_rule('/b', 'b', lambda: 'buffered')\n"
+        "client = app.test_client()\n"
+        "print(client.get('/s').get_data(as_text=True), client.get('/b').get_data(as_text=True))"
+    )
+    assert _run(code).stdout.strip().endswith("ab buffered")
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.job_queue import JobQueue, QueueFull
+
+
+def test_job_runs_in_background_and_long_poll_returns_result(tmp_path):
+    release = threading.Event()
+
+    def handler(ci_logs):
+        release.wait(5)
+        return {"status": "success", "failed_tests": [ci_logs]}
+
+    queue = JobQueue(str(tmp_path / "jobs.db"), handler, concurrency=1, poll_interval=0.05)
+    job_id = queue.submit("[ERROR] test_login FAILED")
+    assert queue.get(job_id)["status"] in ("queued", "running")
+    assert queue.wait(job_id, 0.1)["status"] != "done"
+    release.set()
+    job = queue.wait(job_id, 5)
+    queue.stop()
+    assert job["status"] == "done"
+    assert job["result"]["failed_tests"] == ["[ERROR] test_login FAILED"]
+    assert queue.get("missing") is None
+
+
+def test_errors_mark_jobs_failed(tmp_path):
+    def handler(ci_logs):
+        if ci_logs == "raise":
+            raise RuntimeError("boom")
+        return {"status": "error", "error": "LLM down"}
+
+    queue = JobQueue(str(tmp_path / "jobs.db"), handler, poll_interval=0.05)
+    raised, errored = queue.submit("raise"), queue.submit("error")
+    assert queue.wait(raised, 5)["error"] == "boom"
+    job = queue.wait(errored, 5)
+    queue.stop()
+    assert (job["status"], job["error"]) == ("failed", "LLM down")
+    assert queue.stats()["failed"] == 2
+
+
+def test_backpressure_and_concurrency_limit(tmp_path):
+    release = threading.Event()
+    running, peak = [], []
+
+    def handler(ci_logs):
+        running.append(ci_logs)
+        peak.append(len(running))
+        release.wait(5)
+        running.remove(ci_logs)
+        return {"status": "success"}
+
+    queue = JobQueue(str(tmp_path / "jobs.db"), handler, concurrency=2, max_pending=3, poll_interval=0.05)
+    ids = [queue.submit(str(i)) for i in range(2)]
+    while queue.stats()["running"] < 2:
+        time.sleep(0.01)
+    ids += [queue.submit(str(i)) for i in range(2, 5)]
+    with pytest.raises(QueueFull):
+        queue.submit("overflow")
+    assert queue.get(ids[-1])["position"] == 2
+    release.set()
+    assert all(queue.wait(job_id, 5)["status"] == "done" for job_id in ids)
+    queue.stop()
+    assert max(peak) == 2
+
+
+def test_jobs_survive_restart_and_orphans_are_requeued(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first = JobQueue(path, lambda ci_logs: {"status": "success"}, concurrency=0)
+    queued = first.submit("queued before restart")
+    orphan = first.submit("running when its worker died")
+    leased = first.submit("running in a live process")
+    conn = first._connection()
+    with conn:
+        conn.execute("UPDATE jobs SET status = 'running', worker_token = 'dead', lease_expires_at = ? WHERE id = ?",
+                     (time.time() - 1, orphan))
+        conn.execute("UPDATE jobs SET status = 'running', worker_token = 'alive', lease_expires_at = ? WHERE id = ?",
+                     (time.time() + 60, leased))
+
+    second = JobQueue(path, lambda ci_logs: {"status": "success", "logs": ci_logs}, poll_interval=0.05)
+    second.start()
+    assert second.wait(queued, 5)["result"]["logs"] == "queued before restart"
+    assert second.wait(orphan, 5)["status"] == "done"
+    # Another process's unexpired lease is left alone
+    assert second.get(leased)["status"] == "running"
+    second.stop()
+
+
+def test_heartbeat_keeps_long_jobs_leased(tmp_path):
+    calls = []
+
+    def handler(ci_logs):
+        calls.append(ci_logs)
+        time.sleep(0.5)
+        return {"status": "success"}
+
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path, handler, concurrency=1, poll_interval=0.05, lease_seconds=0.15)
+    # A second process sharing the database would re-queue an expired lease
+    other = JobQueue(path, handler, concurrency=1, poll_interval=0.05, lease_seconds=0.15)
+    job_id = queue.submit("slow")
+    other.start()
+    assert queue.wait(job_id, 5)["status"] == "done"
+    queue.stop()
+    other.stop()
+    assert calls == ["slow"]
+
+
+def test_result_is_stored_after_transient_database_errors(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lambda ci_logs: {"status": "success"}, poll_interval=0.05)
+    finish, failures = queue._finish, []
+
+    def flaky_finish(*args):
+        if len(failures) < 2:
+            failures.append(args)
+            raise sqlite3.OperationalError("database is locked")
+        finish(*args)
+
+    monkeypatch.setattr(queue, "_finish", flaky_finish)
+    job_id = queue.submit("locked")
+    assert queue.wait(job_id, 5)["status"] == "done"
+    queue.stop()
+    assert len(failures) == 2
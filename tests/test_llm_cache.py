@@ -0,0 +1,68 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.llm_cache import LLMCache, make_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_ignores_whitespace_but_not_model():
+    assert make_cache_key("Summarize  root\ncauses ", "m1") == make_cache_key("Summarize root causes", "m1")
+    assert make_cache_key("Summarize root causes", "m1") != make_cache_key("Summarize root causes", "m2")
+
+
+def test_lru_hits_misses_and_eviction():
+    cache = LLMCache(max_entries=2)
+    cache.set("a", "m", "A")
+    cache.set("b", "m", "B")
+    assert cache.get("a", "m") == "A"
+    cache.set("c", "m", "C")
+    assert cache.get("b", "m") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 1, 2)
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = LLMCache(ttl_seconds=60, clock=clock)
+    cache.set("a", "m", "A")
+    clock.now += 61
+    assert cache.get("a", "m") is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    db_path = str(tmp_path / "llm_cache.db")
+    LLMCache(db_path=db_path).set("a", "m", "A")
+    cache = LLMCache(db_path=db_path)
+    assert cache.get("a", "m") == "A"
+    assert cache.get("a", "m") == "A"
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["hits"]) == (1, 1)
+
+
+def test_disk_tier_reconnects_after_fork(tmp_path):
+    cache = LLMCache(max_entries=0, db_path=str(tmp_path / "llm_cache.db"))
+    cache.set("a", "m", "A")
+    parent_conn = cache._connection()
+    cache._pid = -1  # as seen from a forked worker
+    assert cache.get("a", "m") == "A"
+    assert cache._connection() is not parent_conn
+
+
+def test_disk_tier_is_capped_without_counting_rows_on_every_write(tmp_path):
+    cache = LLMCache(max_entries=0, db_path=str(tmp_path / "llm_cache.db"), max_disk_entries=10)
+    statements = []
+    cache._connection().set_trace_callback(statements.append)
+    for i in range(50):
+        cache.set(f"prompt {i}", "m", str(i))
+    (rows,) = cache._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+    assert rows <= 10
+    assert sum("COUNT(*)" in statement for statement in statements) <= 50 // 2
+    # The most recent entries survive
+    assert cache.get("prompt 49", "m") == "49"
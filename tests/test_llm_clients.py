@@ -0,0 +1,66 @@
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.llm_clients import LLMClientRegistry, provider_for
+
+
+def test_registry_builds_one_client_per_model_across_threads():
+    built = []
+    registry = LLMClientRegistry({"stub": lambda model: built.append(model) or object()})
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(registry.get("stub", "m1"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert built == ["m1"]
+    assert all(client is clients[0] for client in clients)
+    assert registry.get("stub", "m2") is not clients[0]
+
+
+def test_provider_for_routes_models():
+    assert provider_for("gemini/gemini-2.5-flash-lite") == "gemini"
+    assert provider_for("openai/gpt-4o-mini") == "litellm"
+
+
+def test_shared_async_session_reuses_connections_on_every_loop():
+    import asyncio
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import httpx
+    from utils.llm_clients import _LoopLocalTransport
+
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    session = httpx.AsyncClient(transport=_LoopLocalTransport())
+
+    async def calls():
+        return [(await session.get(url)).text for _ in range(3)]
+
+    try:
+        # A second loop must not reuse the first loop's (now dead) connections
+        assert asyncio.run(calls()) == ["ok"] * 3
+        assert asyncio.run(calls()) == ["ok"] * 3
+    finally:
+        server.shutdown()
+    assert len(connections) == 2
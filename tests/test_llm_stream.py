@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import llm_factory
+from utils.llm_cache import LLMCache
+from utils.llm_clients import _gemini_client
+from utils.rate_limiter import RateController
+
+CHUNKS = ["Root cause: ", "database ", "timeout"]
+
+
+@pytest.fixture
+def gemini_stub(monkeypatch):
+    """Local Gemini endpoint streaming CHUNKS as SSE, 429ing the first ``fail`` requests."""
+    from google import genai
+    state = {"fail": 0, "requests": 0, "sent": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            state["requests"] += 1
+            if state["requests"] <= state["fail"]:
+                payload = json.dumps({"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}}).encode()
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for text in CHUNKS:
+                chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+                self.wfile.flush()
+                state["sent"].append(time.monotonic())
+                time.sleep(0.1)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(llm_factory, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(llm_factory, "llm_limits", RateController(backoff=0.01))
+    monkeypatch.setattr(llm_factory, "llm_cache", LLMCache())
+    llm_factory.llm_clients.register(
+        "gemini", lambda model: genai.Client(api_key="test-key", http_options={"base_url": base_url})
+    )
+    yield state
+    llm_factory.llm_clients.register("gemini", _gemini_client)
+    server.shutdown()
+
+
+def test_run_llm_stream_yields_chunks_as_they_arrive(gemini_stub):
+    received = []
+    for chunk in llm_factory.run_llm_stream("why?", "gemini/fake-model"):
+        received.append((chunk, time.monotonic()))
+    assert [chunk for chunk, _ in received] == CHUNKS
+    # The first chunk is delivered before the provider has sent the last one
+    assert received[0][1] < gemini_stub["sent"][-1]
+    # The full text is cached and replayed as a single chunk
+    assert list(llm_factory.run_llm_stream("why?", "gemini/fake-model")) == ["".join(CHUNKS)]
+    assert gemini_stub["requests"] == 1
+
+
+def test_run_llm_stream_retries_before_first_chunk(gemini_stub):
+    gemini_stub["fail"] = 2
+    assert "".join(llm_factory.run_llm_stream("why?", "gemini/fake-model", use_cache=False)) == "".join(CHUNKS)
+    stats = llm_factory.llm_limits.stats()["gemini/fake-model"]
+    assert (stats["throttled"], stats["retries"], stats["in_flight"]) == (2, 2, 0)
+
+
+def test_stream_errors_after_first_chunk_are_not_retried():
+    controller = RateController(backoff=0.001)
+    calls = []
+
+    def broken_stream():
+        calls.append(1)
+        yield "partial"
+        raise ConnectionError("stream reset")
+
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in controller.stream("fake/model", broken_stream):
+            received.append(chunk)
+    assert received == ["partial"] and calls == [1]
+    assert controller.stats()["fake/model"]["in_flight"] == 0
+
+
+def test_stream_latency_excludes_the_consumer_and_abandoned_streams():
+    controller = RateController()
+    closed = []
+
+    def provider_stream():
+        try:
+            for chunk in ("a", "b", "c"):
+                time.sleep(0.01)
+                yield chunk
+        finally:
+            closed.append(True)
+
+    # A slow client: 0.1 s between chunks that the provider took 0.01 s to send
+    for _ in controller.stream("fake/model", provider_stream):
+        time.sleep(0.1)
+    stats = controller.stats()["fake/model"]
+    assert stats["latency_seconds"] < 0.1
+    limit = stats["concurrency_limit"]
+
+    # Abandoned after one chunk: the provider stream is closed, the slot freed, the limits untouched
+    stream = controller.stream("fake/model", provider_stream)
+    next(stream)
+    time.sleep(0.2)
+    stream.close()
+    stats = controller.stats()["fake/model"]
+    assert closed == [True, True]
+    assert (stats["in_flight"], stats["concurrency_limit"]) == (0, limit)
+    assert stats["latency_seconds"] < 0.1
@@ -0,0 +1,83 @@
+import gzip
+import mmap
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adk import Message
+from agents.test_diagnostics_agent import TestDiagnosticsAgent
+from utils.log_stream import find_log_files, open_log, split_line_ranges
+
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_logs', 'jenkins_failure.log')
+
+
+def _diagnose(source):
+    return TestDiagnosticsAgent("TestDiagnostics").process(Message("Test", "TestDiagnostics", source)).content
+
+
+def test_plain_file_is_memory_mapped_and_matches_string_scan():
+    with open(SAMPLE_LOG) as f:
+        expected = _diagnose(f.read())
+    with open_log(SAMPLE_LOG) as source:
+        assert isinstance(source, mmap.mmap)
+        content = _diagnose(source)
+    assert content == expected
+    assert content["failures"][1]["frames"][-1].endswith("TestLogin.java:42)")
+
+
+def test_byte_payloads_are_scanned_in_place_and_match_string_scan():
+    with open(SAMPLE_LOG, "rb") as f:
+        raw = f.read()
+    expected = _diagnose(raw.decode("utf-8"))
+    assert _diagnose(raw) == expected
+    assert _diagnose(bytearray(raw)) == expected
+    assert _diagnose(memoryview(raw)) == expected
+    # A partial view covers only its own bytes
+    head = raw[:raw.index(b"\n", len(raw) // 2) + 1]
+    assert _diagnose(memoryview(raw)[:len(head)]) == _diagnose(head.decode("utf-8"))
+
+
+def test_gzip_log_is_streamed(tmp_path):
+    path = tmp_path / "build.log.gz"
+    with open(SAMPLE_LOG, "rb") as f, gzip.open(path, "wb") as out:
+        out.write(f.read())
+    with open(SAMPLE_LOG) as f:
+        expected = _diagnose(f.read())
+    with open_log(str(path)) as source:
+        assert not isinstance(source, mmap.mmap)
+        assert _diagnose(source) == expected
+
+
+def test_empty_file_and_directory_listing(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "second.log").write_text("[ERROR] test_b FAILED\n")
+    (tmp_path / "a.log").write_text("")
+    (tmp_path / ".hidden.log").write_text("ERROR\n")
+    files = find_log_files(str(tmp_path))
+    assert files == [str(tmp_path / "a.log"), str(tmp_path / "b" / "second.log")]
+    with open_log(files[0]) as source:
+        assert _diagnose(source)["failed_tests"] == []
+
+
+def test_split_line_ranges_cover_the_buffer_on_line_boundaries():
+    data = b"a\nbb\nccc\ndddd\neeeee\n"
+    ranges = split_line_ranges(data, 3)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(prev[1] == cur[0] for prev, cur in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+    assert split_line_ranges(b"no newline", 4) == [(0, 10)]
+
+
+def test_sharded_scan_matches_single_process(tmp_path):
+    with open(SAMPLE_LOG, "rb") as f:
+        sample = f.read()
+    path = tmp_path / "big.log"
+    # Odd-sized filler so shard cuts land inside failures' stack traces too
+    path.write_bytes(b"".join(sample + b"[INFO] filler\n" * (i % 7) for i in range(40)))
+    expected = TestDiagnosticsAgent("TestDiagnostics", processes=1).process_file(path).content
+    sharded = TestDiagnosticsAgent("TestDiagnostics", processes=3, parallel_min_bytes=0)
+    content = sharded.process(Message("Test", "TestDiagnostics", path)).content
+    assert content == expected
+    assert content["failures"][-1]["line_number"] == expected["failures"][-1]["line_number"] > 500
+    assert any("frames" in record for record in content["failures"])
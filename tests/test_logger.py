@@ -0,0 +1,140 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import io
+import json
+import logging
+import threading
+from utils.logger import (AsyncHandler, CorrelationIdFilter, JsonFormatter, SamplingFilter, correlation_scope,
+                          get_correlation_id)
+
+
+class Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.records.append(record)
+
+
+class CountingStr:
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "expensive"
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_correlation_id_is_shared_across_loggers_and_tasks():
+    recorder = Recorder()
+    recorder.addFilter(CorrelationIdFilter())
+    diagnostics, planner = _logger("test.diagnostics", recorder), _logger("test.planner", recorder)
+
+    async def request(correlation_id):
+        with correlation_scope(correlation_id):
+            diagnostics.info("diagnosed")
+            await asyncio.sleep(0)
+            # asyncio.to_thread carries the context into the worker thread
+            await asyncio.to_thread(planner.info, "planned")
+
+    async def main():
+        await asyncio.gather(request("req-a"), request("req-b"))
+
+    asyncio.run(main())
+    seen = {(r.name, r.correlation_id) for r in recorder.records}
+    assert seen == {("test.diagnostics", "req-a"), ("test.planner", "req-a"),
+                    ("test.diagnostics", "req-b"), ("test.planner", "req-b")}
+    diagnostics.info("outside")
+    assert recorder.records[-1].correlation_id == "-"
+
+
+def test_nested_scope_keeps_the_outer_id():
+    assert get_correlation_id() is None
+    with correlation_scope("outer"):
+        with correlation_scope() as inner:
+            assert inner == "outer"
+        with correlation_scope("job-1"):
+            assert get_correlation_id() == "job-1"
+        assert get_correlation_id() == "outer"
+    assert get_correlation_id() is None
+
+
+def test_json_formatter_emits_one_object_per_record():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(CorrelationIdFilter())
+    logger = _logger("test.json", handler)
+    with correlation_scope("req-json"):
+        logger.info("Extracted %d failed tests", 3, extra={"signature": "abc"})
+    payload = json.loads(stream.getvalue())
+    assert payload["message"] == "Extracted 3 failed tests"
+    assert payload["correlation_id"] == "req-json"
+    assert payload["signature"] == "abc"
+    assert payload["level"] == "INFO" and payload["logger"] == "test.json"
+
+
+def test_async_handler_formats_off_thread_and_drains_on_close():
+    recorder = Recorder()
+    handler = AsyncHandler(recorder, max_records=1000)
+    handler.addFilter(CorrelationIdFilter())
+    logger = _logger("test.async", handler)
+    argument = CountingStr()
+    with correlation_scope("req-async"):
+        for _ in range(100):
+            logger.info("value %s", argument)
+    handler.close()
+    assert len(recorder.records) == 100
+    assert recorder.threads and threading.current_thread().name not in recorder.threads
+    assert {r.correlation_id for r in recorder.records} == {"req-async"}
+    assert handler.dropped == 0
+
+
+def test_async_handler_drops_when_full():
+    release = threading.Event()
+
+    class Slow(Recorder):
+        def emit(self, record):
+            release.wait(5)
+            super().emit(record)
+
+    slow = Slow()
+    handler = AsyncHandler(slow, max_records=5)
+    logger = _logger("test.async.full", handler)
+    for i in range(50):
+        logger.info("line %d", i)
+    assert handler.dropped > 0
+    release.set()
+    handler.close()
+    assert len(slow.records) + handler.dropped == 50
+
+
+def test_sampling_keeps_warnings_and_skips_formatting_of_dropped_records(monkeypatch):
+    monkeypatch.setattr("utils.logger.time.monotonic", lambda: 1000.0)
+    recorder = Recorder()
+    sampler = SamplingFilter(burst=5, every=10)
+    recorder.addFilter(sampler)
+    logger = _logger("test.sampling", recorder)
+    argument = CountingStr()
+    for _ in range(55):
+        logger.info("value %s", argument)
+    logger.warning("always kept")
+    kept = [r for r in recorder.records if r.levelno == logging.INFO]
+    # The first 5 in full, then 1 in 10 of the other 50
+    assert len(kept) == 10
+    assert recorder.records[-1].getMessage() == "always kept"
+    assert argument.calls == 0
+    assert sampler.suppressed == 45
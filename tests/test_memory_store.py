@@ -0,0 +1,52 @@
+import sys
+import os
+import multiprocessing
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.memory_store import JSONMemoryStore, SQLiteMemoryStore
+from utils import memory_handler
+
+
+def _hammer(path):
+    store = SQLiteMemoryStore(path)
+    for _ in range(100):
+        store.increment("test_login FAILED")
+
+
+def test_sqlite_store_counts_and_batches(tmp_path):
+    store = SQLiteMemoryStore(str(tmp_path / "memory.db"))
+    store.increment("a")
+    store.increment_many(["a", "b", "a"])
+    assert store.read_all() == {"a": 3, "b": 1}
+    assert store.get("missing") == 0
+    store.clear()
+    assert store.read_all() == {}
+
+
+def test_sqlite_store_is_safe_across_processes(tmp_path):
+    path = str(tmp_path / "memory.db")
+    SQLiteMemoryStore(path)
+    processes = [multiprocessing.Process(target=_hammer, args=(path,)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert SQLiteMemoryStore(path).get("test_login FAILED") == 400
+
+
+def test_sqlite_store_imports_legacy_json(tmp_path):
+    legacy = JSONMemoryStore(str(tmp_path / "memory_bank.json"))
+    legacy.increment_many(["a", "a", "b"])
+    store = SQLiteMemoryStore(str(tmp_path / "memory.db"), legacy_json_path=legacy.path)
+    assert store.read_all() == {"a": 2, "b": 1}
+
+
+def test_memory_handler_facade_uses_configured_store(tmp_path):
+    memory_handler.set_memory_store(SQLiteMemoryStore(str(tmp_path / "memory.db")))
+    try:
+        memory_handler.update_memory("a")
+        memory_handler.update_memory_batch(["a", "b"])
+        assert memory_handler.read_memory() == {"a": 2, "b": 1}
+        memory_handler.clear_memory()
+        assert memory_handler.read_memory() == {}
+    finally:
+        memory_handler.set_memory_store(None)
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import pytest
+from adk import Message
+from utils import serialization
+from utils.log_stream import as_byte_buffer
+
+
+def test_message_is_slotted_and_keeps_payload_references():
+    failed_tests = ["[ERROR] test_login FAILED"]
+    content = {"failed_tests": failed_tests}
+    message = Message("TestDiagnostics", "RootCauseAnalyzerAgent", content)
+    assert not hasattr(message, "__dict__")
+    with pytest.raises(AttributeError):
+        message.extra = 1
+    assert message.content is content and message.content["failed_tests"] is failed_tests
+    assert message != Message("TestDiagnostics", "RootCauseAnalyzerAgent", content)
+
+
+def test_message_round_trips_through_bytes():
+    content = {"failed_tests": ["a"], "confidence": 0.9, "category": None, "similar_incidents": []}
+    message = Message.from_bytes(Message("RootCause", "ActionPlannerAgent", content).to_bytes())
+    assert (message.sender, message.receiver, message.content) == ("RootCause", "ActionPlannerAgent", content)
+
+
+def test_serialization_writes_plain_json_with_or_without_orjson(monkeypatch):
+    value = {"log": memoryview(b"[ERROR] \xff boom"), "tags": {"x"}, "count": 3, 1: "non-str key"}
+    fast = serialization.dumps(value)
+    monkeypatch.setattr(serialization, "orjson", None)
+    slow = serialization.dumps(value)
+    assert json.loads(fast) == json.loads(slow) == {
+        "log": "[ERROR] \ufffd boom", "tags": ["x"], "count": 3, "1": "non-str key"}
+    assert serialization.loads(memoryview(slow)) == json.loads(slow)
+
+
+def test_as_byte_buffer_unwraps_full_views_only():
+    raw = b"line 1\nline 2\n"
+    assert as_byte_buffer(memoryview(raw)) is raw
+    assert as_byte_buffer(memoryview(raw)[:7]) == b"line 1\n"
+    assert as_byte_buffer("text") is None
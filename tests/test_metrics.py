@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from adk import Message
+from utils.metrics import MetricsRegistry, registry
+
+
+def test_counter_gauge_and_histogram_render_in_prometheus_format():
+    metrics = MetricsRegistry()
+    metrics.counter("jobs_total", "Jobs", ("status",)).inc(status="done")
+    metrics.counter("jobs_total", "Jobs", ("status",)).inc(2, status="done")
+    metrics.gauge("depth", "Queue depth").set(3)
+    latency = metrics.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1))
+    latency.observe(0.05, stage="rca")
+    latency.observe(0.5, stage="rca")
+    latency.observe(5, stage="rca")
+    text = metrics.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{status="done"} 3' in text
+    assert "depth 3" in text
+    assert 'latency_seconds_bucket{stage="rca",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="rca",le="1"} 2' in text
+    assert 'latency_seconds_bucket{stage="rca",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="rca"} 3' in text
+    assert latency.snapshot(stage="rca")["sum"] == pytest.approx(5.55)
+
+
+def test_metric_names_are_unique_per_type_and_labels():
+    metrics = MetricsRegistry()
+    metrics.counter("calls_total", "Calls", ("model",))
+    with pytest.raises(ValueError):
+        metrics.gauge("calls_total", "Calls", ("model",))
+    with pytest.raises(ValueError):
+        metrics.counter("calls_total", "Calls").inc()
+
+
+def test_register_stats_exports_counters_gauges_and_labels():
+    metrics = MetricsRegistry()
+    metrics.register_stats("cache", lambda: {"hits": 4, "size": 2, "enabled": True, "name": "x"}, counters=("hits",))
+    metrics.register_stats("limiter", lambda: {"gpt": {"queue_depth": 1}, "gemini": {"queue_depth": 0}}, label="model")
+    text = metrics.render()
+    assert "cache_hits_total 4" in text
+    assert "cache_size 2" in text
+    assert "cache_enabled" not in text and "cache_name" not in text
+    assert 'limiter_queue_depth{model="gpt"} 1' in text
+    assert 'limiter_queue_depth{model="gemini"} 0' in text
+
+
+def test_failing_collector_does_not_break_scrape():
+    metrics = MetricsRegistry()
+    metrics.gauge("up", "Up").set(1)
+    metrics.register_collector("broken", lambda: 1 / 0)
+    text = metrics.render()
+    assert "up 1" in text
+    assert "collector broken failed" in text
+
+
+def test_shared_registries_merge_every_process_into_each_scrape(tmp_path):
+    # Two workers: each writes its snapshot, either one can answer the scrape
+    workers = [MetricsRegistry(), MetricsRegistry()]
+    for i, metrics in enumerate(workers, 1):
+        metrics.share(str(tmp_path), flush_interval=60)
+        metrics.counter("requests_total", "Requests", ("path",)).inc(i, path="/predict")
+        metrics.histogram("latency_seconds", "Latency", buckets=(1,)).observe(i * 0.75)
+        metrics.register_stats("cache", lambda i=i: {"hits": 10 * i}, counters=("hits",))
+    workers[1]._write()
+    text = workers[0].render()
+    assert 'requests_total{path="/predict"} 3' in text
+    assert "cache_hits_total 30" in text
+    assert 'latency_seconds_bucket{le="1"} 1' in text and "latency_seconds_count 2" in text
+
+    # An exited worker's counts stay, so counters never go backwards
+    workers[1]._write_final()
+    assert 'requests_total{path="/predict"} 3' in workers[0].render()
+    for metrics in workers:
+        metrics.forget_process()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_workers_report_gauges_per_worker_and_count_from_zero(tmp_path):
+    metrics = MetricsRegistry()
+    requests = metrics.counter("requests_total", "Requests")
+    in_flight = metrics.gauge("in_flight", "In flight")
+    requests.inc()
+    metrics.share(str(tmp_path), flush_interval=60)
+    pid = os.fork()
+    if pid == 0:
+        requests.inc(2)
+        in_flight.set(5)
+        metrics._write()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    in_flight.set(1)
+    text = metrics.render()
+    # 1 before the fork (counted once) + 2 in the child
+    assert "requests_total 3" in text
+    assert f'in_flight{{worker="{pid}"}} 5' in text and f'in_flight{{worker="{os.getpid()}"}} 1' in text
+    metrics.forget_process()
+
+
+def test_predictor_records_stage_latency_and_llm_tokens():
+    from predict import QAOpsPredictor
+    from utils.llm_factory import _record_usage
+    agent_seconds = registry.histogram("qaops_agent_seconds", "Agent processing latency", ("agent",))
+    before = agent_seconds.snapshot(agent="diagnostics")["count"]
+    predictor = QAOpsPredictor()
+    predictor.agents['root_cause'].process = lambda message: Message(
+        "RootCause", "ActionPlannerAgent", {"analysis": "stub", "analysis_source": "llm"})
+    predictor.predict("[ERROR] test_login FAILED")
+    assert agent_seconds.snapshot(agent="diagnostics")["count"] == before + 1
+    assert agent_seconds.snapshot(agent="root_cause")["count"] >= 1
+
+    tokens = registry.counter("qaops_llm_tokens_total", "", ("model", "kind"))
+    _record_usage("test/model", "x" * 40, "done", prompt_tokens=12)
+    assert tokens.value(model="test/model", kind="prompt") == 12
+    assert tokens.value(model="test/model", kind="completion") == 1
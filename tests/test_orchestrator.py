@@ -0,0 +1,90 @@
+import sys
+import os
+import threading
+import time
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from adk import Agent, AgentDependencySkipped, AgentOrchestrator, Message, OrchestrationError
+
+
+class EchoAgent(Agent):
+    def __init__(self, name: str, receiver: str = "Done", delay: float = 0.0):
+        super().__init__(name)
+        self.receiver = receiver
+        self.delay = delay
+
+    def process(self, message: Message) -> Message:
+        time.sleep(self.delay)
+        seen = message.content if isinstance(message.content, dict) else {}
+        return Message(self.name, self.receiver, {**seen, self.name: True})
+
+
+def test_routing_follows_receivers_and_merges_content():
+    orchestrator = AgentOrchestrator(agents=[EchoAgent("First", "EchoAgent"), EchoAgent("Second")])
+    # "EchoAgent" resolves by class name to the last registered EchoAgent
+    result = orchestrator.start(Message("System", "First", "logs"))
+    assert result.sender == "Second"
+    assert result.content == {"First": True, "Second": True}
+
+
+def test_graph_runs_independent_agents_concurrently():
+    agents = [EchoAgent("Diag"), EchoAgent("RCA", delay=0.3), EchoAgent("Metrics", delay=0.3), EchoAgent("Plan")]
+    orchestrator = AgentOrchestrator(agents, dependencies={"RCA": ["Diag"], "Metrics": ["Diag"], "Plan": ["RCA", "Metrics"]})
+    start = time.perf_counter()
+    results = orchestrator.run_graph(Message("System", "Diag", "logs"))
+    assert time.perf_counter() - start < 0.55
+    assert results["Plan"].content == {"Diag": True, "RCA": True, "Metrics": True, "Plan": True}
+
+
+def test_graph_timeout_skips_dependents():
+    agents = [EchoAgent("Slow", delay=0.5), EchoAgent("Fast"), EchoAgent("After")]
+    orchestrator = AgentOrchestrator(agents, dependencies={"After": ["Slow"]}, timeouts={"Slow": 0.05})
+    with pytest.raises(OrchestrationError) as excinfo:
+        orchestrator.run_graph(Message("System", "Slow", "logs"))
+    assert set(excinfo.value.errors) == {"Slow", "After"}
+    assert isinstance(excinfo.value.errors["After"], AgentDependencySkipped)
+    assert "Fast" in excinfo.value.results
+
+
+def test_cancel_stops_graph():
+    agents = [EchoAgent("Slow", delay=0.3), EchoAgent("After")]
+    orchestrator = AgentOrchestrator(agents, dependencies={"After": ["Slow"]})
+    threading.Timer(0.05, orchestrator.cancel).start()
+    with pytest.raises(OrchestrationError) as excinfo:
+        orchestrator.run_graph(Message("System", "Slow", "logs"))
+    assert set(excinfo.value.errors) == {"Slow", "After"}
+
+
+def test_cancel_before_run_cancels_that_run():
+    orchestrator = AgentOrchestrator([EchoAgent("Only")])
+    orchestrator.cancel()
+    with pytest.raises(OrchestrationError):
+        orchestrator.start(Message("System", "Only", "logs"))
+    # Consumed by that run
+    assert orchestrator.start(Message("System", "Only", "logs")).content == {"Only": True}
+
+
+def test_cancel_reaches_every_overlapping_run():
+    orchestrator = AgentOrchestrator([EchoAgent("Slow", delay=0.3)], default_timeout=5)
+    outcomes = []
+
+    def run():
+        try:
+            orchestrator.start(Message("System", "Slow", "logs"))
+            outcomes.append("finished")
+        except OrchestrationError:
+            outcomes.append("cancelled")
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    orchestrator.cancel()
+    for thread in threads:
+        thread.join()
+    assert outcomes == ["cancelled", "cancelled"]
+
+
+def test_graph_rejects_cycles():
+    with pytest.raises(ValueError):
+        AgentOrchestrator([EchoAgent("A"), EchoAgent("B")], dependencies={"A": ["B"], "B": ["A"]})
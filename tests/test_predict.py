@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from adk import Message
+from predict import QAOpsPredictor
+
+
+def test_predict_batch_coalesces_identical_failures():
+    predictor = QAOpsPredictor()
+    calls = []
+
+    def fake_rca(message):
+        calls.append(message.content["failed_tests"])
+        return Message("RootCause", "ActionPlannerAgent", {"analysis": "flaky login"})
+
+    predictor.agents['root_cause'].process = fake_rca
+    jobs = [
+        {"job_id": "a", "ci_logs": "[ERROR] test_login FAILED"},
+        {"job_id": "b", "ci_logs": "[INFO] retry\n[ERROR] test_login FAILED"},
+        {"job_id": "c", "ci_logs": "[ERROR] test_api FAILED"},
+    ]
+    results = list(predictor.predict_batch(jobs, processes=1))
+    assert [r["job_id"] for r in results[:-1]] == ["a", "b", "c"]
+    assert [r["coalesced"] for r in results[:-1]] == [False, True, False]
+    assert results[1]["analysis"] == "flaky login"
+    assert len(calls) == 2
+    assert results[-1]["summary"]["analysis_sources"] == {"llm": 2}
+
+
+def test_predict_batch_counts_failures_by_fingerprint():
+    predictor = QAOpsPredictor()
+    predictor.agents['root_cause'].process = lambda message: Message(
+        "RootCause", "ActionPlannerAgent", {"analysis": "flaky login"})
+    jobs = [
+        {"job_id": "a", "ci_logs": "2025-11-28 10:00:01 [ERROR] test_login FAILED request 123456"},
+        {"job_id": "b", "ci_logs": "2025-11-28 11:42:17 [ERROR] test_login FAILED request 987654"},
+    ]
+    results = list(predictor.predict_batch(jobs, processes=1))
+    assert [r["coalesced"] for r in results[:-1]] == [False, True]
+    assert results[-1]["summary"]["unique_failures"] == 1
+    assert results[-1]["summary"]["unique_signatures"] == 1
+
+
+def test_predict_batch_reads_jobs_as_the_pool_frees_up():
+    predictor = QAOpsPredictor()
+    predictor.agents['root_cause'].process = lambda message: Message(
+        "RootCause", "ActionPlannerAgent", {"analysis": "stub", "analysis_source": "classifier"})
+    pulled = []
+
+    def jobs():
+        for i in range(12):
+            pulled.append(i)
+            yield {"job_id": i, "ci_logs": f"[ERROR] test_{i % 3} FAILED"}
+
+    results = predictor.predict_batch(jobs(), processes=2)
+    first = next(results)
+    # At most two jobs per worker are submitted ahead of the one returned
+    assert first["job_id"] == 0 and len(pulled) <= 5
+    rest = list(results)
+    assert [r["job_id"] for r in rest[:-1]] == list(range(1, 12))
+    assert rest[-1]["summary"]["jobs"] == 12
+    assert rest[-1]["summary"]["analysis_sources"] == {"classifier": 3}
+
+
+def test_predict_path_reads_files_and_directories(tmp_path):
+    predictor = QAOpsPredictor()
+    predictor.agents['root_cause'].process = lambda message: Message(
+        "RootCause", "ActionPlannerAgent", {"analysis": "stub"})
+    (tmp_path / "one.log").write_text("[INFO] ok\n[ERROR] test_login FAILED\n")
+    (tmp_path / "two.log").write_text("[INFO] ok\n")
+    results = list(predictor.predict_path(str(tmp_path)))
+    assert [os.path.basename(r["path"]) for r in results] == ["one.log", "two.log"]
+    assert results[0]["failed_tests"] == ["[ERROR] test_login FAILED"]
+    assert results[1]["failed_tests"] == []
+
+
+def test_concurrent_predict_calls_coalesce_by_signature():
+    import threading
+    import time
+    predictor = QAOpsPredictor()
+    calls = []
+
+    def slow_rca(message):
+        calls.append(1)
+        time.sleep(0.3)
+        return Message("RootCause", "ActionPlannerAgent", {"analysis": "shared"})
+
+    predictor.agents['root_cause'].process = slow_rca
+    logs = ["2025-11-28 10:00:0%d [ERROR] test_login FAILED" % i for i in range(4)]
+    results = [None] * len(logs)
+
+    def run(index):
+        results[index] = predictor.predict(logs[index])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(logs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(r["analysis"] == "shared" for r in results)
+    assert sorted(r["coalesced"] for r in results) == [False, True, True, True]
+    assert predictor.coalescer.stats()["coalesced"] == 3
+
+
+def test_predict_stream_emits_analysis_chunks_before_result(monkeypatch):
+    import agents.root_cause_agent as root_cause_agent
+    monkeypatch.setattr(root_cause_agent, "run_llm_stream", lambda prompt, model: iter(["Root cause: ", "timeout"]))
+    predictor = QAOpsPredictor()
+    events = list(predictor.predict_stream("[ERROR] test_login FAILED\n[INFO] Build finished"))
+    assert [e["event"] for e in events] == ["diagnostics", "analysis", "analysis", "result"]
+    assert events[0]["data"]["failed_tests"] == ["[ERROR] test_login FAILED"]
+    result = events[-1]["data"]
+    assert result["analysis"] == "Root cause: timeout"
+    assert result["status"] == "success" and result["signature"] == events[0]["data"]["signature"]
+    assert "remediation_plan" in result
+
+
+def test_predict_stream_falls_back_when_llm_fails(monkeypatch):
+    import agents.root_cause_agent as root_cause_agent
+
+    def failing(prompt, model):
+        raise ValueError("GOOGLE_API_KEY missing")
+        yield
+
+    monkeypatch.setattr(root_cause_agent, "run_llm_stream", failing)
+    events = list(QAOpsPredictor().predict_stream("[ERROR] test_login FAILED"))
+    assert [e["event"] for e in events] == ["diagnostics", "analysis", "result"]
+    assert events[1]["data"]["text"].startswith("Fallback analysis")
@@ -0,0 +1,67 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adk import Message
+from agents.test_diagnostics_agent import TestDiagnosticsAgent
+from utils.memory_handler import get_context_window
+from utils.prompt_builder import build_rca_prompt, estimate_tokens
+
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_logs', 'jenkins_failure.log')
+
+
+def _diagnose(logs):
+    return TestDiagnosticsAgent("TestDiagnostics").process(Message("Test", "TestDiagnostics", logs)).content
+
+
+def test_context_window_matches_split_semantics():
+    logs = "\n first\nsecond\n\tthird\nfourth  \n\n"
+    for window in (1, 2, 4, 10):
+        expected = "\n".join(logs.strip().split("\n")[-window:])
+        assert get_context_window(logs, window) == expected
+        assert get_context_window(logs.encode(), window) == expected
+        assert get_context_window(io.BytesIO(logs.encode()), window) == expected
+
+
+def test_context_window_seeks_from_end_of_file(tmp_path):
+    path = tmp_path / "build.log"
+    path.write_text("".join(f"line {i}\n" for i in range(100000)))
+    with open(path) as f:
+        assert get_context_window(f, 3) == "line 99997\nline 99998\nline 99999"
+        assert f.tell() == 0
+
+
+def test_sample_log_prompt_keeps_key_evidence():
+    # Quality sample: the budgeted prompt must keep both root-cause
+    # exceptions and the frame that names the failing test method.
+    with open(SAMPLE_LOG) as f:
+        content = _diagnose(f.read())
+    prompt = build_rca_prompt(content["failures"], content["log_tail"].split("\n"), max_tokens=2000)
+    assert "java.lang.AssertionError: expected [true] but found [false]" in prompt
+    assert "java.net.ConnectException: Connection refused: connect" in prompt
+    assert "com.example.tests.TestLogin.testUserAuthentication(TestLogin.java:42)" in prompt
+    assert "com.example.tests.TestAPI.testCreateUser" in prompt
+    assert prompt.index("AssertionError") < prompt.index("Test failed")
+
+
+def test_prompt_dedupes_and_respects_budget():
+    logs = "".join(
+        f"2025-11-28 10:{i % 60:02d}:00 ERROR: Test failed: com.example.T{i % 40}.testX build #{i}\n"
+        f"\tat com.example.T{i % 40}.testX(T.java:{i % 7 + 10})\n"
+        for i in range(20000)
+    ) + "java.lang.OutOfMemoryError: Java heap space\n"
+    content = _diagnose(logs)
+    prompt = build_rca_prompt(content["failures"], content["log_tail"].split("\n"), max_tokens=500)
+    assert estimate_tokens(prompt) <= 500
+    assert estimate_tokens(prompt) * 100 < estimate_tokens(str(content["failed_tests"]))
+    # The critical failure is ranked first despite appearing last.
+    assert prompt.split("Failures:\n")[1].startswith("- java.lang.OutOfMemoryError")
+    assert "(x500)" in prompt
+    assert "more distinct failures omitted" in prompt
+
+
+def test_prompt_from_plain_failed_tests():
+    prompt = build_rca_prompt([{"line": "test_login FAILED"}, {"line": "test_login FAILED"}])
+    assert "- test_login FAILED (x2)" in prompt
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.rate_limiter import ModelLimiter, RateController, is_retryable
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+class FakeProvider:
+    """Accepts at most ``capacity`` concurrent calls and answers the rest with 429."""
+    def __init__(self, capacity: int, latency: float = 0.02):
+        self.capacity = capacity
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def _enter(self):
+        with self.lock:
+            if self.active >= self.capacity:
+                self.rejected += 1
+                raise RateLimited()
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _exit(self):
+        with self.lock:
+            self.active -= 1
+
+    def complete(self, prompt):
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            return f"analysis of {prompt}"
+        finally:
+            self._exit()
+
+    async def acomplete(self, prompt):
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            return f"analysis of {prompt}"
+        finally:
+            self._exit()
+
+
+def test_burst_adapts_to_provider_capacity():
+    provider = FakeProvider(capacity=3)
+    controller = RateController(max_retries=10, backoff=0.005, max_backoff=0.05, max_concurrency=16)
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(controller.call("fake/model", lambda: provider.complete(i))))
+        for i in range(40)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 40
+    stats = controller.stats()["fake/model"]
+    assert stats["throttled"] == provider.rejected > 0
+    assert stats["retries"] == provider.rejected
+    assert stats["concurrency_limit"] < 16
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+    # Halving once per wave of 429s, not once per rejected call
+    assert stats["concurrency_limit"] >= 1
+
+
+def test_async_calls_share_the_limiter():
+    provider = FakeProvider(capacity=2)
+    controller = RateController(max_retries=10, backoff=0.005, max_backoff=0.05, max_concurrency=2)
+
+    async def main():
+        return await asyncio.gather(*(controller.acall("fake/model", lambda i=i: provider.acomplete(i)) for i in range(10)))
+
+    assert len(asyncio.run(main())) == 10
+    assert provider.rejected == 0 and provider.peak == 2
+
+
+def _wait_until_queued(limiter, count):
+    deadline = time.monotonic() + 5
+    while limiter.waiting < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_threads_and_tasks_get_slots_in_arrival_order():
+    limiter = ModelLimiter(max_concurrency=1)
+    limiter.acquire()
+    order = []
+
+    def thread_call(name):
+        limiter.acquire()
+        order.append(name)
+        limiter.release(0.01)
+
+    async def task_call():
+        await limiter.aacquire()
+        order.append("task")
+        limiter.release(0.01)
+
+    callers = [
+        threading.Thread(target=thread_call, args=("first thread",)),
+        threading.Thread(target=asyncio.run, args=(task_call(),)),
+        threading.Thread(target=thread_call, args=("second thread",)),
+    ]
+    for queued, caller in enumerate(callers, 1):
+        caller.start()
+        _wait_until_queued(limiter, queued)
+    limiter.release(0.01)
+    for caller in callers:
+        caller.join(5)
+    assert order == ["first thread", "task", "second thread"]
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    limiter = ModelLimiter(max_concurrency=1)
+    limiter.acquire()
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.aacquire(), 0.05)
+
+    asyncio.run(main())
+    assert limiter.waiting == 0
+    limiter.release(0.01)
+    limiter.acquire()
+    assert limiter.in_flight == 1
+
+
+def test_token_bucket_paces_calls():
+    limiter = ModelLimiter(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release(0.001)
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats()["wait_seconds"] > 0
+
+
+def test_errors_that_cannot_succeed_are_not_retried():
+    controller = RateController(backoff=0.001)
+    calls = []
+
+    def missing_key():
+        calls.append(1)
+        raise ValueError("GOOGLE_API_KEY missing")
+
+    with pytest.raises(ValueError):
+        controller.call("fake/model", missing_key)
+    assert calls == [1]
+    assert is_retryable(TimeoutError()) and not is_retryable(KeyError())
+
+
+def test_retry_after_is_honoured():
+    controller = RateController(backoff=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimited(retry_after="0.2")
+        return "ok"
+
+    assert controller.call("fake/model", flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+
+
+def test_run_llm_retries_gemini_429(monkeypatch):
+    from google import genai
+    from utils import llm_factory
+    from utils.llm_clients import _gemini_client
+
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            requests_seen.append(self.path)
+            if len(requests_seen) <= 2:
+                status, body = 429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}}
+            else:
+                status, body = 200, {"candidates": [{"content": {"role": "model", "parts": [{"text": "root cause"}]}}]}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(llm_factory, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(llm_factory, "llm_limits", RateController(backoff=0.01))
+    llm_factory.llm_clients.register(
+        "gemini", lambda model: genai.Client(api_key="test-key", http_options={"base_url": base_url})
+    )
+    try:
+        text = llm_factory.run_llm("why did it fail?", "gemini/fake-model", use_cache=False)
+    finally:
+        llm_factory.llm_clients.register("gemini", _gemini_client)
+        server.shutdown()
+    assert text == "root cause"
+    assert len(requests_seen) == 3
+    stats = llm_factory.llm_limits.stats()["gemini/fake-model"]
+    assert (stats["throttled"], stats["retries"]) == (2, 2)
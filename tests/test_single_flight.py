@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def work():
+        executions.append(1)
+        release.wait(5)
+        return "analysis"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("sig", work))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 8:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert sorted(results) == [("analysis", False)] + [("analysis", True)] * 7
+    stats = flight.stats()
+    assert (stats["executions"], stats["coalesced"], stats["in_flight"]) == (1, 7, 0)
+
+
+def test_sequential_calls_are_not_cached_and_errors_propagate():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("a", lambda: 2) == (2, False)
+    with pytest.raises(ValueError):
+        flight.do("a", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_calls_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    async def work():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        return "analysis"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("sig", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(executions) == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert flight.stats()["coalesced"] == 4
@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import threading
+import time
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode, set_span_in_context
+from utils.telemetry import OTLPFileSpanExporter, SpanExportBuffer, TailSampler, head_sampler
+
+
+def _tracer(processor, sampler=None):
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(processor)
+    return provider.get_tracer("test")
+
+
+class BlockingExporter(SpanExporter):
+    def __init__(self):
+        self.release = threading.Event()
+        self.threads = set()
+        self.spans = []
+
+    def export(self, spans):
+        self.threads.add(threading.current_thread().name)
+        self.release.wait(5)
+        self.spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+
+def test_buffer_exports_off_thread():
+    exporter = BlockingExporter()
+    exporter.release.set()
+    buffer = SpanExportBuffer([exporter], interval_seconds=0.05)
+    tracer = _tracer(buffer)
+    with tracer.start_as_current_span("request"):
+        with tracer.start_as_current_span("rca"):
+            pass
+    assert buffer.force_flush(5000)
+    assert sorted(span.name for span in exporter.spans) == ["rca", "request"]
+    assert exporter.threads == {"SpanExporter"}
+    assert buffer.stats()["exported"] == 2
+
+
+def test_full_buffer_drops_instead_of_blocking():
+    exporter = BlockingExporter()
+    buffer = SpanExportBuffer([exporter], max_spans=4, batch_size=1, interval_seconds=0.01)
+    tracer = _tracer(buffer)
+    started = time.perf_counter()
+    for i in range(50):
+        with tracer.start_as_current_span(f"span-{i}"):
+            pass
+    assert time.perf_counter() - started < 1.0
+    assert buffer.stats()["dropped"] > 0
+    exporter.release.set()
+    assert buffer.force_flush(5000)
+
+
+def test_tail_sampler_keeps_errors_and_slow_traces():
+    exporter = InMemorySpanExporter()
+    buffer = SpanExportBuffer([exporter], interval_seconds=0.05)
+    sampler = TailSampler(buffer, ratio=0.0, slow_seconds=0.05)
+    tracer = _tracer(sampler)
+    with tracer.start_as_current_span("ordinary"):
+        with tracer.start_as_current_span("ordinary-child"):
+            pass
+    with tracer.start_as_current_span("failed"):
+        with tracer.start_as_current_span("failed-child") as child:
+            child.set_status(Status(StatusCode.ERROR))
+    with tracer.start_as_current_span("slow"):
+        time.sleep(0.06)
+    buffer.force_flush(5000)
+    assert sorted(span.name for span in exporter.get_finished_spans()) == ["failed", "failed-child", "slow"]
+    stats = sampler.stats()
+    assert (stats["traces_kept"], stats["traces_dropped"], stats["pending_spans"]) == (2, 1, 0)
+
+
+def test_tail_sampler_bounds_undecided_spans():
+    exporter = InMemorySpanExporter()
+    buffer = SpanExportBuffer([exporter], interval_seconds=0.05)
+    sampler = TailSampler(buffer, ratio=0.0, slow_seconds=60, max_spans=3)
+    tracer = _tracer(sampler)
+    # Children ended while their roots stay open are held until the bound
+    roots = [tracer.start_span(f"root-{i}") for i in range(5)]
+    for root in roots:
+        child = tracer.start_span("child", context=set_span_in_context(root))
+        child.end()
+    assert sampler.stats()["pending_spans"] <= 3
+    for root in roots:
+        root.end()
+    assert sampler.stats()["pending_spans"] == 0
+
+
+def test_head_sampler_skips_unsampled_traces():
+    exporter = InMemorySpanExporter()
+    buffer = SpanExportBuffer([exporter], interval_seconds=0.05)
+    tracer = _tracer(buffer, sampler=head_sampler(0.0))
+    with tracer.start_as_current_span("request") as span:
+        assert not span.is_recording()
+    buffer.force_flush(5000)
+    assert exporter.get_finished_spans() == ()
+    assert head_sampler(1.0) is None
+
+
+def test_otlp_file_exporter_writes_json_lines(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    buffer = SpanExportBuffer([OTLPFileSpanExporter(path)], interval_seconds=0.05)
+    tracer = _tracer(buffer)
+    with tracer.start_as_current_span("request") as span:
+        trace_id = format(span.get_span_context().trace_id, "032x")
+    buffer.force_flush(5000)
+    with open(path) as f:
+        request = json.loads(f.readline())
+    exported = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert exported["name"] == "request"
+    assert exported["traceId"] == trace_id
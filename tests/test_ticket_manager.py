@@ -0,0 +1,178 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from adk import Message
+from agents.action_planner_agent import ActionPlannerAgent
+from tools.ticket_manager import TicketManager
+
+
+class MockTracker:
+    """In-memory tracker that can fail its first calls and block until released."""
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.tickets = {}
+        self.comments = []
+        self.bulk_calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def create_tickets(self, pairs):
+        self.release.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("tracker unavailable")
+        self.bulk_calls += 1
+        urls = []
+        for summary, description in pairs:
+            url = f"https://tracker.local/QA-{len(self.tickets) + 1}"
+            self.tickets[url] = (summary, description)
+            urls.append(url)
+        return urls
+
+    def add_comment(self, url, body):
+        self.comments.append((url, body))
+
+
+def test_repeats_become_comments_and_creation_is_batched():
+    tracker = MockTracker()
+    tracker.release.clear()
+    manager = TicketManager(tracker, backoff=0.01)
+    first = manager.submit("sig-a", "QA Failure: a", "analysis a")
+    # Held in the worker so the following submissions queue up as one batch
+    manager.submit("sig-0", "QA Failure: 0", "analysis 0")
+    repeat = manager.submit("sig-a", "QA Failure: a", "analysis a again")
+    manager.submit("sig-b", "QA Failure: b", "analysis b")
+    manager.submit("sig-a", "QA Failure: a", "analysis a, third")
+    tracker.release.set()
+    assert manager.flush(5)
+    manager.close()
+
+    assert first == {"signature": "sig-a", "url": "", "status": "queued"}
+    assert repeat["status"] == "commented"
+    assert len(tracker.tickets) == 3
+    assert tracker.bulk_calls <= 2
+    url = manager.get("sig-a")
+    assert [c[0] for c in tracker.comments] == [url]
+    assert "Recurred 2 more times" in tracker.comments[0][1]
+    assert manager.submit("sig-a", "QA Failure: a", "again")["url"] == url
+    stats = manager.stats()
+    assert (stats["created"], stats["tickets"]) == (3, 3)
+
+
+def test_tracker_errors_are_retried_with_backoff():
+    tracker = MockTracker(failures=2)
+    manager = TicketManager(tracker, backoff=0.01)
+    manager.submit("sig", "QA Failure", "analysis")
+    assert manager.flush(5)
+    manager.close()
+    assert manager.get("sig") in tracker.tickets
+    assert manager.stats()["retries"] == 2
+
+
+def test_failed_creation_is_retried_by_next_submission():
+    tracker = MockTracker(failures=2)
+    manager = TicketManager(tracker, max_retries=1, backoff=0.01)
+    manager.submit("sig", "QA Failure", "analysis")
+    manager.submit("sig", "QA Failure", "analysis again")
+    assert manager.flush(5)
+    assert manager.get("sig") is None
+    assert manager.stats()["failed"] == 2
+    assert manager.submit("sig", "QA Failure", "analysis")["status"] == "queued"
+    assert manager.flush(5)
+    manager.close()
+    assert manager.get("sig") in tracker.tickets
+
+
+def test_ticket_index_persists(tmp_path):
+    path = str(tmp_path / "tickets.db")
+    manager = TicketManager(MockTracker(), path=path)
+    manager.submit("sig", "QA Failure", "analysis")
+    manager.close()
+    tracker = MockTracker()
+    restarted = TicketManager(tracker, path=path)
+    result = restarted.submit("sig", "QA Failure", "analysis")
+    restarted.close()
+    assert result["status"] == "commented" and result["url"] == manager.get("sig")
+    assert not tracker.tickets and len(tracker.comments) == 1
+
+
+def test_managers_sharing_an_index_create_one_ticket_per_signature(tmp_path):
+    # Two gunicorn workers: separate managers (and trackers) on one index
+    path = str(tmp_path / "tickets.db")
+    first_tracker, second_tracker = MockTracker(), MockTracker()
+    first_tracker.release.clear()
+    first = TicketManager(first_tracker, path=path, backoff=0.01)
+    second = TicketManager(second_tracker, path=path, backoff=0.01)
+    assert first.submit("sig", "QA Failure", "from worker 1")["status"] == "queued"
+    # Commented while the first worker is still creating the ticket
+    assert second.submit("sig", "QA Failure", "from worker 2")["status"] == "commented"
+    first_tracker.release.set()
+    assert first.flush(5) and second.flush(5)
+    first.close()
+    second.close()
+    assert len(first_tracker.tickets) == 1 and not second_tracker.tickets
+    url = first.get("sig")
+    assert second_tracker.comments == [(url, "from worker 2")]
+    assert second.stats()["tickets"] == 1
+
+
+def test_json_ticket_index_is_migrated(tmp_path):
+    path = tmp_path / "tickets"
+    path.write_text(json.dumps({"sig": "https://tracker.local/QA-7"}))
+    tracker = MockTracker()
+    manager = TicketManager(tracker, path=str(path))
+    result = manager.submit("sig", "QA Failure", "analysis")
+    manager.close()
+    assert result == {"signature": "sig", "url": "https://tracker.local/QA-7", "status": "commented"}
+    assert (tmp_path / "tickets.json.bak").exists()
+
+
+def test_action_planner_skips_clean_runs():
+    tracker = MockTracker()
+    agent = ActionPlannerAgent("ActionPlanner", ticket_manager=TicketManager(tracker))
+    content = {"analysis": "No failures", "failed_tests": [], "signature": "da39a3ee5e6b4b0d"}
+    result = agent.process(Message("RootCause", "ActionPlanner", content)).content
+    agent.tickets.close()
+    assert (result["ticket"], result["ticket_status"]) == ("", "skipped")
+    assert agent.tickets.stats()["submitted"] == 0 and not tracker.tickets
+
+
+def test_action_planner_deduplicates_by_signature():
+    tracker = MockTracker()
+    agent = ActionPlannerAgent("ActionPlanner", ticket_manager=TicketManager(tracker))
+    content = {"analysis": "DB timeout", "failed_tests": ["[ERROR] test_login FAILED"], "signature": "abc"}
+    first = agent.process(Message("RootCause", "ActionPlanner", content)).content
+    second = agent.process(Message("RootCause", "ActionPlanner", content)).content
+    agent.tickets.close()
+    assert (first["ticket_status"], second["ticket_status"]) == ("queued", "commented")
+    assert len(tracker.tickets) == 1
+    (summary, description), = tracker.tickets.values()
+    assert summary == "QA Failure: [ERROR] test_login FAILED" and description == "DB timeout"
+
+
+def test_worker_logs_under_the_submitters_correlation_id():
+    from utils.logger import correlation_scope, get_correlation_id
+
+    seen = []
+
+    class RecordingTracker:
+        def create_ticket(self, summary, description):
+            seen.append(("create", get_correlation_id()))
+            return f"https://tracker.local/{summary}"
+
+        def add_comment(self, url, body):
+            seen.append(("comment", get_correlation_id()))
+
+    manager = TicketManager(RecordingTracker(), backoff=0.01)
+    with correlation_scope("req-1"):
+        manager.submit("sig-a", "a", "analysis a")
+    assert manager.flush(5)
+    with correlation_scope("req-2"):
+        manager.submit("sig-a", "a", "analysis a again")
+    assert manager.flush(5)
+    manager.close()
+    assert seen == [("create", "req-1"), ("comment", "req-2")]
@@ -0,0 +1,156 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+import agents.root_cause_agent as root_cause_agent
+from adk import Message
+from agents.root_cause_agent import RootCauseAnalyzerAgent
+from utils.vector_index import HashingVectorizer, VectorIndex
+
+TIMEOUT = "[ERROR] test_login FAILED TimeoutError: request timed out after 30s"
+DNS = "[ERROR] test_api FAILED socket.gaierror: Name or service not known"
+
+
+def test_vectorizer_is_deterministic_and_normalized():
+    vectors = HashingVectorizer(64).transform([TIMEOUT, TIMEOUT, ""])
+    assert vectors.shape == (3, 64)
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1)
+    assert (vectors[0] == vectors[1]).all()
+    assert not vectors[2].any()
+
+
+def test_search_ranks_similar_failures_first():
+    index = VectorIndex()
+    index.add("a", TIMEOUT, "Slow auth service")
+    index.add("b", DNS, "DNS outage")
+    results = index.search("[ERROR] test_signup FAILED TimeoutError: request timed out after 60s", k=2)
+    assert [r["signature"] for r in results] == ["a", "b"]
+    assert results[0]["similarity"] > 0.7 > results[1]["similarity"]
+    assert results[0]["analysis"] == "Slow auth service"
+
+
+def test_add_replaces_known_signature():
+    index = VectorIndex()
+    index.add("a", TIMEOUT, "first")
+    index.add("a", TIMEOUT, "second")
+    assert len(index) == 1
+    assert index.search(TIMEOUT, k=5)[0]["analysis"] == "second"
+
+
+def test_partitioned_search_matches_exact_and_sees_new_entries():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex(dim=32)
+    names = [str(i) for i in range(len(vectors))]
+    index.add_vectors(names, vectors, names, names)
+    index.partition(n_lists=20)
+    query = vectors[123]
+    assert index.search_vector(query, k=1, nprobe=3)[0]["signature"] == "123"
+    assert index.search_vector(query, k=1)[0]["signature"] == "123"
+    index.add_vectors(["new"], query[None, :], ["new"], ["new"])
+    found = {r["signature"] for r in index.search_vector(query, k=2, nprobe=3)}
+    assert found == {"123", "new"}
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = VectorIndex(dim=64)
+    index.add("a", TIMEOUT, "Slow auth service")
+    index.save(path)
+    loaded = VectorIndex(dim=64, path=path)
+    assert len(loaded) == 1
+    assert loaded.search(TIMEOUT)[0]["analysis"] == "Slow auth service"
+
+
+def _content(line):
+    return {"failed_tests": [line], "failures": [{"line": line}], "log_tail": line}
+
+
+def test_agent_reuses_near_identical_incident(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("LLM called")
+
+    monkeypatch.setattr(root_cause_agent, "run_llm", fail)
+    index = VectorIndex()
+    index.add("past", TIMEOUT, "Slow auth service")
+    agent = RootCauseAnalyzerAgent("RootCause", classifier=None, similar_index=index, reuse_similarity=0.95)
+    result = agent.process(Message("TestDiagnostics", "RootCause", _content(TIMEOUT.replace("30s", "31s")))).content
+    assert result["analysis"] == "Slow auth service"
+    assert result["analysis_source"] == "similar"
+    assert result["similar_incidents"][0]["signature"] == "past"
+
+
+def test_agent_adds_similar_incidents_to_prompt_and_learns(monkeypatch):
+    prompts = []
+
+    def llm(prompt, model):
+        prompts.append(prompt)
+        return "Auth service overloaded"
+
+    monkeypatch.setattr(root_cause_agent, "run_llm", llm)
+    index = VectorIndex()
+    index.add("past", TIMEOUT, "Slow auth service")
+    agent = RootCauseAnalyzerAgent("RootCause", classifier=None, similar_index=index,
+                                   min_similarity=0.3, reuse_similarity=1.01)
+    line = "[ERROR] test_logout FAILED TimeoutError: request timed out after 30s"
+    result = agent.process(Message("TestDiagnostics", "RootCause", _content(line))).content
+    assert result["analysis_source"] == "llm"
+    assert "Slow auth service" in prompts[0]
+    assert len(index) == 2
+    assert index.search(line, k=1)[0]["analysis"] == "Auth service overloaded"
+
+
+def test_agent_reuses_exact_repeat_but_keeps_it_out_of_the_prompt(monkeypatch):
+    prompts = []
+
+    def llm(prompt, model):
+        prompts.append(prompt)
+        return "Auth service overloaded"
+
+    monkeypatch.setattr(root_cause_agent, "run_llm", llm)
+    index = VectorIndex()
+    agent = RootCauseAnalyzerAgent("RootCause", classifier=None, similar_index=index,
+                                   min_similarity=0.3, reuse_similarity=0.97)
+    first = agent.process(Message("TestDiagnostics", "RootCause", _content(TIMEOUT))).content
+    assert first["analysis_source"] == "llm"
+    assert first["similar_incidents"] == []
+
+    repeat = agent.process(Message("TestDiagnostics", "RootCause", _content(TIMEOUT))).content
+    assert repeat["analysis_source"] == "similar"
+    assert repeat["analysis"] == "Auth service overloaded"
+    assert len(prompts) == 1
+
+    # Below the reuse threshold the same signature is still not offered as its own neighbour
+    agent.reuse_similarity = 1.01
+    agent.process(Message("TestDiagnostics", "RootCause", _content(TIMEOUT)))
+    assert "Auth service overloaded" not in prompts[1]
+
+
+def test_workers_sharing_a_path_merge_their_entries(tmp_path):
+    path = str(tmp_path / "index.npz")
+    first = VectorIndex(dim=64, path=path)
+    second = VectorIndex(dim=64, path=path)
+    first.add("a", TIMEOUT, "Slow auth service")
+    second.add("b", "[ERROR] test_db FAILED OperationalError: database is locked", "Lock contention")
+    first.save()
+    second.save()
+    assert {r["signature"] for r in second.search(TIMEOUT, k=5)} == {"a", "b"}
+
+    first.add("a", TIMEOUT, "Auth service overloaded")
+    first.save()
+    # Unchanged entries are refreshed from the file; changed ones win
+    second.save()
+    assert VectorIndex(dim=64, path=path).search(TIMEOUT, k=1)[0]["analysis"] == "Auth service overloaded"
+    assert len(VectorIndex(dim=64, path=path)) == 2
+
+
+def test_saving_indexes_do_not_stay_alive(tmp_path):
+    import gc
+    import weakref
+
+    index = VectorIndex(dim=64, path=str(tmp_path / "index.npz"))
+    ref = weakref.ref(index)
+    del index
+    gc.collect()
+    assert ref() is None
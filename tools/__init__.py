@@ -1,5 +1,6 @@
 from .grafana_tool import GrafanaTool
 from .jenkins_tool import JenkinsTool
 from .jira_tool import JiraTool
+from .ticket_manager import TicketManager
 
-__all__ = ["GrafanaTool", "JenkinsTool", "JiraTool"]
+__all__ = ["GrafanaTool", "JenkinsTool", "JiraTool", "TicketManager"]
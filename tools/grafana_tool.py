@@ -9,5 +9,5 @@ class GrafanaTool:
     def fetch_metrics(self) -> Dict[str, float]:
         logger = get_logger("GrafanaTool")
         metrics = {"MTTR": 42, "SuccessRate": 0.98}
-        logger.info(f"Fetched metrics: {metrics}")
+        logger.info("Fetched metrics: %s", metrics)
         return metrics
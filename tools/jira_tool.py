@@ -1,4 +1,6 @@
 # tools/jira_tool.py
+import hashlib
+from typing import List, Tuple
 from utils.logger import get_logger
 
 class JiraTool:
@@ -8,10 +10,34 @@ class JiraTool:
     @staticmethod
     def create_ticket(summary: str, description: str) -> str:
         logger = get_logger("JiraTool")
-        logger.info(f"Creating JIRA ticket: {summary}")
-        return f"https://mock-jira.local/ticket/QA-{hash(summary) % 1000}"
+        logger.info("Creating JIRA ticket: %s", summary)
+        # Stable across processes, unlike hash(), which is salted per interpreter
+        key = int(hashlib.sha1(f"{summary}\n{description}".encode("utf-8")).hexdigest()[:8], 16)
+        return f"https://mock-jira.local/ticket/QA-{key}"
+
+    @staticmethod
+    def create_tickets(tickets: List[Tuple[str, str]]) -> List[str]:
+        """
+        Create several tickets in one request.
+
+        Parameters
+        ----------
+        tickets : list of (summary, description)
+            Tickets to create.
+
+        Returns
+        -------
+        list of str
+            Ticket URLs in input order.
+        """
+        return [JiraTool.create_ticket(summary, description) for summary, description in tickets]
+
+    @staticmethod
+    def add_comment(ticket_url: str, body: str) -> None:
+        logger = get_logger("JiraTool")
+        logger.info("Commenting on JIRA ticket: %s", ticket_url)
 
 def create_jira_ticket(summary: str, description: str) -> str:
     """Legacy function wrapper."""
     return JiraTool.create_ticket(summary, description)
-# End of tools/jira_tool.py
\ No newline at end of file
+# End of tools/jira_tool.py
@@ -0,0 +1,415 @@
+# tools/ticket_manager.py
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.jira_tool import JiraTool
+from utils.logger import get_logger
+
+
+class TicketManager:
+    """
+    Deduplicated, batched ticket creation on a background queue.
+
+    Tickets are keyed by failure signature: the first submission for a
+    signature queues a ticket, later ones queue a comment on that ticket
+    instead of a duplicate. A worker thread drains the queue in batches,
+    creating the batch's tickets in one bulk call when the tracker supports
+    it and folding repeated comments on a ticket into one, and retries
+    failed tracker calls with jittered exponential backoff. ``submit`` never
+    waits on the tracker.
+
+    With a ``path``, the signature to ticket URL map lives in a SQLite
+    database that every process (e.g. each gunicorn worker) shares. A
+    process claims a signature with an atomic insert-if-absent before
+    queueing its ticket, so only one process creates it and the others
+    comment. A claim whose ticket never appears (its process died) is
+    taken over after ``claim_timeout`` seconds.
+
+    Parameters
+    ----------
+    tracker : object, optional
+        Provides ``create_ticket(summary, description) -> url`` and
+        ``add_comment(url, body)``, optionally ``create_tickets(pairs) -> urls``.
+        Defaults to :class:`tools.jira_tool.JiraTool`.
+    path : str, optional
+        SQLite database holding the signature to ticket URL map, shared by
+        processes and kept across restarts; ``None`` keeps it in this
+        process's memory only.
+    batch_size : int
+        Most queued operations handled per batch.
+    max_retries : int
+        Retries of a failed tracker call before its operations are dropped.
+    backoff : float
+        Initial retry delay in seconds, doubled per attempt.
+    max_backoff : float
+        Upper bound on one retry delay in seconds.
+    claim_timeout : float
+        Seconds after which another process may create the ticket for a
+        signature that was claimed but never got one.
+    """
+    def __init__(
+        self,
+        tracker: Any = None,
+        path: Optional[str] = None,
+        batch_size: int = 20,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        claim_timeout: float = 600.0,
+        busy_timeout_ms: int = 30000,
+    ):
+        self.tracker = tracker or JiraTool
+        self.path = path
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.logger = get_logger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._tickets: Dict[str, str] = {}
+        self._pending: set = set()
+        self._outstanding = 0
+        self._stop = threading.Event()
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stats = {"submitted": 0, "created": 0, "commented": 0, "retries": 0, "failed": 0}
+        self._local = threading.local()
+        # Identifies this process's claims; replaced after fork
+        self._token = uuid.uuid4().hex
+        if path:
+            legacy = self._read_legacy_index(path)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS tickets ("
+                    "signature TEXT PRIMARY KEY, url TEXT, owner TEXT, claimed_at REAL)"
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tickets (signature, url, claimed_at) VALUES (?, ?, ?)",
+                    [(signature, url, time.time()) for signature, url in legacy.items()],
+                )
+
+    @staticmethod
+    def _read_legacy_index(path: str) -> Dict[str, str]:
+        # Earlier versions kept the map in a JSON file at the same path
+        try:
+            with open(path, "rb") as f:
+                if f.read(1) != b"{":
+                    return {}
+                f.seek(0)
+                tickets = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        os.replace(path, f"{path}.json.bak")
+        return tickets
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, re-opened after fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _claim(self, signature: str) -> Tuple[bool, str]:
+        """
+        Claim ``signature`` in the shared index unless it has a ticket or a
+        live claim. Returns whether it was claimed and its URL, if any.
+        """
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT url, claimed_at FROM tickets WHERE signature = ?", (signature,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO tickets (signature, owner, claimed_at) VALUES (?, ?, ?)",
+                    (signature, self._token, now),
+                )
+                return True, ""
+            url, claimed_at = row
+            if url:
+                return False, url
+            if claimed_at is None or claimed_at < now - self.claim_timeout:
+                conn.execute(
+                    "UPDATE tickets SET owner = ?, claimed_at = ? WHERE signature = ?",
+                    (self._token, now, signature),
+                )
+                return True, ""
+            return False, ""
+
+    def _ensure_worker(self) -> queue.Queue:
+        # Called with the lock held. A forked child (e.g. a gunicorn worker)
+        # inherits neither the worker thread nor, usefully, the parent's queue.
+        if self._pid != os.getpid():
+            if self._pid is not None:
+                self._token = uuid.uuid4().hex
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._pending.clear()
+            self._outstanding = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name="TicketManager", daemon=True)
+            self._thread.start()
+        return self._queue
+
+    def submit(self, signature: str, summary: str, description: str) -> Dict[str, str]:
+        """
+        Queue a ticket for ``signature``, or a comment if it already has one.
+
+        Parameters
+        ----------
+        signature : str
+            Failure signature identifying the ticket.
+        summary : str
+            Ticket summary, used if a ticket is created.
+        description : str
+            Ticket description, or the comment body for a repeat.
+
+        Returns
+        -------
+        dict
+            ``signature``, ``url`` (empty until the ticket exists) and
+            ``status``: ``"queued"`` for a new ticket or ``"commented"``
+            for a repeat of a known or queued one.
+        """
+        with self._lock:
+            url = self._tickets.get(signature, "")
+            known = bool(url) or signature in self._pending
+        claimed = False
+        if not known and self.path:
+            claimed, url = self._claim(signature)
+        with self._lock:
+            work = self._ensure_worker()
+            self._stats["submitted"] += 1
+            self._outstanding += 1
+            if url:
+                self._tickets[signature] = url
+            if self.path:
+                create = claimed
+            else:
+                create = not url and signature not in self._pending
+            # The worker logs each operation under its submitter's correlation ID
+            context = contextvars.copy_context()
+            if not create:
+                work.put(("comment", signature, description, context))
+                return {"signature": signature, "url": url, "status": "commented"}
+            self._pending.add(signature)
+            work.put(("create", signature, summary, description, context))
+            return {"signature": signature, "url": "", "status": "queued"}
+
+    def get(self, signature: str) -> Optional[str]:
+        """Return the ticket URL for ``signature``, if it has been created (by any process)."""
+        with self._lock:
+            url = self._tickets.get(signature)
+        if url or not self.path:
+            return url
+        row = self._connection().execute("SELECT url FROM tickets WHERE signature = ?", (signature,)).fetchone()
+        if row is None or not row[0]:
+            return None
+        with self._lock:
+            self._tickets[signature] = row[0]
+        return row[0]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted operation is handled; return False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush for up to ``timeout`` seconds, then stop the worker."""
+        self.flush(timeout)
+        self._stop.set()
+        with self._lock:
+            work, thread = self._queue, self._thread
+        if work is not None and thread is not None and self._pid == os.getpid():
+            work.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return ticket metrics.
+
+        Returns
+        -------
+        dict
+            ``submitted``, ``created``, ``commented``, ``retries``, ``failed``
+            (operations dropped after exhausting retries), ``pending``
+            (operations not handled yet) and ``tickets`` (signatures with a
+            ticket, in the shared index when there is one).
+        """
+        with self._lock:
+            stats = dict(self._stats, pending=self._outstanding, tickets=len(self._tickets))
+        if self.path:
+            (stats["tickets"],) = self._connection().execute(
+                "SELECT COUNT(*) FROM tickets WHERE url IS NOT NULL"
+            ).fetchone()
+        return stats
+
+    def _run(self, work: queue.Queue) -> None:
+        while not self._stop.is_set():
+            item = work.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = work.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stop.set()
+                    break
+                batch.append(item)
+            try:
+                self._handle(batch)
+            except Exception as e:
+                self.logger.error("Ticket batch failed: %s", e)
+            finally:
+                with self._idle:
+                    self._outstanding -= len(batch)
+                    self._idle.notify_all()
+
+    def _handle(self, batch: List[Tuple]) -> None:
+        creates = [item[1:] for item in batch if item[0] == "create"]
+        comments: Dict[str, List[Tuple[str, contextvars.Context]]] = {}
+        for item in batch:
+            if item[0] == "comment":
+                comments.setdefault(item[1], []).append(item[2:])
+        if creates:
+            self._create(creates)
+        for signature, submissions in comments.items():
+            # Folded into one comment, logged under the latest submitter's ID
+            submissions[-1][1].run(self._comment, signature, [body for body, _ in submissions])
+
+    def _comment(self, signature: str, bodies: List[str]) -> None:
+        try:
+            url = self._call(self._created_url, signature)
+        except LookupError:
+            url = None
+        if not url:
+            # The ticket could not be created; the next submission retries it.
+            self._count("failed", len(bodies))
+            return
+        body = bodies[-1] if len(bodies) == 1 else f"Recurred {len(bodies)} more times. Latest analysis:\n{bodies[-1]}"
+        try:
+            self._call(self.tracker.add_comment, url, body)
+            self._count("commented", len(bodies))
+        except Exception as e:
+            self.logger.error("Could not comment on %s: %s", url, e)
+            self._count("failed", len(bodies))
+
+    def _created_url(self, signature: str) -> Optional[str]:
+        # Raises while the ticket is still being created, here or by the
+        # process that claimed it, so _call waits for it with backoff
+        url = self.get(signature)
+        if url:
+            return url
+        with self._lock:
+            pending = signature in self._pending
+        if not pending and self.path:
+            row = self._connection().execute(
+                "SELECT claimed_at FROM tickets WHERE signature = ?", (signature,)
+            ).fetchone()
+            pending = row is not None and row[0] is not None and row[0] >= time.time() - self.claim_timeout
+        if pending:
+            raise LookupError(f"ticket for {signature} is not created yet")
+        return None
+
+    def _create(self, creates: List[Tuple[str, str, str, contextvars.Context]]) -> None:
+        pairs = [(summary, description) for _, summary, description, _ in creates]
+        try:
+            if hasattr(self.tracker, "create_tickets"):
+                # One call for the whole batch, under the first submitter's ID
+                urls = creates[0][3].run(self._call, self.tracker.create_tickets, pairs)
+            else:
+                urls = [context.run(self._call, self.tracker.create_ticket, summary, description)
+                        for _, summary, description, context in creates]
+        except Exception as e:
+            for signature, _, _, context in creates:
+                context.run(self.logger.error, "Could not create ticket for %s: %s", signature, e)
+            urls = [None] * len(creates)
+        if self.path:
+            # Record the tickets, and release failed claims so the next
+            # submission (from any process) retries them
+            try:
+                conn = self._connection()
+                with conn:
+                    for (signature, _, _, _), url in zip(creates, urls):
+                        if url:
+                            conn.execute("UPDATE tickets SET url = ? WHERE signature = ?", (url, signature))
+                        else:
+                            conn.execute(
+                                "DELETE FROM tickets WHERE signature = ? AND url IS NULL AND owner = ?",
+                                (signature, self._token),
+                            )
+            except sqlite3.Error as e:
+                # Known to this process only; other processes take the claim over after claim_timeout
+                self.logger.error("Could not record %d ticket(s) in %s: %s", len(creates), self.path, e)
+        with self._lock:
+            for (signature, _, _, _), url in zip(creates, urls):
+                self._pending.discard(signature)
+                if url:
+                    self._tickets[signature] = url
+                    self._stats["created"] += 1
+                else:
+                    self._stats["failed"] += 1
+
+    def _call(self, fn: Callable, *args) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self.logger.warning("Tracker call failed (%s); retrying in %.2fs", e, delay)
+                self._count("retries")
+                if self._stop.wait(delay):
+                    raise
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+
+_manager: Optional[TicketManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_ticket_manager() -> TicketManager:
+    """
+    Return the process-wide ticket manager, creating it on first use.
+
+    Configured by ``TICKET_INDEX_PATH``, ``TICKET_BATCH_SIZE`` and
+    ``TICKET_MAX_RETRIES``; queued tickets are flushed at interpreter exit.
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                from utils.config import TICKET_BATCH_SIZE, TICKET_INDEX_PATH, TICKET_MAX_RETRIES
+                _manager = TicketManager(
+                    path=TICKET_INDEX_PATH or None,
+                    batch_size=TICKET_BATCH_SIZE,
+                    max_retries=TICKET_MAX_RETRIES,
+                )
+                atexit.register(_manager.close)
+    return _manager
+# End of tools/ticket_manager.py
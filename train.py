@@ -1,45 +1,107 @@
 #!/usr/bin/env python3
 """
 Training script for QAOps Multi-Agent System
-Trains agents and saves model artifacts
+Trains the local failure classifier and saves model artifacts
+
+Usage: python train.py [--data data/training/labeled_failures.jsonl]
+                       [--output models/failure_classifier.npz] [--threshold 0.8]
+
+Training data is JSONL, one labeled historical failure per line:
+    {"log": "<CI log>", "label": "timeout", "analysis": "<root-cause analysis>"}
+"analysis" is the RCA returned for the label when the classifier is
+confident enough to skip the LLM; labels without one (e.g. "other") always
+go to the LLM.
 """
 
+import argparse
 import json
+from collections import Counter
 from pathlib import Path
+from adk import Message
 from agents.test_diagnostics_agent import TestDiagnosticsAgent
-from agents.root_cause_agent import RootCauseAnalyzerAgent
-from agents.action_planner_agent import ActionPlannerAgent
+from utils.config import RCA_CLASSIFIER_PATH, RCA_CLASSIFIER_THRESHOLD
+from utils.failure_classifier import FailureClassifier, failure_text
 from utils.logger import get_logger
 
+DEFAULT_DATA = Path("data") / "training" / "labeled_failures.jsonl"
+
 def train_agents():
     """Initialize and configure agents"""
     logger = get_logger("TrainingPipeline")
-    
-    # Initialize agents
-    agents = {
-        'diagnostics': TestDiagnosticsAgent("TestDiagnostics"),
-        'root_cause': RootCauseAnalyzerAgent("RootCause"),
-        'action_planner': ActionPlannerAgent("ActionPlanner")
-    }
-    
+
     # Create models directory
     models_dir = Path("models")
     models_dir.mkdir(exist_ok=True)
-    
+
     # Save agent configurations only (NOT agent objects)
     agent_config = {
         'version': '1.0',
-        'agents': list(agents.keys()),
+        'agents': ['diagnostics', 'root_cause', 'action_planner'],
         'trained_at': str(Path.cwd()),
         'note': 'Agent objects are instantiated at runtime, not pickled'
     }
-    
+
     with open(models_dir / "agent_config.json", "w") as f:
         json.dump(agent_config, f, indent=2)
-    
+
     logger.info("Agents initialized successfully (no pickling required)")
     logger.info(f"Configuration saved to {models_dir / 'agent_config.json'}")
     return models_dir
 
+def load_examples(data_path):
+    """Read labeled failures and extract the classifier text of each log with the diagnostics agent"""
+    diagnostics = TestDiagnosticsAgent("TestDiagnostics")
+    texts, labels, analyses = [], [], {}
+    with open(data_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            content = diagnostics.process(Message("Training", "TestDiagnostics", example["log"])).content
+            texts.append(failure_text(content))
+            labels.append(example["label"])
+            if example.get("analysis"):
+                analyses.setdefault(example["label"], Counter())[example["analysis"]] += 1
+    # The most common analysis per label is the one served
+    return texts, labels, {label: counts.most_common(1)[0][0] for label, counts in analyses.items()}
+
+def evaluate(texts, labels, analyses, threshold, holdout_every=5):
+    """Hold out every n-th example and report accuracy and fast-path coverage/precision at the threshold"""
+    train = [i for i in range(len(texts)) if i % holdout_every]
+    test = [i for i in range(len(texts)) if not i % holdout_every]
+    model = FailureClassifier.fit([texts[i] for i in train], [labels[i] for i in train], analyses)
+    correct = answered = answered_correct = 0
+    for i in test:
+        label, confidence = model.predict(texts[i])
+        correct += label == labels[i]
+        if confidence >= threshold and label in analyses:
+            answered += 1
+            answered_correct += label == labels[i]
+    return {
+        "holdout_examples": len(test),
+        "accuracy": correct / len(test) if test else 0.0,
+        "fast_path_coverage": answered / len(test) if test else 0.0,
+        "fast_path_precision": answered_correct / answered if answered else 0.0,
+    }
+
+def train_classifier(data_path=DEFAULT_DATA, output_path=RCA_CLASSIFIER_PATH, threshold=RCA_CLASSIFIER_THRESHOLD):
+    """Train the failure classifier on all examples and save it; returns the holdout report"""
+    logger = get_logger("TrainingPipeline")
+    texts, labels, analyses = load_examples(data_path)
+    report = evaluate(texts, labels, analyses, threshold)
+    model = FailureClassifier.fit(texts, labels, analyses)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    model.save(str(output_path))
+    report.update(examples=len(texts), labels=model.labels, features=len(model.vocabulary), threshold=threshold)
+    logger.info(f"Failure classifier saved to {output_path}: {report}")
+    return report
+
 if __name__ == "__main__":
-    train_agents()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=str(DEFAULT_DATA), help="Labeled failures (JSONL)")
+    parser.add_argument("--output", default=RCA_CLASSIFIER_PATH, help="Classifier file to write")
+    parser.add_argument("--threshold", type=float, default=RCA_CLASSIFIER_THRESHOLD,
+                        help="Confidence needed to skip the LLM (used for the holdout report)")
+    args = parser.parse_args()
+    train_agents()
+    print(json.dumps(train_classifier(args.data, args.output, args.threshold), indent=2))
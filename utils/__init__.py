@@ -1,3 +1,3 @@
-from .memory_handler import read_memory, update_memory, clear_memory
+from .memory_handler import read_memory, update_memory, update_memory_batch, clear_memory
 
-__all__ = ["read_memory", "update_memory", "clear_memory"]
+__all__ = ["read_memory", "update_memory", "update_memory_batch", "clear_memory"]
@@ -9,9 +9,89 @@ logger = logging.getLogger("Config")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 LLM_MODEL = os.getenv("LLM_MODEL", "gemini/gemini-2.5-flash-lite")
+# Optional override of the Gemini API endpoint (e.g. a proxy or local stub)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 
 if not GOOGLE_API_KEY:
     logger.warning("GOOGLE_API_KEY not found in environment variables")
 
 if not OPENAI_API_KEY:
-    logger.warning("OPENAI_API_KEY not found in environment variables")
\ No newline at end of file
+    logger.warning("OPENAI_API_KEY not found in environment variables")
+# Root-cause prompt budget (see utils/prompt_builder.py)
+RCA_PROMPT_MAX_TOKENS = int(os.getenv("RCA_PROMPT_MAX_TOKENS", "2000"))
+RCA_TAIL_LINES = int(os.getenv("RCA_TAIL_LINES", "20"))
+
+# Parallel diagnostics of large log files (see agents/test_diagnostics_agent.py)
+DIAGNOSTICS_PROCESSES = int(os.getenv("DIAGNOSTICS_PROCESSES", "0")) or os.cpu_count() or 1
+DIAGNOSTICS_PARALLEL_MIN_BYTES = int(os.getenv("DIAGNOSTICS_PARALLEL_MIN_BYTES", str(256 * 1024 * 1024)))
+
+# Per-model LLM call limits and retries (see utils/rate_limiter.py)
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "0"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+LLM_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "30"))
+
+# LLM response cache (see utils/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH")
+LLM_CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "100000"))
+
+# Memory bank backend (see utils/memory_store.py): "sqlite" or legacy "json"
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "sqlite").lower()
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "memory_bank.db")
+
+# Failure fingerprint index (see utils/fingerprint.py); empty keeps it in memory only
+FINGERPRINT_INDEX_PATH = os.getenv("FINGERPRINT_INDEX_PATH")
+FINGERPRINT_INDEX_MAX_ENTRIES = int(os.getenv("FINGERPRINT_INDEX_MAX_ENTRIES", "100000"))
+FINGERPRINT_INDEX_TTL_SECONDS = float(os.getenv("FINGERPRINT_INDEX_TTL_SECONDS", "2592000"))
+
+# Ticket deduplication and batching (see tools/ticket_manager.py)
+TICKET_INDEX_PATH = os.getenv("TICKET_INDEX_PATH")
+TICKET_BATCH_SIZE = int(os.getenv("TICKET_BATCH_SIZE", "20"))
+TICKET_MAX_RETRIES = int(os.getenv("TICKET_MAX_RETRIES", "5"))
+
+# Background prediction jobs for POST /jobs (see utils/job_queue.py)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Metrics shared by worker processes (see utils/metrics.py, gunicorn.conf.py)
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Local failure classifier fast path (see utils/failure_classifier.py, train.py)
+RCA_CLASSIFIER_PATH = os.getenv("RCA_CLASSIFIER_PATH", "models/failure_classifier.npz")
+RCA_CLASSIFIER_THRESHOLD = float(os.getenv("RCA_CLASSIFIER_THRESHOLD", "0.8"))
+
+# Similar-incident retrieval for RCA (see utils/vector_index.py)
+RCA_INDEX_PATH = os.getenv("RCA_INDEX_PATH", "")
+RCA_INDEX_DIM = int(os.getenv("RCA_INDEX_DIM", "256"))
+RCA_INDEX_TOP_K = int(os.getenv("RCA_INDEX_TOP_K", "3"))
+RCA_INDEX_MIN_SIMILARITY = float(os.getenv("RCA_INDEX_MIN_SIMILARITY", "0.5"))
+RCA_INDEX_REUSE_SIMILARITY = float(os.getenv("RCA_INDEX_REUSE_SIMILARITY", "0.97"))
+RCA_INDEX_NPROBE = int(os.getenv("RCA_INDEX_NPROBE", "16"))
+
+# Tracing pipeline (see observability.py, utils/telemetry.py)
+TRACE_EXPORTERS = [name.strip() for name in os.getenv("TRACE_EXPORTERS", "monocle").split(",") if name.strip()]
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "traces.jsonl")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+TRACE_TAIL_SAMPLE_RATIO = float(os.getenv("TRACE_TAIL_SAMPLE_RATIO", "1.0"))
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "5.0"))
+TRACE_BUFFER_SPANS = int(os.getenv("TRACE_BUFFER_SPANS", "2048"))
+TRACE_EXPORT_BATCH_SIZE = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "512"))
+TRACE_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "2.0"))
+
+# Logging (see utils/logger.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() == "true"
+LOG_ASYNC = os.getenv("LOG_ASYNC", "false").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "0"))
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
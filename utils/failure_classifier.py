@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.fingerprint import normalize_failure
+
+_TOKEN = re.compile(r"[a-z][a-z0-9_]+")
+FORMAT_VERSION = 1
+
+
+def failure_text(content: Dict[str, Any]) -> str:
+    """
+    Return the text the classifier sees for a diagnostics result.
+
+    Parameters
+    ----------
+    content : dict
+        Diagnostics message content: ``failed_tests`` and, optionally,
+        ``failures`` records with their ``frames``.
+
+    Returns
+    -------
+    str
+        Failure lines followed by their stack frames, one per line.
+    """
+    lines = list(content.get("failed_tests") or [])
+    for failure in content.get("failures") or ():
+        lines.extend(failure.get("frames", ()))
+    return "\n".join(lines)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split normalized, lower-cased text into word unigrams and bigrams.
+
+    Volatile tokens are replaced first (see
+    :func:`utils.fingerprint.normalize_failure`), so timestamps, ids and
+    addresses do not become features.
+    """
+    words = _TOKEN.findall(normalize_failure(text).lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class FailureClassifier:
+    """
+    TF-IDF features with a multinomial logistic regression over failure labels.
+
+    Trained with full-batch gradient descent in NumPy, so no ML framework is
+    needed at training or serving time. Each label can carry a canonical
+    root-cause analysis, returned when the model is confident enough to skip
+    the LLM.
+
+    Parameters
+    ----------
+    vocabulary : dict
+        Token to feature index.
+    idf : np.ndarray
+        Inverse document frequency per feature.
+    coef : np.ndarray
+        ``(n_labels, n_features)`` weights.
+    intercept : np.ndarray
+        ``(n_labels,)`` biases.
+    labels : list of str
+        Label names.
+    analyses : dict
+        Canonical analysis per label; labels without one never short-circuit.
+    """
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        idf: np.ndarray,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        labels: Sequence[str],
+        analyses: Optional[Dict[str, str]] = None,
+    ):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.coef = coef
+        self.intercept = intercept
+        self.labels = list(labels)
+        self.analyses = dict(analyses or {})
+
+    def _features(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        features = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                index = self.vocabulary.get(token)
+                if index is not None:
+                    features[row, index] += 1
+        np.log1p(features, out=features)
+        features *= self.idf
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        return features / np.maximum(norms, 1e-12)
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        analyses: Optional[Dict[str, str]] = None,
+        min_df: int = 1,
+        l2: float = 1e-4,
+        learning_rate: float = 2.0,
+        epochs: int = 500,
+    ) -> "FailureClassifier":
+        """
+        Train a classifier.
+
+        Parameters
+        ----------
+        texts : sequence of str
+            Failure text per example (see :func:`failure_text`).
+        labels : sequence of str
+            Label per example.
+        analyses : dict, optional
+            Canonical analysis per label.
+        min_df : int
+            Drop tokens seen in fewer examples.
+        l2 : float
+            L2 penalty on the weights.
+        learning_rate : float
+            Gradient descent step size.
+        epochs : int
+            Gradient descent iterations.
+        """
+        document_frequency: Dict[str, int] = {}
+        for text in texts:
+            for token in set(tokenize(text)):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        kept = sorted(token for token, count in document_frequency.items() if count >= min_df)
+        vocabulary = {token: index for index, token in enumerate(kept)}
+        counts = np.array([document_frequency[token] for token in kept], dtype=np.float32)
+        idf = (np.log((1 + len(texts)) / (1 + counts)) + 1).astype(np.float32)
+
+        label_names = sorted(set(labels))
+        model = cls(vocabulary, idf, np.zeros((len(label_names), len(kept)), np.float32),
+                    np.zeros(len(label_names), np.float32), label_names, analyses)
+        features = model._features(texts)
+        targets = np.zeros((len(texts), len(label_names)), dtype=np.float32)
+        targets[np.arange(len(texts)), [label_names.index(label) for label in labels]] = 1
+        for _ in range(epochs):
+            error = model._softmax(features) - targets
+            model.coef -= learning_rate * (error.T @ features / len(texts) + l2 * model.coef)
+            model.intercept -= learning_rate * error.mean(axis=0)
+        return model
+
+    def _softmax(self, features: np.ndarray) -> np.ndarray:
+        logits = features @ self.coef.T + self.intercept
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Return ``(n_texts, n_labels)`` probabilities, ordered as :attr:`labels`."""
+        return self._softmax(self._features(texts))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Return the most likely label and its probability.
+
+        Text with no known token gets confidence 0, since nothing the model
+        learned applies to it.
+        """
+        features = self._features([text])
+        if not features.any():
+            return self.labels[0], 0.0
+        probabilities = self._softmax(features)[0]
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str) -> None:
+        """Write the model to one compressed ``.npz`` file (no pickle)."""
+        metadata = {
+            "format_version": FORMAT_VERSION,
+            "vocabulary": sorted(self.vocabulary, key=self.vocabulary.get),
+            "labels": self.labels,
+            "analyses": self.analyses,
+        }
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                metadata=np.frombuffer(json.dumps(metadata).encode("utf-8"), dtype=np.uint8),
+                idf=self.idf,
+                coef=self.coef,
+                intercept=self.intercept,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "FailureClassifier":
+        """Read a model written by :meth:`save`."""
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(data["metadata"].tobytes().decode("utf-8"))
+            if metadata.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported classifier format: {metadata.get('format_version')}")
+            vocabulary = {token: index for index, token in enumerate(metadata["vocabulary"])}
+            return cls(vocabulary, data["idf"], data["coef"], data["intercept"],
+                       metadata["labels"], metadata["analyses"])
+
+
+_classifier: Optional[FailureClassifier] = None
+_classifier_loaded = False
+_classifier_lock = threading.Lock()
+
+
+def get_failure_classifier() -> Optional[FailureClassifier]:
+    """
+    Return the process-wide classifier loaded from ``RCA_CLASSIFIER_PATH``.
+
+    Returns
+    -------
+    FailureClassifier or None
+        None if no model has been trained (see ``train.py``) or it cannot
+        be loaded.
+    """
+    global _classifier, _classifier_loaded
+    if not _classifier_loaded:
+        with _classifier_lock:
+            if not _classifier_loaded:
+                from utils.config import RCA_CLASSIFIER_PATH, logger
+                if RCA_CLASSIFIER_PATH and os.path.exists(RCA_CLASSIFIER_PATH):
+                    try:
+                        _classifier = FailureClassifier.load(RCA_CLASSIFIER_PATH)
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.warning(f"Could not load failure classifier {RCA_CLASSIFIER_PATH}: {e}")
+                _classifier_loaded = True
+    return _classifier
@@ -0,0 +1,305 @@
+import mmap
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+
+@dataclass(frozen=True)
+class FailureRule:
+    """
+    A single failure signature.
+
+    Attributes
+    ----------
+    name : str
+        Unique rule name, reported with every match.
+    pattern : str
+        Regular expression for the marker. It must not span lines.
+    category : str
+        Failure category, e.g. ``"assertion"`` or ``"timeout"``.
+    severity : str
+        ``"critical"``, ``"error"`` or ``"warning"``.
+    ignore_case : bool
+        Match the pattern case-insensitively.
+    keywords : tuple of str
+        Literal strings, at least one of which occurs in every line the
+        pattern matches. They feed the fast scanning pass; when empty, the
+        pattern itself is used for scanning.
+    """
+    name: str
+    pattern: str
+    category: str
+    severity: str = "error"
+    ignore_case: bool = False
+    keywords: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class FailureMatch:
+    """A log line matched by a :class:`FailureRule`."""
+    line_number: int
+    line: str
+    test_id: Optional[str]
+    severity: str
+    category: str
+    rule: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "line_number": self.line_number,
+            "line": self.line,
+            "test_id": self.test_id,
+            "severity": self.severity,
+            "category": self.category,
+            "rule": self.rule,
+        }
+
+
+# Ordered by priority: when several rules hit the same line, the first wins.
+DEFAULT_RULES = (
+    FailureRule("junit_failure", r"<(?:failure|error)\b", "junit",
+                keywords=("<failure", "<error")),
+    FailureRule("python_traceback", r"Traceback \(most recent call last\)", "exception",
+                keywords=("Traceback",)),
+    FailureRule("assertion_error", r"Assertion(?:Error|FailedError)\b", "assertion",
+                keywords=("Assertion",)),
+    FailureRule("out_of_memory", r"OutOfMemoryError|MemoryError|OOMKilled|Killed process", "resource", "critical",
+                keywords=("MemoryError", "OOMKilled", "Killed process")),
+    FailureRule("timeout", r"Timeout(?:Error|Exception)|timed out", "timeout",
+                keywords=("Timeout", "timed out")),
+    FailureRule("connection_error", r"Connection refused|Connect(?:ion)?(?:Error|Exception)\b", "connection",
+                keywords=("Connect",)),
+    FailureRule("test_failure", r"FAIL|\bTest failed\b", "test_failure",
+                keywords=("FAIL", "Test failed")),
+    FailureRule("fatal", r"FATAL|CRITICAL", "fatal", "critical",
+                keywords=("FATAL", "CRITICAL")),
+    FailureRule("exception", r"(?:Exception|Error):", "exception",
+                keywords=("Exception:", "Error:")),
+    FailureRule("error_marker", r"ERROR", "error",
+                keywords=("ERROR",)),
+)
+
+_TEST_ID_PATTERN = re.compile(
+    r"(?P<node>[\w./\\-]+\.py::[\w\[\]\-.:]+)"
+    r"|\b(?P<dotted>(?:[\w$]+\.)*[Tt]est[\w$]+(?:\.[\w$]+)*)"
+)
+
+
+def extract_test_id(line: str) -> Optional[str]:
+    """
+    Extract a test identifier (pytest node id or dotted JUnit name) from a line.
+
+    Parameters
+    ----------
+    line : str
+        A single log line.
+
+    Returns
+    -------
+    str or None
+        The test id if one is found.
+    """
+    if "test" not in line and "Test" not in line:
+        return None
+    match = _TEST_ID_PATTERN.search(line)
+    return match.group(0) if match else None
+
+
+LogBuffer = Union[str, bytes, bytearray, mmap.mmap]
+
+# Java/JS "at ..." frames and Python 'File "...", line N' frames. Anchoring on
+# the preceding newline gives the regex a literal prefix to scan for.
+_STACK_FRAME_BODY = r"(?:[ \t]+at |[ \t]*File \"[^\n]*\", line \d)[^\n]*"
+_STACK_FRAME_PATTERNS = {
+    str: (re.compile(r"\n(" + _STACK_FRAME_BODY + ")"), re.compile(_STACK_FRAME_BODY)),
+    bytes: (re.compile(rb"\n(" + _STACK_FRAME_BODY.encode() + rb")"), re.compile(_STACK_FRAME_BODY.encode())),
+}
+_COUNT_STEP = 1024 * 1024
+
+
+def count_newlines(buffer: LogBuffer, start: int = 0, end: Optional[int] = None) -> int:
+    """Count ``"\n"`` in ``buffer[start:end]`` without copying more than a bounded slice at a time."""
+    if end is None:
+        end = len(buffer)
+    if isinstance(buffer, str):
+        return buffer.count("\n", start, end)
+    if isinstance(buffer, (bytes, bytearray)):
+        return buffer.count(b"\n", start, end)
+    # mmap has no count(); slice it in bounded steps instead.
+    return sum(buffer[pos:min(pos + _COUNT_STEP, end)].count(b"\n") for pos in range(start, end, _COUNT_STEP))
+
+
+def find_stack_frames(text: LogBuffer, first_line: int = 1, encoding: str = "utf-8",
+                      start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield the stack-frame lines in a block of log text.
+
+    Parameters
+    ----------
+    text : str, bytes or mmap.mmap
+        Log text made of whole lines. Byte buffers are searched in place and
+        only the frame lines are decoded.
+    first_line : int
+        Line number of the first line in ``text``.
+    encoding : str
+        Encoding of byte buffers; undecodable bytes are replaced.
+    start, end : int
+        Search only ``text[start:end]``, which must begin at a line start
+        (e.g. one shard of a memory-mapped file); ``first_line`` is the
+        number of the line at ``start``.
+
+    Yields
+    ------
+    tuple of (int, str)
+        Line number and line of each frame, in order.
+    """
+    is_text = isinstance(text, str)
+    pattern, start_pattern = _STACK_FRAME_PATTERNS[str if is_text else bytes]
+    decode = (lambda line: line) if is_text else (lambda line: line.decode(encoding, errors="replace"))
+    if end is None:
+        end = len(text)
+    match = start_pattern.match(text, start, end)
+    if match:
+        yield first_line, decode(match.group(0))
+    pos = start
+    line_number = first_line
+    for match in pattern.finditer(text, start, end):
+        line_number += count_newlines(text, pos, match.start(1))
+        pos = match.start(1)
+        yield line_number, decode(match.group(1))
+
+
+class FailureMatcher:
+    """
+    Compiles failure rules into one alternation and scans logs in a single pass.
+
+    Rule keywords are compiled into a flat alternation of literals, which
+    the regex engine scans through whole blocks of text in C. Python only
+    runs for candidate lines, which are then confirmed and classified by
+    the full rule expressions in priority order.
+    """
+    def __init__(self, rules: Optional[Sequence[FailureRule]] = None):
+        self.rules = tuple(DEFAULT_RULES if rules is None else rules)
+        if not self.rules:
+            raise ValueError("FailureMatcher requires at least one rule")
+        bodies = [
+            f"(?i:{rule.pattern})" if rule.ignore_case else f"(?:{rule.pattern})"
+            for rule in self.rules
+        ]
+        # A flat literal alternation keeps the regex engine's first-character
+        # prefilter; nested groups and named groups both defeat it.
+        scan_terms = set()
+        for rule, body in zip(self.rules, bodies):
+            if rule.keywords and not rule.ignore_case:
+                scan_terms.update(re.escape(keyword) for keyword in rule.keywords)
+            else:
+                scan_terms.add(body)
+        scan_source = "|".join(sorted(scan_terms, key=lambda term: (-len(term), term)))
+        self._scan_pattern = re.compile(scan_source)
+        self._bytes_scan_pattern = re.compile(scan_source.encode("utf-8"))
+        self._rule_patterns = [(rule, re.compile(body).search) for rule, body in zip(self.rules, bodies)]
+
+    def _best_rule(self, line: str) -> Optional[FailureRule]:
+        for rule, search in self._rule_patterns:
+            if search(line):
+                return rule
+        return None
+
+    def _classify(self, line: str, line_number: int) -> Optional[FailureMatch]:
+        rule = self._best_rule(line)
+        if rule is None:
+            return None
+        return FailureMatch(
+            line_number=line_number,
+            line=line,
+            test_id=extract_test_id(line),
+            severity=rule.severity,
+            category=rule.category,
+            rule=rule.name,
+        )
+
+    def scan(self, text: str, first_line: int = 1) -> Iterator[FailureMatch]:
+        """
+        Yield one match per failing line in ``text``.
+
+        Parameters
+        ----------
+        text : str
+            Log text, typically a block of whole lines.
+        first_line : int
+            Line number of the first line in ``text``.
+        """
+        search = self._scan_pattern.search
+        pos = 0
+        line_number = first_line
+        while pos <= len(text):
+            match = search(text, pos)
+            if match is None:
+                return
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.start())
+            if end == -1:
+                end = len(text)
+            line_number += text.count("\n", pos, start)
+            failure = self._classify(text[start:end], line_number)
+            if failure is not None:
+                yield failure
+            pos = end + 1
+            line_number += 1
+
+    def scan_buffer(self, buffer: Union[bytes, bytearray, mmap.mmap], first_line: int = 1,
+                    encoding: str = "utf-8", start: int = 0, end: Optional[int] = None) -> Iterator[FailureMatch]:
+        """
+        Yield one match per failing line of a byte buffer, searched in place.
+
+        Unlike :meth:`scan`, the buffer is never decoded as a whole: the
+        keyword pass runs over the raw bytes (a memory-mapped file works
+        directly) and only candidate lines are decoded and classified.
+
+        Parameters
+        ----------
+        buffer : bytes, bytearray or mmap.mmap
+            Raw log content.
+        first_line : int
+            Line number of the first line in ``buffer``.
+        encoding : str
+            Encoding of the log; undecodable bytes are replaced.
+        start, end : int
+            Scan only ``buffer[start:end]``, which must begin at a line
+            start and end after a newline (or at the end of the buffer);
+            ``first_line`` is the number of the line at ``start``.
+        """
+        search = self._bytes_scan_pattern.search
+        size = len(buffer) if end is None else end
+        pos = start
+        line_number = first_line
+        while pos <= size:
+            match = search(buffer, pos, size)
+            if match is None:
+                return
+            line_start = buffer.rfind(b"\n", pos, match.start()) + 1 or pos
+            line_end = buffer.find(b"\n", match.start(), size)
+            if line_end == -1:
+                line_end = size
+            line_number += count_newlines(buffer, pos, line_start)
+            failure = self._classify(buffer[line_start:line_end].decode(encoding, errors="replace"), line_number)
+            if failure is not None:
+                yield failure
+            pos = line_end + 1
+            line_number += 1
+
+    def scan_blocks(self, blocks: Iterable[str], first_line: int = 1) -> Iterator[FailureMatch]:
+        """
+        Scan consecutive blocks of whole lines, keeping line numbers continuous.
+
+        Parameters
+        ----------
+        blocks : Iterable[str]
+            Blocks as produced by :func:`utils.log_stream.iter_log_blocks`.
+        first_line : int
+            Line number of the first line of the first block.
+        """
+        line_number = first_line
+        for block in blocks:
+            yield from self.scan(block, line_number)
+            line_number += block.count("\n")
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Volatile tokens, applied in order. Earlier patterns win, so e.g. a full
+# timestamp is replaced before its time-of-day part could match on its own.
+_VOLATILE_PATTERNS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TS>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"(?:/tmp|/var/folders|/private/var/folders|[A-Za-z]:\\[^\s]*?\\Temp)[/\\][^\s:'\"]*"), "<TMP>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\s?(?:ms|us|ns|s|sec|secs|seconds|m|min|mins|minutes)\b"), "<DUR>"),
+    (re.compile(r"#\d+\b"), "#<N>"),
+    (re.compile(r"\b[0-9a-fA-F]{12,}\b"), "<HEX>"),
+    (re.compile(r"\b\d{4,}\b"), "<N>"),
+]
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_failure(line: str) -> str:
+    """
+    Replace volatile tokens so recurring failures share one representation.
+
+    Timestamps, durations, hex addresses, UUIDs, temp paths, IP addresses,
+    build numbers and long numeric ids are replaced by placeholders; short
+    numbers such as source line numbers are kept.
+
+    Parameters
+    ----------
+    line : str
+        Failed-test log line.
+
+    Returns
+    -------
+    str
+        Normalized line.
+    """
+    for pattern, placeholder in _VOLATILE_PATTERNS:
+        line = pattern.sub(placeholder, line)
+    return _WHITESPACE.sub(" ", line).strip()
+
+
+def fingerprint(line: str) -> str:
+    """
+    Return the stable signature of a failure line.
+
+    Parameters
+    ----------
+    line : str
+        Raw failed-test log line.
+
+    Returns
+    -------
+    str
+        16 hex characters of the SHA-1 of the normalized line.
+    """
+    return hashlib.sha1(normalize_failure(line).encode("utf-8")).hexdigest()[:16]
+
+
+def failure_signature(failed_tests: Iterable[str]) -> str:
+    """
+    Return the order-independent signature of a job's failures.
+
+    Jobs that fail the same way share a signature regardless of failure
+    order, repeats and volatile tokens; it is used to coalesce RCA calls and
+    to deduplicate tickets.
+
+    Parameters
+    ----------
+    failed_tests : Iterable[str]
+        Raw failed-test log lines.
+
+    Returns
+    -------
+    str
+        16 hex characters of the SHA-1 of the sorted line fingerprints.
+    """
+    digest = hashlib.sha1("\n".join(sorted({fingerprint(test) for test in failed_tests})).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class FingerprintIndex:
+    """
+    Index of failure signatures in SQLite, in memory or shared through a file.
+
+    Each signature maps to its normalized text, the test names seen with it,
+    an occurrence count, first/last-seen timestamps and the last RCA result.
+    A secondary index gives the signatures seen for each test name.
+
+    Every occurrence is written as it is recorded, so processes sharing the
+    file (e.g. gunicorn workers) all add to the same counts. Signatures not
+    seen for ``ttl_seconds`` expire, and beyond ``max_entries`` the least
+    recently seen are dropped.
+
+    Parameters
+    ----------
+    path : str, optional
+        SQLite file to keep the index in (WAL mode); ``None`` keeps it in
+        memory only. A JSON index saved there by earlier versions is
+        imported and moved to ``<path>.json.bak``.
+    max_entries : int
+        Signatures to keep; 0 for no limit.
+    ttl_seconds : float
+        Drop signatures not seen for this long; 0 keeps them forever.
+    prune_every : int
+        Enforce ``max_entries`` and ``ttl_seconds`` after this many recorded
+        occurrences in this process.
+    busy_timeout_ms : int
+        How long a write waits for other processes' transactions.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 0.0,
+        prune_every: int = 100,
+        busy_timeout_ms: int = 30000,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._unpruned = 0
+        # Without a file, one connection serves every thread under the lock
+        self._memory = None if path else sqlite3.connect(":memory:", check_same_thread=False)
+        legacy = self._read_legacy_index(path) if path else []
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                "signature TEXT PRIMARY KEY, normalized TEXT, count INTEGER, "
+                "first_seen REAL, last_seen REAL, last_rca TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS fingerprints_last_seen ON fingerprints(last_seen)")
+            # rowid keeps each signature's tests in the order they were first seen
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprint_tests ("
+                "test_id TEXT, signature TEXT, UNIQUE (test_id, signature))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS fingerprint_tests_signature ON fingerprint_tests(signature)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?)",
+                [(r["signature"], r["normalized"], r["count"], r["first_seen"], r["last_seen"], r["last_rca"])
+                 for r in legacy],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO fingerprint_tests VALUES (?, ?)",
+                [(test_id, r["signature"]) for r in legacy for test_id in r["tests"]],
+            )
+
+    @staticmethod
+    def _read_legacy_index(path: str) -> List[Dict[str, Any]]:
+        # Earlier versions kept the records in a JSON file at the same path
+        try:
+            with open(path, "rb") as f:
+                if f.read(1) != b"[":
+                    return []
+                f.seek(0)
+                records = json.load(f)
+        except (OSError, ValueError):
+            return []
+        os.replace(path, f"{path}.json.bak")
+        return records
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, re-opened after fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        if self._memory is None:
+            conn = self._connection()
+            with conn:
+                yield conn
+        else:
+            with self._lock, self._memory:
+                yield self._memory
+
+    def record(self, line: str, test_id: Optional[str] = None, now: Optional[float] = None) -> str:
+        """
+        Count one occurrence of a failure line and return its signature.
+
+        Parameters
+        ----------
+        line : str
+            Raw failed-test log line.
+        test_id : str, optional
+            Test name associated with the failure.
+        now : float, optional
+            Occurrence time (defaults to ``time.time()``).
+        """
+        return self.record_failures([{"line": line, "test_id": test_id}], now)[0]
+
+    def record_failures(self, failures: Iterable[Dict[str, Any]], now: Optional[float] = None) -> List[str]:
+        """
+        Record diagnostics failure records (``line`` and optional ``test_id``) in one transaction.
+
+        Returns
+        -------
+        list of str
+            Signatures in input order.
+        """
+        now = time.time() if now is None else now
+        signatures, rows, tests = [], [], []
+        for failure in failures:
+            normalized = normalize_failure(failure["line"])
+            signature = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+            signatures.append(signature)
+            rows.append((signature, normalized, now, now))
+            if failure.get("test_id"):
+                tests.append((failure["test_id"], signature))
+        if not rows:
+            return signatures
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO fingerprints VALUES (?, ?, 1, ?, ?, NULL) "
+                "ON CONFLICT (signature) DO UPDATE SET "
+                "count = count + 1, last_seen = max(last_seen, excluded.last_seen)",
+                rows,
+            )
+            conn.executemany("INSERT OR IGNORE INTO fingerprint_tests VALUES (?, ?)", tests)
+        with self._lock:
+            self._unpruned += len(rows)
+            prune = self._unpruned >= self.prune_every
+            if prune:
+                self._unpruned = 0
+        if prune:
+            self.prune(now)
+        return signatures
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Drop expired signatures and the least recently seen beyond ``max_entries``.
+
+        Returns
+        -------
+        int
+            Signatures dropped.
+        """
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            dropped = 0
+            if self.ttl_seconds > 0:
+                dropped += conn.execute(
+                    "DELETE FROM fingerprints WHERE last_seen < ?", (now - self.ttl_seconds,)
+                ).rowcount
+            if self.max_entries > 0:
+                (count,) = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()
+                if count > self.max_entries:
+                    dropped += conn.execute(
+                        "DELETE FROM fingerprints WHERE signature IN "
+                        "(SELECT signature FROM fingerprints ORDER BY last_seen LIMIT ?)",
+                        (count - self.max_entries,),
+                    ).rowcount
+            if dropped:
+                conn.execute(
+                    "DELETE FROM fingerprint_tests WHERE signature NOT IN (SELECT signature FROM fingerprints)"
+                )
+        return dropped
+
+    def set_rca(self, signatures: Iterable[str], analysis: str) -> None:
+        """Attach the latest RCA result to each signature."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE fingerprints SET last_rca = ? WHERE signature = ?",
+                [(analysis, signature) for signature in set(signatures)],
+            )
+
+    def get(self, signature: str) -> Optional[Dict[str, Any]]:
+        """Return the record for ``signature``, if known."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT normalized, count, first_seen, last_seen, last_rca FROM fingerprints WHERE signature = ?",
+                (signature,),
+            ).fetchone()
+            if row is None:
+                return None
+            tests = [test_id for (test_id,) in conn.execute(
+                "SELECT test_id FROM fingerprint_tests WHERE signature = ? ORDER BY rowid", (signature,)
+            )]
+        normalized, count, first_seen, last_seen, last_rca = row
+        return {
+            "signature": signature,
+            "normalized": normalized,
+            "tests": tests,
+            "count": count,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "last_rca": last_rca,
+        }
+
+    def by_test(self, test_id: str) -> List[Dict[str, Any]]:
+        """Return records of every signature seen for ``test_id``."""
+        with self._transaction() as conn:
+            signatures = [signature for (signature,) in conn.execute(
+                "SELECT signature FROM fingerprint_tests WHERE test_id = ? ORDER BY signature", (test_id,)
+            )]
+        return [record for record in map(self.get, signatures) if record is not None]
+
+    def __len__(self) -> int:
+        with self._transaction() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()
+        return count
+
+
+_index: Optional[FingerprintIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_failure_index() -> FingerprintIndex:
+    """
+    Return the process-wide fingerprint index, creating it on first use.
+
+    Persistence is enabled when ``FINGERPRINT_INDEX_PATH`` is set; the size
+    and age limits come from ``FINGERPRINT_INDEX_MAX_ENTRIES`` and
+    ``FINGERPRINT_INDEX_TTL_SECONDS``.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from utils.config import (
+                    FINGERPRINT_INDEX_MAX_ENTRIES, FINGERPRINT_INDEX_PATH, FINGERPRINT_INDEX_TTL_SECONDS,
+                )
+                _index = FingerprintIndex(FINGERPRINT_INDEX_PATH or None, FINGERPRINT_INDEX_MAX_ENTRIES,
+                                          FINGERPRINT_INDEX_TTL_SECONDS)
+    return _index
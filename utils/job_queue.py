@@ -0,0 +1,304 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.logger import correlation_scope, get_logger
+from utils.serialization import dumps, loads
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+logger = get_logger("JobQueue")
+
+
+class QueueFull(Exception):
+    """Raised by :meth:`JobQueue.submit` when the backlog limit is reached."""
+
+
+class JobQueue:
+    """
+    Durable background job queue backed by SQLite.
+
+    ``submit`` stores the payload and returns a job id at once; a pool of
+    ``concurrency`` worker threads claims queued jobs in FIFO order, runs
+    ``handler`` on each payload and stores its JSON result. Claims are
+    atomic, so several processes (e.g. gunicorn workers) can share one
+    database, each running at most ``concurrency`` jobs.
+
+    A claimed job is leased to the claiming process, identified by a random
+    token (not its PID, which a restarted container can reuse). A heartbeat
+    thread renews the leases of the jobs the process is running; a job
+    whose lease expires, because its process died or hung, is re-queued
+    for any worker to claim. Finished jobs are deleted after
+    ``retention_seconds``.
+
+    Parameters
+    ----------
+    path : str
+        Database file path.
+    handler : Callable[[str], dict]
+        Runs one job payload. A result with ``"status": "error"`` or an
+        exception marks the job failed.
+    concurrency : int
+        Worker threads in this process.
+    max_pending : int
+        Most queued (not yet running) jobs; further submissions raise
+        :class:`QueueFull`.
+    retention_seconds : float
+        How long finished jobs are kept.
+    poll_interval : float
+        How often idle workers and waiters check the database for jobs
+        submitted or finished by other processes.
+    lease_seconds : float
+        How long a claimed job stays leased without a heartbeat. Leases are
+        renewed every third of this, so it bounds how long a dead worker's
+        job waits before it is re-queued.
+    """
+    def __init__(
+        self,
+        path: str,
+        handler: Callable[[str], Dict[str, Any]],
+        concurrency: int = 2,
+        max_pending: int = 100,
+        retention_seconds: float = 86400.0,
+        poll_interval: float = 0.5,
+        busy_timeout_ms: int = 30000,
+        lease_seconds: float = 60.0,
+    ):
+        self.path = path
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+        self.busy_timeout_ms = busy_timeout_ms
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._token: Optional[str] = None
+        self._last_purge = 0.0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT, result TEXT, error TEXT, "
+                "worker_token TEXT, lease_expires_at REAL, created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            # Databases created before leases have a worker_pid column instead
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("worker_token", "TEXT"), ("lease_expires_at", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs(status, created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, re-opened after fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def start(self) -> None:
+        """Start this process's workers if they are not running (called lazily)."""
+        with self._lock:
+            if self._pid == os.getpid() and not self._stop.is_set():
+                return
+            self._pid = os.getpid()
+            # A forked child must not renew (or finish) its parent's leases
+            self._token = uuid.uuid4().hex
+            self._stop.clear()
+            self._requeue_expired()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"JobWorker-{i}", daemon=True)
+                for i in range(self.concurrency)
+            ]
+            if self.concurrency:
+                self._threads.append(threading.Thread(target=self._heartbeat, name="JobHeartbeat", daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current jobs; unclaimed jobs stay queued."""
+        self._stop.set()
+        self._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, payload: str) -> str:
+        """
+        Queue ``payload`` and return its job id.
+
+        Raises
+        ------
+        QueueFull
+            If ``max_pending`` jobs are already queued.
+        """
+        self.start()
+        job_id = uuid.uuid4().hex
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            (pending,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} jobs already queued")
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, payload, time.time()),
+            )
+        self._notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the job's ``id``, ``status`` (queued, running, done or failed),
+        timestamps, and its ``result`` or ``error`` once finished.
+        """
+        row = self._connection().execute(
+            "SELECT id, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "status", "result", "error", "created_at", "started_at", "finished_at"), row))
+        if job["status"] == QUEUED:
+            (job["position"],) = self._connection().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, job["created_at"])
+            ).fetchone()
+        job["result"] = loads(job["result"]) if job["result"] else None
+        return job
+
+    def wait(self, job_id: str, timeout: float, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll a job: return it once finished, or once its status differs
+        from ``status`` if given, or after ``timeout`` seconds.
+        """
+        self.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or (status and job["status"] != status) or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def stats(self) -> Dict[str, int]:
+        """Return job counts by status plus this process's ``concurrency`` and ``max_pending``."""
+        counts = dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        stats = {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+        stats.update(concurrency=self.concurrency, max_pending=self.max_pending)
+        return stats
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def _requeue_expired(self) -> None:
+        # Rows without a lease were claimed before leases existed
+        conn = self._connection()
+        with conn:
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, worker_token = NULL, lease_expires_at = NULL, started_at = NULL "
+                "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (QUEUED, RUNNING, time.time()),
+            ).rowcount
+        if requeued:
+            logger.warning("Re-queued %d jobs whose worker lease expired", requeued)
+            self._notify()
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.execute(
+                        "UPDATE jobs SET lease_expires_at = ? WHERE status = ? AND worker_token = ?",
+                        (time.time() + self.lease_seconds, RUNNING, self._token),
+                    )
+            except sqlite3.Error as e:
+                # Retried on the next beat; the lease outlasts a couple of misses
+                logger.warning("Could not renew job leases: %s", e)
+
+    def _claim(self) -> Optional[tuple]:
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, worker_token = ?, lease_expires_at = ?, started_at = ? WHERE id = "
+                "(SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) "
+                "RETURNING id, payload",
+                (RUNNING, self._token, now + self.lease_seconds, now, QUEUED),
+            ).fetchone()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        # Only while this process still holds the lease: a job that expired
+        # and was re-queued belongs to whoever claimed it next
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, finished_at = ?, "
+                "worker_token = NULL, lease_expires_at = NULL WHERE id = ? AND status = ? AND worker_token = ?",
+                (status, dumps(result).decode("utf-8") if result is not None else None, error, time.time(),
+                 job_id, RUNNING, self._token),
+            )
+        self._notify()
+
+    def _finish_with_retry(self, job_id: str, status: str, result: Optional[Dict[str, Any]],
+                           error: Optional[str]) -> None:
+        # The heartbeat keeps the lease alive meanwhile. If the queue stops
+        # first, the lease runs out and the job is re-queued.
+        while True:
+            try:
+                self._finish(job_id, status, result, error)
+                return
+            except sqlite3.Error as e:
+                logger.warning("Could not store the result of job %s, retrying: %s", job_id, e)
+                if self._stop.wait(self.poll_interval):
+                    return
+
+    def _purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < min(60, self.lease_seconds / 2):
+            return
+        self._last_purge = now
+        self._requeue_expired()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, now - self.retention_seconds),
+            )
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+                if claimed is None:
+                    self._purge()
+                    with self._changed:
+                        self._changed.wait(self.poll_interval)
+                    continue
+            except sqlite3.Error:
+                self._stop.wait(self.poll_interval)
+                continue
+            job_id, payload = claimed
+            try:
+                # The job's logs carry its id as their correlation ID
+                with correlation_scope(job_id):
+                    result = self.handler(payload)
+            except Exception as e:
+                self._finish_with_retry(job_id, FAILED, None, str(e))
+                continue
+            failed = isinstance(result, dict) and result.get("status") == "error"
+            self._finish_with_retry(job_id, FAILED if failed else DONE, result, result.get("error") if failed else None)
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so that formatting-only differences share a cache entry.
+
+    Parameters
+    ----------
+    prompt : str
+        Raw prompt text.
+
+    Returns
+    -------
+    str
+        Prompt with surrounding whitespace stripped and inner runs collapsed.
+    """
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def make_cache_key(prompt: str, model: str) -> str:
+    """
+    Build a content-addressed key for a prompt/model pair.
+
+    Parameters
+    ----------
+    prompt : str
+        Prompt text; normalized before hashing.
+    model : str
+        Model name, e.g. ``"gemini/gemini-2.5-flash-lite"``.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest.
+    """
+    payload = f"{model}\x00{normalize_prompt(prompt)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier response cache: an in-process LRU in front of an optional SQLite file.
+
+    Entries expire after ``ttl_seconds``. The memory tier holds at most
+    ``max_entries`` items and the disk tier at most ``max_disk_entries``;
+    the least recently used entries are evicted first. The disk tier is
+    pruned (to 90% of its cap) when its approximate, per-process row count
+    passes the cap, and otherwise every ``evict_every`` writes, not on
+    every write.
+    """
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+        clock: Callable[[], float] = time.time,
+        evict_every: int = 1000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.evict_every = evict_every
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Rows counted at the last eviction plus writes since; other processes'
+        # writes are only seen at the next periodic eviction.
+        self._disk_rows = 0
+        self._writes = 0
+        if db_path:
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross fork(); a preforked worker opens its own.
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, "
+                "created_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache(last_access)")
+            (self._disk_rows,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            self._writes = 0
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        self._entries[key] = (response, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, prompt: str, model: str) -> Optional[str]:
+        """
+        Return the cached response for ``prompt`` and ``model``, if still fresh.
+        """
+        key = make_cache_key(prompt, model)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._expired(created_at, now):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return response
+                del self._entries[key]
+            if self.db_path:
+                row = self._connection().execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at = row
+                    if not self._expired(created_at, now):
+                        self._connection().execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._remember(key, response, created_at)
+                        self._stats["disk_hits"] += 1
+                        return response
+                    self._connection().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._disk_rows -= 1
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, prompt: str, model: str, response: str) -> None:
+        """
+        Store ``response`` for ``prompt`` and ``model`` in every tier.
+        """
+        key = make_cache_key(prompt, model)
+        now = self._clock()
+        with self._lock:
+            self._remember(key, response, now)
+            if self.db_path:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+                # Over-counts replaced keys, which only brings the next eviction forward
+                self._disk_rows += 1
+                self._writes += 1
+                if self._disk_rows > self.max_disk_entries or self._writes >= self.evict_every:
+                    self._evict_disk(now)
+
+    def _evict_disk(self, now: float) -> None:
+        # Both statements scan the table, so they run only when due (see set)
+        self._writes = 0
+        if self.ttl_seconds > 0:
+            self._connection().execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        self._disk_rows = count
+        if count <= self.max_disk_entries:
+            return
+        # Down to 90% of the cap, so a full cache is not pruned on every write
+        overflow = count - (self.max_disk_entries - self.max_disk_entries // 10)
+        self._connection().execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+            (overflow,),
+        )
+        self._disk_rows -= overflow
+        self._stats["evictions"] += overflow
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers and reset the metrics."""
+        with self._lock:
+            self._entries.clear()
+            if self.db_path:
+                self._connection().execute("DELETE FROM llm_cache")
+                self._disk_rows = self._writes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return hit/miss metrics.
+
+        Returns
+        -------
+        dict
+            ``hits`` (memory tier), ``disk_hits``, ``misses``, ``evictions``,
+            ``size`` (memory tier entries) and ``hit_rate``.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
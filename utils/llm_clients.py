@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from utils.config import GOOGLE_API_KEY, GEMINI_BASE_URL, logger
+
+ClientFactory = Callable[[str], Any]
+
+
+def provider_for(model: str) -> str:
+    """
+    Map a model name to the provider route used by ``run_llm``.
+
+    Parameters
+    ----------
+    model : str
+        Model name, e.g. ``"gemini/gemini-2.5-flash-lite"`` or ``"openai/gpt-4o-mini"``.
+
+    Returns
+    -------
+    str
+        ``"gemini"`` for the google-genai route, ``"litellm"`` otherwise.
+    """
+    return "gemini" if model.startswith("gemini") else "litellm"
+
+
+def _gemini_client(model: str) -> Any:
+    from google import genai
+    http_options = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+    return genai.Client(api_key=GOOGLE_API_KEY, http_options=http_options)
+
+
+def _litellm_session(model: str) -> Any:
+    # LiteLLM keeps its own per-provider clients; installing one shared
+    # keep-alive session makes the HTTP-based providers reuse connections.
+    import httpx
+    import litellm
+    if litellm.client_session is None:
+        litellm.client_session = httpx.Client(timeout=600)
+    return litellm.client_session
+
+
+class _LoopLocalTransport:
+    """
+    httpx async transport keeping one connection pool per event loop.
+
+    Pooled connections belong to the loop that opened them, so a single
+    shared ``httpx.AsyncClient`` built on this transport stays usable from
+    every loop (e.g. one ``asyncio.run`` per orchestration) while each loop
+    reuses its own keep-alive connections. A loop's pool is dropped with it.
+    """
+    def __init__(self, **options: Any):
+        self._options = options
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _current(self) -> Any:
+        import httpx
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._options)
+            return transport
+
+    async def handle_async_request(self, request: Any) -> Any:
+        return await self._current().handle_async_request(request)
+
+    async def __aenter__(self) -> "_LoopLocalTransport":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the running loop's pool."""
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def _litellm_async_session(model: str) -> Any:
+    # Async counterpart of _litellm_session, used by acompletion.
+    import httpx
+    import litellm
+    if litellm.aclient_session is None:
+        litellm.aclient_session = httpx.AsyncClient(timeout=600, transport=_LoopLocalTransport())
+    return litellm.aclient_session
+
+
+class LLMClientRegistry:
+    """
+    Thread-safe, process-wide registry of reusable LLM clients.
+
+    Clients are built lazily, once per ``(provider, model)``, by the factory
+    registered for the provider and then shared by every caller, so import,
+    TLS handshake and connection-pool setup are paid once per process.
+    """
+    def __init__(self, factories: Optional[Dict[str, ClientFactory]] = None):
+        self._factories: Dict[str, ClientFactory] = dict(factories or {})
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, provider: str, factory: ClientFactory) -> None:
+        """
+        Register (or replace) the client factory for ``provider``.
+
+        Clients already built for the provider are discarded.
+        """
+        with self._lock:
+            self._factories[provider] = factory
+            for key in [key for key in self._clients if key[0] == provider]:
+                del self._clients[key]
+
+    def get(self, provider: str, model: str) -> Any:
+        """
+        Return the shared client for ``provider`` and ``model``, building it on first use.
+
+        Raises
+        ------
+        KeyError
+            If no factory is registered for ``provider``.
+        """
+        key = (provider, model)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._factories[provider](model)
+                self._clients[key] = client
+            return client
+
+    def warm(self, models: Iterable[str]) -> None:
+        """
+        Build clients for ``models`` ahead of the first request.
+
+        Failures are logged rather than raised so that a missing key for one
+        provider does not stop the service from starting.
+        """
+        for model in models:
+            try:
+                provider = provider_for(model)
+                self.get(provider, model)
+                if provider == "litellm":
+                    self.get("litellm_async", model)
+            except Exception as e:
+                logger.warning(f"Could not warm LLM client for {model}: {e}")
+
+    def clear(self) -> None:
+        """Forget every cached client."""
+        with self._lock:
+            self._clients.clear()
+
+
+llm_clients = LLMClientRegistry({
+    "gemini": _gemini_client,
+    "litellm": _litellm_session,
+    "litellm_async": _litellm_async_session,
+})
@@ -1,34 +1,269 @@
-
-from litellm import completion
+import time
 from opentelemetry import trace
-from utils.config import GOOGLE_API_KEY, OPENAI_API_KEY, LLM_MODEL, logger
+from utils.config import (
+    GOOGLE_API_KEY, OPENAI_API_KEY, LLM_MODEL, logger,
+    LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_DB_PATH, LLM_CACHE_MAX_DISK_ENTRIES,
+    LLM_RATE_PER_SECOND, LLM_BURST, LLM_MAX_CONCURRENCY, LLM_MIN_CONCURRENCY,
+    LLM_MAX_RETRIES, LLM_BACKOFF_SECONDS, LLM_MAX_BACKOFF_SECONDS,
+)
+from utils.llm_cache import LLMCache
+from utils.llm_clients import llm_clients
+from utils.metrics import TOKEN_BUCKETS, registry
+from utils.prompt_builder import estimate_tokens
+from utils.rate_limiter import RateController
 
 tracer = trace.get_tracer("llm_factory")
 
-def run_llm(prompt: str, model: str | None = None):
+llm_cache = LLMCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    db_path=LLM_CACHE_DB_PATH or None,
+    max_disk_entries=LLM_CACHE_MAX_DISK_ENTRIES,
+) if LLM_CACHE_ENABLED else None
+
+# Shared by every caller in the process so bursts (e.g. batch triage) queue
+# here instead of tripping provider rate limits.
+llm_limits = RateController(
+    max_retries=LLM_MAX_RETRIES,
+    backoff=LLM_BACKOFF_SECONDS,
+    max_backoff=LLM_MAX_BACKOFF_SECONDS,
+    rate=LLM_RATE_PER_SECOND,
+    burst=LLM_BURST,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    min_concurrency=LLM_MIN_CONCURRENCY,
+)
+
+llm_seconds = registry.histogram(
+    "qaops_llm_request_seconds", "LLM provider call latency per attempt", ("model", "outcome"))
+llm_first_chunk_seconds = registry.histogram(
+    "qaops_llm_first_chunk_seconds", "Time to the first streamed LLM chunk", ("model",))
+llm_tokens = registry.counter(
+    "qaops_llm_tokens_total", "LLM tokens, as reported by the provider or estimated", ("model", "kind"))
+llm_request_tokens = registry.histogram(
+    "qaops_llm_request_tokens", "LLM tokens per call", ("model", "kind"), buckets=TOKEN_BUCKETS)
+registry.register_stats("qaops_llm_limiter", llm_limits.stats, label="model",
+                        counters=("calls", "throttled", "errors", "retries", "wait_seconds"),
+                        documentation="LLM rate limiter")
+if llm_cache is not None:
+    registry.register_stats("qaops_llm_cache", llm_cache.stats,
+                            counters=("hits", "disk_hits", "misses", "evictions"),
+                            documentation="LLM response cache")
+
+def _record_usage(model: str, prompt: str, text: str, prompt_tokens=None, completion_tokens=None) -> None:
+    # Providers that report no usage (e.g. some litellm streams) get the
+    # prompt builder's estimate instead.
+    for kind, count, fallback in (("prompt", prompt_tokens, prompt), ("completion", completion_tokens, text)):
+        count = count if isinstance(count, int) else estimate_tokens(fallback or "")
+        llm_tokens.inc(count, model=model, kind=kind)
+        llm_request_tokens.observe(count, model=model, kind=kind)
+
+def _timed(model: str, call):
+    """Run one provider attempt, recording its latency and outcome"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = call()
+        outcome = "ok"
+        return result
+    finally:
+        llm_seconds.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+async def _atimed(model: str, call):
+    """Async variant of _timed"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await call()
+        outcome = "ok"
+        return result
+    finally:
+        llm_seconds.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+def _timed_stream(model: str, call):
+    """Generator variant of _timed; also records the time to the first chunk"""
+    started = time.perf_counter()
+    outcome = "error"
+    first = True
+    try:
+        for chunk in call():
+            if first:
+                llm_first_chunk_seconds.observe(time.perf_counter() - started, model=model)
+                first = False
+            yield chunk
+        outcome = "ok"
+    finally:
+        llm_seconds.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+def _call_llm(prompt: str, model: str):
+    # -------- GEMINI ROUTE --------
+    if model.startswith("gemini"):
+        if not GOOGLE_API_KEY:
+            logger.warning("GOOGLE_API_KEY not found in environment variables")
+            raise ValueError("GOOGLE_API_KEY missing")
+        client = llm_clients.get("gemini", model)
+        model_name = model.split("/")[-1]
+        response = client.models.generate_content(
+            model=model_name,
+            contents=prompt
+        )
+        usage = response.usage_metadata
+        _record_usage(model, prompt, response.text, getattr(usage, "prompt_token_count", None),
+                      getattr(usage, "candidates_token_count", None))
+        return response.text
+    # -------- OPENAI / OLLAMA ROUTE --------
+    else:
+        if model.startswith("openai") and not OPENAI_API_KEY:
+            logger.warning("OPENAI_API_KEY not found in environment variables")
+            raise ValueError("OPENAI_API_KEY missing")
+        llm_clients.get("litellm", model)
+        # Imported on first use: litellm takes seconds to import.
+        from litellm import completion
+        response = completion(
+            model=model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        text = response["choices"][0]["message"]["content"]
+        usage = getattr(response, "usage", None)
+        _record_usage(model, prompt, text, getattr(usage, "prompt_tokens", None),
+                      getattr(usage, "completion_tokens", None))
+        return text
+
+async def _acall_llm(prompt: str, model: str):
+    # -------- GEMINI ROUTE --------
+    if model.startswith("gemini"):
+        if not GOOGLE_API_KEY:
+            logger.warning("GOOGLE_API_KEY not found in environment variables")
+            raise ValueError("GOOGLE_API_KEY missing")
+        client = llm_clients.get("gemini", model)
+        model_name = model.split("/")[-1]
+        response = await client.aio.models.generate_content(
+            model=model_name,
+            contents=prompt
+        )
+        usage = response.usage_metadata
+        _record_usage(model, prompt, response.text, getattr(usage, "prompt_token_count", None),
+                      getattr(usage, "candidates_token_count", None))
+        return response.text
+    # -------- OPENAI / OLLAMA ROUTE --------
+    else:
+        if model.startswith("openai") and not OPENAI_API_KEY:
+            logger.warning("OPENAI_API_KEY not found in environment variables")
+            raise ValueError("OPENAI_API_KEY missing")
+        llm_clients.get("litellm_async", model)
+        from litellm import acompletion
+        response = await acompletion(
+            model=model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        text = response["choices"][0]["message"]["content"]
+        usage = getattr(response, "usage", None)
+        _record_usage(model, prompt, text, getattr(usage, "prompt_tokens", None),
+                      getattr(usage, "completion_tokens", None))
+        return text
+
+def _stream_llm(prompt: str, model: str):
+    # -------- GEMINI ROUTE --------
+    if model.startswith("gemini"):
+        if not GOOGLE_API_KEY:
+            logger.warning("GOOGLE_API_KEY not found in environment variables")
+            raise ValueError("GOOGLE_API_KEY missing")
+        client = llm_clients.get("gemini", model)
+        model_name = model.split("/")[-1]
+        texts, usage = [], None
+        for chunk in client.models.generate_content_stream(
+            model=model_name,
+            contents=prompt
+        ):
+            # Usage is cumulative; the last chunk carries the totals
+            usage = chunk.usage_metadata or usage
+            if chunk.text:
+                texts.append(chunk.text)
+                yield chunk.text
+        _record_usage(model, prompt, "".join(texts), getattr(usage, "prompt_token_count", None),
+                      getattr(usage, "candidates_token_count", None))
+    # -------- OPENAI / OLLAMA ROUTE --------
+    else:
+        if model.startswith("openai") and not OPENAI_API_KEY:
+            logger.warning("OPENAI_API_KEY not found in environment variables")
+            raise ValueError("OPENAI_API_KEY missing")
+        llm_clients.get("litellm", model)
+        from litellm import completion
+        texts = []
+        for chunk in completion(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        ):
+            text = chunk["choices"][0]["delta"].get("content")
+            if text:
+                texts.append(text)
+                yield text
+        _record_usage(model, prompt, "".join(texts))
+
+def warm_llm_clients(models=None) -> None:
+    """Build the shared LLM clients up front, e.g. at service startup."""
+    llm_clients.warm(models or [LLM_MODEL])
+
+def run_llm(prompt: str, model: str | None = None, use_cache: bool = True):
+    model = model or LLM_MODEL
+    cache = llm_cache if use_cache else None
+
+    with tracer.start_as_current_span("llm_completion") as span:
+        if cache is not None:
+            cached = cache.get(prompt, model)
+            span.set_attribute("llm.cache_hit", cached is not None)
+            if cached is not None:
+                return cached
+        text = llm_limits.call(model, lambda: _timed(model, lambda: _call_llm(prompt, model)))
+        if cache is not None and text:
+            cache.set(prompt, model, text)
+        return text
+
+async def arun_llm(prompt: str, model: str | None = None, use_cache: bool = True):
+    """Async variant of run_llm that awaits the provider instead of blocking."""
+    model = model or LLM_MODEL
+    cache = llm_cache if use_cache else None
+
+    with tracer.start_as_current_span("llm_completion") as span:
+        if cache is not None:
+            cached = cache.get(prompt, model)
+            span.set_attribute("llm.cache_hit", cached is not None)
+            if cached is not None:
+                return cached
+        text = await llm_limits.acall(model, lambda: _atimed(model, lambda: _acall_llm(prompt, model)))
+        if cache is not None and text:
+            cache.set(prompt, model, text)
+        return text
+
+def run_llm_stream(prompt: str, model: str | None = None, use_cache: bool = True):
+    """
+    Generator variant of run_llm that yields the response text as it arrives.
+
+    A cached response is yielded as one chunk. The call is throttled like
+    run_llm; failures before the first chunk are retried, later ones are
+    raised since part of the text was already delivered. The complete text
+    is cached once the stream finishes.
+    """
     model = model or LLM_MODEL
+    cache = llm_cache if use_cache else None
 
-    with tracer.start_as_current_span("llm_completion"):
-        # -------- GEMINI ROUTE --------
-        if model.startswith("gemini"):
-            if not GOOGLE_API_KEY:
-                logger.warning("GOOGLE_API_KEY not found in environment variables")
-                raise ValueError("GOOGLE_API_KEY missing")
-            from google import genai
-            client = genai.Client(api_key=GOOGLE_API_KEY)
-            model_name = model.split("/")[-1]
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt
-            )
-            return response.text
-        # -------- OPENAI / OLLAMA ROUTE --------
-        else:
-            if model.startswith("openai") and not OPENAI_API_KEY:
-                logger.warning("OPENAI_API_KEY not found in environment variables")
-                raise ValueError("OPENAI_API_KEY missing")
-            response = completion(
-                model=model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response["choices"][0]["message"]["content"]
\ No newline at end of file
+    # Not made current: a generator can be resumed from another context.
+    span = tracer.start_span("llm_completion_stream")
+    try:
+        if cache is not None:
+            cached = cache.get(prompt, model)
+            span.set_attribute("llm.cache_hit", cached is not None)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        for chunk in llm_limits.stream(model, lambda: _timed_stream(model, lambda: _stream_llm(prompt, model))):
+            chunks.append(chunk)
+            yield chunk
+        span.set_attribute("llm.stream_chunks", len(chunks))
+        text = "".join(chunks)
+        if cache is not None and text:
+            cache.set(prompt, model, text)
+    finally:
+        span.end()
@@ -0,0 +1,344 @@
+import codecs
+import gzip
+import io
+import mmap
+import os
+import re
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+LogSource = Union[str, bytes, bytearray, memoryview, mmap.mmap, Iterable[Any], io.IOBase]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 1024 * 1024
+
+_NON_SPACE = re.compile(r"\S")
+_NON_SPACE_BYTES = re.compile(rb"\S")
+
+
+def as_byte_buffer(source: Any) -> Optional[Union[bytes, bytearray, mmap.mmap]]:
+    """
+    Return a bytes-like ``source`` as a buffer that can be searched in place.
+
+    bytes, bytearray and mmap are returned as they are. A memoryview is
+    unwrapped to the object it views when it spans all of it; a partial
+    view is copied once (still without decoding). Anything else, text
+    included, gives ``None``.
+    """
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        return source
+    if isinstance(source, memoryview):
+        base = source.obj
+        if (source.contiguous and isinstance(base, (bytes, bytearray, mmap.mmap))
+                and source.nbytes == len(base)):
+            return base
+        return source.tobytes()
+    return None
+
+
+def _iter_chunks(source: LogSource, chunk_size: int) -> Iterator[Union[str, bytes]]:
+    """
+    Yield raw chunks from any supported log source.
+
+    Strings and byte buffers are sliced rather than copied up front, file
+    objects are read ``chunk_size`` at a time and any other iterable (a
+    generator, a WSGI input stream, a list of lines) is passed through.
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    elif isinstance(source, mmap.mmap):
+        # Sliced rather than read() so the map's file position is untouched.
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+def iter_log_blocks(
+    source: LogSource,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str = "utf-8",
+    max_line_length: int = MAX_LINE_LENGTH,
+) -> Iterator[str]:
+    """
+    Yield decoded blocks of log text that always end on a line boundary.
+
+    Parameters
+    ----------
+    source : LogSource
+        Log content as a string, bytes, a text or binary file object, or an
+        iterable of ``str``/``bytes`` chunks (e.g. a chunked HTTP body).
+    chunk_size : int
+        Number of characters or bytes to read from file objects per step.
+    encoding : str
+        Encoding used for byte input; undecodable bytes are replaced.
+    max_line_length : int
+        Longest partial line kept in memory. A line exceeding it is flushed
+        early so that memory stays bounded even for newline-free input.
+
+    Yields
+    ------
+    str
+        Text made of whole lines. Every block except possibly the last ends
+        with ``"\\n"``.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    for chunk in _iter_chunks(source, chunk_size):
+        text = decoder.decode(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+        if not text:
+            continue
+        if pending:
+            text = pending + text
+        cut = text.rfind("\n") + 1
+        if cut:
+            pending = text[cut:]
+            yield text[:cut]
+        else:
+            pending = text
+        if len(pending) > max_line_length:
+            yield pending + "\n"
+            pending = ""
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_log_lines(source: LogSource, **kwargs: Any) -> Iterator[str]:
+    """
+    Yield log lines one at a time without materialising the whole log.
+
+    Parameters
+    ----------
+    source : LogSource
+        Any source accepted by :func:`iter_log_blocks`.
+    **kwargs
+        Forwarded to :func:`iter_log_blocks`.
+
+    Yields
+    ------
+    str
+        Each line with its trailing newline removed.
+    """
+    for block in iter_log_blocks(source, **kwargs):
+        if block.endswith("\n"):
+            block = block[:-1]
+        yield from block.split("\n")
+
+
+def _tail_of_text(text: Union[str, bytes], n: int, at_start: bool = True) -> Union[str, bytes]:
+    """Return the last ``n`` lines of ``text`` (trailing whitespace ignored) using reverse finds."""
+    newline = "\n" if isinstance(text, str) else b"\n"
+    end = len(text)
+    while end and text[end - 1:end].isspace():
+        end -= 1
+    pos = end
+    for _ in range(n):
+        pos = text.rfind(newline, 0, pos)
+        if pos < 0:
+            break
+    start = pos + 1 if pos >= 0 else 0
+    if at_start:
+        # Leading whitespace of the whole log is dropped, as with str.strip().
+        first = (_NON_SPACE if newline == "\n" else _NON_SPACE_BYTES).search(text)
+        start = max(start, first.start() if first else end)
+    return text[start:end]
+
+
+def tail_lines(source: LogSource, n: int, block_size: int = DEFAULT_CHUNK_SIZE, encoding: str = "utf-8") -> List[str]:
+    """
+    Return the last ``n`` lines of a log without splitting all of it.
+
+    Strings, byte buffers and memory maps are searched backwards from the end; seekable
+    binary files (or text files with a seekable ``buffer``) are read in
+    ``block_size`` steps from the end until enough lines are found. Other
+    sources are streamed once through a bounded deque. Leading and trailing
+    whitespace of the whole log is ignored.
+
+    Parameters
+    ----------
+    source : LogSource
+        Any source accepted by :func:`iter_log_blocks`.
+    n : int
+        Number of lines to return.
+    block_size : int
+        Bytes read per backward step for seekable files.
+    encoding : str
+        Encoding used for byte input; undecodable bytes are replaced.
+
+    Returns
+    -------
+    list of str
+        Up to ``n`` lines, oldest first.
+    """
+    if n <= 0:
+        return []
+    buffer = source if isinstance(source, str) else as_byte_buffer(source)
+    if buffer is not None:
+        tail = _tail_of_text(buffer, n)
+        if not isinstance(tail, str):
+            tail = tail.decode(encoding, errors="replace")
+        return tail.split("\n") if tail else []
+
+    raw = getattr(source, "buffer", source)
+    seekable = getattr(raw, "seekable", None)
+    if seekable is not None and seekable() and isinstance(raw, (io.RawIOBase, io.BufferedIOBase)):
+        encoding = getattr(source, "encoding", None) or encoding
+        origin = raw.tell()
+        raw.seek(0, io.SEEK_END)
+        pos = raw.tell()
+        data = b""
+        while pos > 0 and data.rstrip().count(b"\n") < n:
+            step = min(block_size, pos)
+            pos -= step
+            raw.seek(pos)
+            data = raw.read(step) + data
+        raw.seek(origin)
+        tail = _tail_of_text(data, n, at_start=pos == 0).decode(encoding, errors="replace")
+        return tail.split("\n") if tail else []
+
+    lines = deque(maxlen=n)
+    seen = blanks = 0
+    for line in iter_log_lines(source, encoding=encoding):
+        if not line.strip():
+            # Blank lines count only once something follows them.
+            blanks += 1 if seen else 0
+            continue
+        lines.extend([""] * min(blanks, n))
+        lines.append(line)
+        seen += blanks + 1
+        blanks = 0
+    if lines:
+        lines[-1] = lines[-1].rstrip()
+        if seen <= n:
+            lines[0] = lines[0].lstrip()
+    return list(lines)
+
+
+def split_line_ranges(buffer: Union[bytes, bytearray, mmap.mmap], parts: int) -> List[Tuple[int, int]]:
+    """
+    Split a byte buffer into up to ``parts`` ranges that start and end on line boundaries.
+
+    Each cut is moved forward to just past the next newline, so no line
+    is split. Ranges are contiguous, in order and cover the whole buffer;
+    fewer are returned when lines are longer than the shards.
+
+    Parameters
+    ----------
+    buffer : bytes, bytearray or mmap.mmap
+        Log content, e.g. a memory-mapped file.
+    parts : int
+        Number of ranges wanted.
+
+    Returns
+    -------
+    list of (int, int)
+        ``(start, end)`` byte offsets.
+    """
+    size = len(buffer)
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    for i in range(1, max(parts, 1)):
+        cut = buffer.find(b"\n", max(start, size * i // parts)) + 1
+        if cut <= start or cut >= size:
+            continue
+        ranges.append((start, cut))
+        start = cut
+    if start < size or not ranges:
+        ranges.append((start, size))
+    return ranges
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _zstd_reader(raw: io.BufferedReader) -> io.IOBase:
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdFile(raw)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading zstd-compressed logs requires the 'zstandard' package") from None
+    return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+
+
+@contextmanager
+def open_log(path: str) -> Iterator[LogSource]:
+    """
+    Open a log file for scanning without reading it into memory.
+
+    Plain files are memory-mapped read-only, so they can be searched in
+    place (see :meth:`utils.failure_matcher.FailureMatcher.scan_buffer`).
+    gzip and zstd archives, recognised by their magic bytes, are returned
+    as binary streams that decompress incrementally.
+
+    Parameters
+    ----------
+    path : str
+        Log file path.
+
+    Yields
+    ------
+    LogSource
+        An ``mmap.mmap`` for plain files (``b""`` when empty), otherwise a
+        binary file object.
+
+    Raises
+    ------
+    ImportError
+        If the file is zstd-compressed and no zstd decoder is installed.
+    """
+    with open(path, "rb") as raw:
+        magic = raw.read(4)
+        raw.seek(0)
+        if magic.startswith(GZIP_MAGIC):
+            with gzip.GzipFile(fileobj=raw) as stream:
+                yield stream
+        elif magic == ZSTD_MAGIC:
+            with _zstd_reader(raw) as stream:
+                yield stream
+        elif not magic:
+            yield b""
+        else:
+            with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield buffer
+
+
+def find_log_files(path: str) -> List[str]:
+    """
+    List the log files to ingest for a file or directory path.
+
+    Parameters
+    ----------
+    path : str
+        A log file, or a directory searched recursively. Hidden files and
+        directories are skipped.
+
+    Returns
+    -------
+    list of str
+        File paths in sorted order.
+    """
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        files.extend(os.path.join(root, name) for name in sorted(names) if not name.startswith("."))
+    return files
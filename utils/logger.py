@@ -1,23 +1,247 @@
+import contextvars
+import json
 import logging
+import os
+import queue
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from logging import StreamHandler, Formatter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, Optional
 
 LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s | correlation_id=%(correlation_id)s"
 
+# The request being handled on this thread / task. asyncio tasks and
+# asyncio.to_thread inherit it; plain threads and worker processes must be
+# handed the ID and bind it with correlation_scope.
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def get_correlation_id() -> Optional[str]:
+    """Return the correlation ID bound to the current context, if any."""
+    return _correlation_id.get()
+
+
+def set_correlation_id(correlation_id: Optional[str] = None) -> contextvars.Token:
+    """
+    Bind a correlation ID (a new one if none is given) to the current context.
+
+    Returns
+    -------
+    contextvars.Token
+        Pass to :func:`reset_correlation_id` to restore the previous ID.
+    """
+    return _correlation_id.set(correlation_id or new_correlation_id())
+
+
+def reset_correlation_id(token: contextvars.Token) -> None:
+    _correlation_id.reset(token)
+
+
+@contextmanager
+def correlation_scope(correlation_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Bind a correlation ID for the duration of the block and yield it.
+
+    Without an argument the ID already bound is kept, or a new one is made,
+    so nested pipeline stages log under their caller's request.
+    """
+    token = _correlation_id.set(correlation_id or _correlation_id.get() or new_correlation_id())
+    try:
+        yield _correlation_id.get()
+    finally:
+        _correlation_id.reset(token)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp records with the current correlation ID (``"-"`` outside a request)."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = _correlation_id.get() or "-"
+        return True
+
+
 class CorrelationIdAdapter(logging.LoggerAdapter):
+    """Log under a fixed correlation ID instead of the context's."""
     def process(self, msg, kwargs):
-        # Ensure correlation_id is always present
-        if 'extra' not in kwargs:
-            kwargs['extra'] = {}
-        kwargs['extra']['correlation_id'] = self.extra.get('correlation_id', str(uuid.uuid4()))
+        kwargs.setdefault('extra', {})['correlation_id'] = self.extra.get('correlation_id') or get_correlation_id()
         return msg, kwargs
 
+
+class SamplingFilter(logging.Filter):
+    """
+    Thin out verbose records under load.
+
+    Each second the first ``burst`` records at or below ``level`` pass;
+    after that only every ``every``-th one does (none if ``every`` is 0).
+    Warnings and errors are never sampled. Dropped records are counted in
+    ``suppressed``, and kept records past the burst carry ``sampled=every``.
+    """
+    def __init__(self, burst: int, every: int = 100, level: int = logging.INFO):
+        super().__init__()
+        self.burst = burst
+        self.every = every
+        self.level = level
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.level:
+            return True
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                self._window, self._count = window, 0
+            self._count += 1
+            excess = self._count - self.burst
+            if excess <= 0:
+                return True
+            if self.every and excess % self.every == 0:
+                record.sampled = self.every
+                return True
+            self.suppressed += 1
+            return False
+
+
+class JsonFormatter(Formatter):
+    """One JSON object per line: ts, level, logger, message, correlation_id and any ``extra`` fields."""
+    _RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Block rather than fail when the queue is full; the thread is draining it
+        self.queue.put(self._sentinel)
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Hand records to a background thread that formats and writes them.
+
+    The calling thread only appends the record to a bounded queue; when the
+    queue is full the record is dropped and counted rather than blocking the
+    request. Messages are formatted on the writer thread, so arguments passed
+    to a log call must not be mutated afterwards. The thread is (re)started
+    lazily in each process, so workers forked from a preloaded app get
+    their own.
+
+    Parameters
+    ----------
+    target : logging.Handler
+        Handler that does the actual I/O.
+    max_records : int
+        Queue bound.
+    """
+    def __init__(self, target: logging.Handler, max_records: int = 10000):
+        super().__init__(queue.Queue(max_records))
+        self.target = target
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_listener(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # After a fork the parent's writer thread is gone; anything it
+                # had queued is the parent's to write
+                self.queue = queue.Queue(self.queue.maxsize)
+                self._listener = _Listener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Write out what is queued, then stop the writer thread."""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener, self._pid = None, None
+        self.target.close()
+        super().close()
+
+
+_handler_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_sampler: Optional[SamplingFilter] = None
+
+
+def _shared_handler() -> logging.Handler:
+    """Build, once per process, the handler every get_logger logger writes through."""
+    global _handler, _sampler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                from utils.config import LOG_ASYNC, LOG_JSON, LOG_QUEUE_SIZE, LOG_SAMPLE_BURST, LOG_SAMPLE_EVERY
+                stream = StreamHandler()
+                stream.setFormatter(JsonFormatter() if LOG_JSON else Formatter(LOG_FORMAT))
+                handler = AsyncHandler(stream, LOG_QUEUE_SIZE) if LOG_ASYNC else stream
+                # Filters run on the calling thread, before anything is formatted
+                if LOG_SAMPLE_BURST > 0:
+                    _sampler = SamplingFilter(LOG_SAMPLE_BURST, LOG_SAMPLE_EVERY)
+                    handler.addFilter(_sampler)
+                handler.addFilter(CorrelationIdFilter())
+                _handler = handler
+    return _handler
+
+
+def logging_stats() -> Dict[str, int]:
+    """Records dropped by a full async queue and suppressed by sampling."""
+    return {
+        "dropped": getattr(_handler, "dropped", 0),
+        "suppressed": _sampler.suppressed if _sampler else 0,
+    }
+
+
 def get_logger(name: str = "QAOpsOrchestrator") -> logging.Logger:
+    """
+    Return the named logger, writing through the shared handler.
+
+    Records carry the correlation ID bound with :func:`correlation_scope`
+    (or :func:`set_correlation_id`) in the calling context, so every agent
+    handling one request logs under the same ID. Pass arguments lazily
+    (``logger.info("Found %d", n)``) so messages below the level, or
+    sampled out, are never formatted.
+    """
+    from utils.config import LOG_LEVEL
     logger = logging.getLogger(name)
     if not logger.hasHandlers():
-        handler = StreamHandler()
-        handler.setFormatter(Formatter(LOG_FORMAT))
-        logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
-    # Attach a correlation_id for tracing requests
-    return CorrelationIdAdapter(logger, {"correlation_id": str(uuid.uuid4())})
\ No newline at end of file
+        logger.addHandler(_shared_handler())
+    logger.setLevel(LOG_LEVEL)
+    return logger
@@ -1,31 +1,34 @@
+from utils.log_stream import LogSource, tail_lines
 def read_memory() -> dict:
     """
-    Read the memory bank from the local file.
+    Read the memory bank from the configured backend.
 
     Returns
     -------
     dict
         Dictionary of issue frequencies.
     """
-    if not os.path.exists(MEMORY_FILE):
-        return {}
-    with open(MEMORY_FILE, "r") as f:
-        return json.load(f)
+    with _store_seconds.time(store="memory_bank", operation="read_all"):
+        return get_memory_store().read_all()
 
 def clear_memory() -> None:
     """
-    Clear the memory bank file.
+    Clear the memory bank.
     """
-    with open(MEMORY_FILE, "w") as f:
-        json.dump({}, f)
-def get_context_window(logs: str, window_size: int = 10) -> str:
+    with _store_seconds.time(store="memory_bank", operation="clear"):
+        get_memory_store().clear()
+def get_context_window(logs: LogSource, window_size: int = 10) -> str:
     """
     Get the last N lines of logs for context window management.
 
+    The tail is found by searching backwards from the end (or seeking
+    backwards through a file), so the cost depends on the window, not on
+    the size of the log.
+
     Parameters
     ----------
-    logs : str
-        Log content.
+    logs : LogSource
+        Log content as a string, bytes or file object.
     window_size : int
         Number of lines for context window.
 
@@ -34,8 +37,7 @@ def get_context_window(logs: str, window_size: int = 10) -> str:
     str
         Context window string.
     """
-    lines = logs.strip().split("\n")
-    return "\n".join(lines[-window_size:])
+    return "\n".join(tail_lines(logs, window_size))
 
 def persist_agent_state(agent_name: str, state: dict) -> None:
     """
@@ -52,13 +54,58 @@ def persist_agent_state(agent_name: str, state: dict) -> None:
     with open(state_file, "w") as f:
         json.dump(state, f, indent=4)
 import json
-import os
+import threading
+from typing import Iterable, Optional
+from utils.memory_store import JSONMemoryStore, MemoryStore, SQLiteMemoryStore
+from utils.metrics import registry
 
 MEMORY_FILE = "memory_bank.json"
 
+_store: Optional[MemoryStore] = None
+_store_lock = threading.Lock()
+_store_seconds = registry.histogram("qaops_memory_store_seconds", "Memory store operation latency",
+                                    ("store", "operation"))
+
 class MemoryHandlerError(Exception):
     """Custom exception for memory handler errors."""
 
+def get_memory_store() -> MemoryStore:
+    """
+    Return the process-wide memory store, creating it on first use.
+
+    The backend is chosen by ``MEMORY_BACKEND`` (``"sqlite"`` by default, or
+    ``"json"`` for the legacy file). A new SQLite store imports an existing
+    ``MEMORY_FILE`` once.
+
+    Returns
+    -------
+    MemoryStore
+        The configured backend.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from utils.config import MEMORY_BACKEND, MEMORY_DB_PATH
+                if MEMORY_BACKEND == "json":
+                    _store = JSONMemoryStore(MEMORY_FILE)
+                else:
+                    _store = SQLiteMemoryStore(MEMORY_DB_PATH, legacy_json_path=MEMORY_FILE)
+    return _store
+
+def set_memory_store(store: Optional[MemoryStore]) -> None:
+    """
+    Replace the process-wide memory store (``None`` re-reads configuration).
+
+    Parameters
+    ----------
+    store : MemoryStore or None
+        Backend to use for subsequent calls.
+    """
+    global _store
+    with _store_lock:
+        _store = store
+
 def update_memory(issue: str) -> None:
     """
     Update the memory bank with the given issue.
@@ -71,19 +118,30 @@ def update_memory(issue: str) -> None:
     Raises
     ------
     MemoryHandlerError
-        If reading or writing the memory file fails.
+        If updating the memory store fails.
     """
     try:
-        if not os.path.exists(MEMORY_FILE):
-            with open(MEMORY_FILE, "w") as f:
-                json.dump({}, f)
+        with _store_seconds.time(store="memory_bank", operation="increment"):
+            get_memory_store().increment(issue)
+    except Exception as e:
+        raise MemoryHandlerError(f"Failed to update memory: {e}")
 
-        with open(MEMORY_FILE, "r") as f:
-            memory = json.load(f)
+def update_memory_batch(issues: Iterable[str]) -> None:
+    """
+    Increment the frequency of several issues in one atomic batch.
 
-        memory[issue] = memory.get(issue, 0) + 1
+    Parameters
+    ----------
+    issues : Iterable[str]
+        Issues to count; repeats are counted once per occurrence.
 
-        with open(MEMORY_FILE, "w") as f:
-            json.dump(memory, f, indent=4)
+    Raises
+    ------
+    MemoryHandlerError
+        If updating the memory store fails.
+    """
+    try:
+        with _store_seconds.time(store="memory_bank", operation="increment_many"):
+            get_memory_store().increment_many(issues)
     except Exception as e:
-        raise MemoryHandlerError(f"Failed to update memory: {e}")
\ No newline at end of file
+        raise MemoryHandlerError(f"Failed to update memory: {e}")
@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+
+class MemoryStore:
+    """
+    Interface for memory-bank backends that count recurring issues.
+
+    Implementations must make ``increment`` and ``increment_many`` atomic
+    with respect to other threads and processes sharing the same store.
+    """
+    def increment(self, issue: str, amount: int = 1) -> None:
+        self.increment_many([issue], amount)
+
+    def increment_many(self, issues: Iterable[str], amount: int = 1) -> None:
+        raise NotImplementedError("Subclasses must implement increment_many")
+
+    def get(self, issue: str) -> int:
+        return self.read_all().get(issue, 0)
+
+    def read_all(self) -> Dict[str, int]:
+        raise NotImplementedError("Subclasses must implement read_all")
+
+    def clear(self) -> None:
+        raise NotImplementedError("Subclasses must implement clear")
+
+
+class JSONMemoryStore(MemoryStore):
+    """
+    Legacy single-file JSON backend.
+
+    Every update rewrites the whole file, so it suits small banks only. An
+    exclusive ``fcntl`` lock (where available) serializes writers across
+    processes, and batches are applied in a single rewrite.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _locked(self):
+        handle = open(self.path + ".lock", "w")
+        try:
+            import fcntl
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        return handle
+
+    def _load(self) -> Dict[str, int]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def increment_many(self, issues: Iterable[str], amount: int = 1) -> None:
+        with self._lock, self._locked():
+            memory = self._load()
+            for issue in issues:
+                memory[issue] = memory.get(issue, 0) + amount
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(memory, f, indent=4)
+            os.replace(tmp_path, self.path)
+
+    def read_all(self) -> Dict[str, int]:
+        with self._lock:
+            return self._load()
+
+    def clear(self) -> None:
+        with self._lock, self._locked():
+            with open(self.path, "w") as f:
+                json.dump({}, f)
+
+
+class SQLiteMemoryStore(MemoryStore):
+    """
+    Indexed SQLite backend in WAL mode.
+
+    Increments are single ``UPSERT`` statements, so concurrent threads and
+    processes (e.g. gunicorn workers) never lose updates, and a batch is one
+    transaction. Connections are re-opened after ``fork``.
+
+    Parameters
+    ----------
+    path : str
+        Database file path.
+    legacy_json_path : str, optional
+        JSON memory bank imported once when the database is first created.
+    busy_timeout_ms : int
+        How long a writer waits for a competing writer's lock.
+    """
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None, busy_timeout_ms: int = 30000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        is_new = not os.path.exists(path)
+        conn = self._connection()
+        if is_new and legacy_json_path and os.path.exists(legacy_json_path):
+            with open(legacy_json_path, "r") as f:
+                legacy = json.load(f)
+            with self._lock, conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO memory (issue, count) VALUES (?, ?)", legacy.items()
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memory ("
+                "issue TEXT PRIMARY KEY, count INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def increment_many(self, issues: Iterable[str], amount: int = 1) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO memory (issue, count) VALUES (?, ?) "
+                    "ON CONFLICT(issue) DO UPDATE SET count = count + excluded.count",
+                    ((issue, amount) for issue in issues),
+                )
+
+    def get(self, issue: str) -> int:
+        with self._lock:
+            row = self._connection().execute("SELECT count FROM memory WHERE issue = ?", (issue,)).fetchone()
+        return row[0] if row else 0
+
+    def read_all(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._connection().execute("SELECT issue, count FROM memory"))
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM memory")
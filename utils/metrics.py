@@ -0,0 +1,470 @@
+import atexit
+import bisect
+import glob
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.serialization import dumps, loads
+
+# Latency buckets in seconds, from cache hits up to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Token-count buckets for LLM prompts and completions.
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[Any], float]]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, self.labelnames, key, value
+
+    def _dump(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def _merge(self, key: Tuple[str, ...], value: Any) -> None:
+        # Counters add up across processes; Gauge and Histogram override
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labelnames, labelvalues, value in self._samples():
+            lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or tokens."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. a queue depth."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def _merge(self, key: Tuple[str, ...], value: Any) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, e.g. latencies.
+
+    Parameters
+    ----------
+    buckets : sequence of float
+        Upper bounds, ascending; ``+Inf`` is added.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels: Any) -> Dict[str, Any]:
+        """Return ``count``, ``sum`` and cumulative ``buckets`` (upper bound to count)."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            counts, total, count = (list(state[0]), state[1], state[2]) if state else ([0] * (len(self.buckets) + 1), 0.0, 0)
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def _dump(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(key), [list(state[0]), state[1], state[2]]] for key, state in self._values.items()]
+
+    def _merge(self, key: Tuple[str, ...], value: Any) -> None:
+        counts, total, count = value
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+            state[2] += count
+
+    def _samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[Any], float]]:
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+        labelnames = self.labelnames + ("le",)
+        for key, (counts, total, count) in sorted(values.items()):
+            running = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                running += bucket_count
+                yield f"{self.name}_bucket", labelnames, key + (_format_value(bound),), running
+            yield f"{self.name}_sum", self.labelnames, key, total
+            yield f"{self.name}_count", self.labelnames, key, count
+
+
+def _snapshot(metrics: Iterable[_Metric], live: bool = True) -> Dict[str, Any]:
+    """One process's metrics as written to the shared directory."""
+    return {
+        "pid": os.getpid(),
+        "live": live,
+        "metrics": [
+            {"name": m.name, "kind": m.kind, "documentation": m.documentation, "labelnames": list(m.labelnames),
+             "buckets": list(getattr(m, "buckets", ())), "values": m._dump()}
+            for m in metrics
+        ],
+    }
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics in the Prometheus text exposition format.
+
+    Instruments are created once by name (asking again returns the same
+    one) and updated on the hot path under a per-metric lock. Components
+    that already keep their own counters (``stats()`` methods) are exported
+    through collectors read at scrape time, so they cost nothing in between.
+
+    Metrics are per process unless :meth:`share` is called. Then every
+    process (e.g. each gunicorn worker) writes a snapshot to a shared
+    directory in the background, and a scrape served by any of them
+    merges all the snapshots. Counters and histograms are summed over
+    processes, including processes that have exited, so they never go
+    backwards when a worker is recycled. Gauges are reported per live
+    process with a ``worker`` label (its PID): aggregate them in the query
+    (``sum``/``max by``) as fits the gauge, since some (e.g. job counts read
+    from the shared job database) are the same in every worker.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[_Metric]]] = {}
+        self.directory: Optional[str] = None
+        self.flush_interval = 5.0
+        self._snapshot_path: Optional[str] = None
+        self._stop_writer = threading.Event()
+        self._at_fork_registered = False
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **options) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered as {metric.kind} {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Return the counter ``name``, creating it on first use."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Return the gauge ``name``, creating it on first use."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram ``name``, creating it on first use."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, name: str, collect: Callable[[], Iterable[_Metric]]) -> None:
+        """
+        Add (or replace) a callback returning metrics built at scrape time.
+
+        Parameters
+        ----------
+        name : str
+            Collector key; registering the same name again replaces it.
+        collect : Callable
+            Returns freshly filled :class:`Counter`/:class:`Gauge` objects.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def register_stats(
+        self,
+        prefix: str,
+        stats: Callable[[], Dict[str, Any]],
+        counters: Iterable[str] = (),
+        label: Optional[str] = None,
+        documentation: str = "",
+    ) -> None:
+        """
+        Export a component's ``stats()`` dict.
+
+        Numeric entries become ``<prefix>_<key>`` gauges, or
+        ``<prefix>_<key>_total`` counters for the keys in ``counters``.
+
+        Parameters
+        ----------
+        prefix : str
+            Metric name prefix, e.g. ``"qaops_llm_cache"``.
+        stats : Callable[[], dict]
+            Stats function, e.g. ``cache.stats``.
+        counters : Iterable[str]
+            Keys that only ever increase.
+        label : str, optional
+            If set, ``stats()`` returns ``{label value: stats dict}`` (e.g.
+            per model) and the key becomes this label.
+        documentation : str
+            Help text prefix; the stats key is appended.
+        """
+        counters = frozenset(counters)
+
+        def collect() -> List[_Metric]:
+            snapshot = stats()
+            groups = snapshot.items() if label else [(None, snapshot)]
+            metrics: Dict[str, _Metric] = {}
+            for group, values in groups:
+                for key, value in values.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    name = _INVALID_NAME_CHARS.sub("_", f"{prefix}_{key}")
+                    help_text = f"{documentation or prefix} {key}".strip()
+                    labelnames = (label,) if label else ()
+                    labels = {label: group} if label else {}
+                    if key in counters:
+                        metric = metrics.setdefault(name, Counter(f"{name}_total", help_text, labelnames))
+                        metric.inc(value, **labels)
+                    else:
+                        metric = metrics.setdefault(name, Gauge(name, help_text, labelnames))
+                        metric.set(value, **labels)
+            return list(metrics.values())
+
+        self.register_collector(prefix, collect)
+
+    def _collect(self, errors: Optional[List[str]] = None) -> List[_Metric]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        for name, collect in collectors:
+            try:
+                metrics.extend(collect())
+            except Exception as e:
+                # One broken component must not take the whole scrape down
+                if errors is not None:
+                    errors.append(f"# collector {name} failed: {type(e).__name__}")
+        return metrics
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text format: this process's,
+        or all processes' merged when the registry is shared.
+        """
+        errors: List[str] = []
+        metrics = self._collect(errors)
+        if self.directory:
+            metrics = self._merge_snapshots(metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.extend(errors)
+        return "\n".join(lines) + "\n"
+
+    def share(self, directory: str, flush_interval: float = 5.0) -> None:
+        """
+        Aggregate metrics across the processes that share ``directory``.
+
+        Starts a thread writing this process's snapshot every
+        ``flush_interval`` seconds (and at exit), and does the same in
+        every process forked from this one, whose instruments start from
+        zero. Stats read by collectors are the components' own, so a
+        forked child reports whatever it inherited. The directory should
+        be emptied when the whole service restarts; see gunicorn.conf.py.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        if not self._at_fork_registered:
+            self._at_fork_registered = True
+            os.register_at_fork(after_in_child=self._after_fork)
+            atexit.register(self._write_final)
+        self._start_writer()
+
+    def forget_process(self) -> None:
+        """
+        Stop writing this process's snapshot and remove it, e.g. in a
+        gunicorn master that loaded the app but serves no requests. Forked
+        processes still write theirs.
+        """
+        self._stop_writer.set()
+        path, self._snapshot_path = self._snapshot_path, None
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _after_fork(self) -> None:
+        # The parent keeps reporting what it counted before the fork; the
+        # child starts from zero so nothing is counted twice. Locks are
+        # replaced since another thread may have held them at fork.
+        self._lock = threading.Lock()
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+            metric._values = {}
+        self._start_writer()
+
+    def _start_writer(self) -> None:
+        if not self.directory:
+            return
+        # A new file per process: a later process reusing the PID must not
+        # replace the counts of the one that exited
+        self._snapshot_path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+        self._stop_writer = threading.Event()
+        threading.Thread(target=self._write_periodically, args=(self._stop_writer,),
+                         name="MetricsWriter", daemon=True).start()
+
+    def _write_periodically(self, stop: threading.Event) -> None:
+        while not stop.wait(self.flush_interval):
+            try:
+                self._write()
+            except Exception:
+                # Retried on the next interval; a scrape meanwhile reads the previous snapshot
+                pass
+
+    def _write_final(self) -> None:
+        if self._snapshot_path and not self._stop_writer.is_set():
+            self._stop_writer.set()
+            self._write(live=False)
+
+    def _write(self, live: bool = True) -> None:
+        path = self._snapshot_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(dumps(_snapshot(self._collect(), live)))
+        os.replace(tmp_path, path)
+
+    def _merge_snapshots(self, own: List[_Metric]) -> List[_Metric]:
+        # This process's metrics are taken live rather than from its file
+        snapshots = [_snapshot(own)]
+        # Gauges of a process that stopped writing without exiting cleanly are dropped after a while
+        stale_before = time.time() - 3 * self.flush_interval
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            if path == self._snapshot_path:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    snapshot = loads(f.read())
+                if os.path.getmtime(path) < stale_before:
+                    snapshot["live"] = False
+            except (OSError, ValueError):
+                continue
+            snapshots.append(snapshot)
+
+        merged: Dict[str, _Metric] = {}
+        for snapshot in snapshots:
+            worker = str(snapshot["pid"])
+            for entry in snapshot["metrics"]:
+                kind, name = entry["kind"], entry["name"]
+                if kind == "gauge" and not snapshot["live"]:
+                    continue
+                metric = merged.get(name)
+                if metric is None:
+                    if kind == "counter":
+                        metric = Counter(name, entry["documentation"], entry["labelnames"])
+                    elif kind == "histogram":
+                        metric = Histogram(name, entry["documentation"], entry["labelnames"], entry["buckets"])
+                    else:
+                        metric = Gauge(name, entry["documentation"], entry["labelnames"] + ["worker"])
+                    merged[name] = metric
+                if metric.kind != kind:
+                    continue
+                for key, value in entry["values"]:
+                    metric._merge(tuple(key) + ((worker,) if kind == "gauge" else ()), value)
+        return list(merged.values())
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _context():
+    # Forking a process that already runs other threads (gunicorn gthread
+    # workers, job/ticket/log/span threads) can copy a lock one of them holds
+    # into the child, which then deadlocks on it. A forkserver forks from a
+    # clean single-threaded server instead.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def get_process_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    Return this process's pool of ``processes`` workers, started on first use.
+
+    Pools live as long as the process, so workers (and the modules they
+    import) are reused by every batch instead of being started per request.
+    Workers come from a ``forkserver`` (``spawn`` where that is unavailable),
+    never from a fork of the calling process. A pool broken by a crashed
+    worker is replaced on the next call.
+
+    Parameters
+    ----------
+    processes : int
+        Worker processes; each size gets its own pool.
+    """
+    global _pools_pid
+    with _lock:
+        if _pools_pid != os.getpid():
+            # Inherited from a parent process; its workers are not ours
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(processes)
+        if pool is None or getattr(pool, "_broken", False):
+            pool = _pools[processes] = ProcessPoolExecutor(max_workers=processes, mp_context=_context())
+        return pool
@@ -0,0 +1,177 @@
+from typing import Any, Dict, Iterable, List, Sequence
+
+from utils.fingerprint import fingerprint, normalize_failure
+
+# Rough size of a token for English text and log output; good enough for
+# budgeting without pulling a tokenizer into the request path.
+CHARS_PER_TOKEN = 4
+MAX_LINE_CHARS = 400
+
+PROMPT_HEADER = (
+    "Summarize the root causes of these CI failures. Repeated failures are listed "
+    "once with their occurrence count, followed by their stack frames."
+)
+
+_SEVERITY_RANK = {"critical": 0, "error": 1, "warning": 2}
+# Categories that usually name the cause rank above generic failure markers.
+_CATEGORY_RANK = {
+    "resource": 0, "assertion": 1, "exception": 1, "connection": 1, "timeout": 1,
+    "junit": 2, "test_failure": 2, "fatal": 2, "error": 3,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in ``text``.
+
+    Parameters
+    ----------
+    text : str
+        Prompt text.
+
+    Returns
+    -------
+    int
+        ``ceil(len(text) / CHARS_PER_TOKEN)``.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _clip(line: str) -> str:
+    line = normalize_failure(line)
+    return line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS - 3] + "..."
+
+
+def _pick_frames(frames: Sequence[str], limit: int) -> List[str]:
+    # The first frames are nearest the failure and the last one is usually the
+    # test or entry point, so keep both ends of long traces.
+    frames = list(dict.fromkeys(_clip(frame) for frame in frames))
+    if len(frames) <= limit:
+        return frames
+    return frames[:max(limit - 1, 0)] + frames[-1:] if limit else []
+
+
+def _group_failures(failures: Iterable[Dict[str, Any]], frames_per_failure: int) -> List[Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    for order, failure in enumerate(failures):
+        signature = failure.get("signature") or fingerprint(failure["line"])
+        group = groups.get(signature)
+        if group is None:
+            groups[signature] = {
+                "line": _clip(failure["line"]),
+                "count": 1,
+                "rank": (
+                    _SEVERITY_RANK.get(failure.get("severity"), 1),
+                    _CATEGORY_RANK.get(failure.get("category"), 2),
+                    order,
+                ),
+                "frames": _pick_frames(failure.get("frames", ()), frames_per_failure),
+            }
+        else:
+            group["count"] += 1
+    return sorted(groups.values(), key=lambda group: group["rank"])
+
+
+def build_rca_prompt(
+    failures: Iterable[Dict[str, Any]],
+    log_tail: Iterable[str] = (),
+    max_tokens: int = 2000,
+    frames_per_failure: int = 6,
+    similar_incidents: Iterable[Dict[str, Any]] = (),
+) -> str:
+    """
+    Build a root-cause prompt that fits in an approximate token budget.
+
+    Lines are normalized (see :func:`utils.fingerprint.normalize_failure`)
+    and repeated failures are collapsed into one line with a count. The
+    budget is then filled in order of usefulness: every distinct failure
+    line (most severe and most specific first), their stack frames, the
+    analyses of similar past incidents, and finally the most recent lines
+    of the log tail not already included.
+
+    Parameters
+    ----------
+    failures : Iterable[dict]
+        Diagnostics failure records. Only ``line`` is required; ``severity``,
+        ``category``, ``signature`` and ``frames`` are used when present.
+    log_tail : Iterable[str]
+        Last lines of the log, oldest first.
+    max_tokens : int
+        Approximate token budget (see :func:`estimate_tokens`).
+    frames_per_failure : int
+        Most stack frames kept for one failure.
+    similar_incidents : Iterable[dict]
+        Past failures most like these, best first, with their ``analysis``
+        and ``similarity`` (see :meth:`utils.vector_index.VectorIndex.search`).
+
+    Returns
+    -------
+    str
+        The prompt text.
+    """
+    groups = _group_failures(failures, frames_per_failure)
+    budget = max_tokens - estimate_tokens(PROMPT_HEADER + "\nFailures:\n")
+
+    def cost(line: str) -> int:
+        return estimate_tokens(line + "\n")
+
+    included = []
+    for group in groups:
+        entry = f"- {group['line']}" + (f" (x{group['count']})" if group["count"] > 1 else "")
+        if cost(entry) > budget and included:
+            break
+        group["entry"] = entry
+        budget -= cost(entry)
+        included.append(group)
+    omitted = len(groups) - len(included)
+    if omitted:
+        budget -= cost(f"... {omitted} more distinct failures omitted")
+
+    for group in included:
+        kept = []
+        for frame in group["frames"]:
+            if cost("    " + frame) > budget:
+                break
+            kept.append("    " + frame)
+            budget -= cost("    " + frame)
+        group["kept_frames"] = kept
+
+    incidents = []
+    for incident in similar_incidents:
+        entry = f"- ({incident['similarity']:.2f}) {_clip(incident['analysis'])}"
+        if cost(entry) > budget - cost("Similar past incidents (similarity, analysis):"):
+            break
+        incidents.append(entry)
+        budget -= cost(entry)
+    if incidents:
+        budget -= cost("Similar past incidents (similarity, analysis):")
+
+    seen = {group["line"] for group in included}
+    seen.update(frame.strip() for group in included for frame in group["kept_frames"])
+    tail: List[str] = []
+    budget -= cost("Log tail:")
+    for line in reversed(list(log_tail)):
+        line = _clip(line)
+        if not line or line in seen:
+            continue
+        if cost(line) > budget:
+            break
+        seen.add(line)
+        tail.append(line)
+        budget -= cost(line)
+
+    parts = [PROMPT_HEADER, "", "Failures:"]
+    if not included:
+        parts.append("- none detected")
+    for group in included:
+        parts.append(group["entry"])
+        parts.extend(group["kept_frames"])
+    if omitted:
+        parts.append(f"... {omitted} more distinct failures omitted")
+    if incidents:
+        parts.append("Similar past incidents (similarity, analysis):")
+        parts.extend(incidents)
+    if tail:
+        parts.append("Log tail:")
+        parts.extend(reversed(tail))
+    return "\n".join(parts)
@@ -0,0 +1,424 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional
+
+# HTTP statuses worth retrying: rate limited, overloaded or briefly unavailable.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _status_of(error: BaseException) -> Optional[int]:
+    # litellm/openai errors carry status_code, google-genai errors code.
+    for attribute in ("status_code", "code"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Return True if ``error`` is a provider rate-limit (HTTP 429) response."""
+    return _status_of(error) == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Return True if a failed LLM call may succeed when retried.
+
+    Rate limits, 408/5xx responses, timeouts and connection errors are
+    retryable; configuration errors such as a missing API key are not.
+    """
+    if is_rate_limited(error) or _status_of(error) in RETRYABLE_STATUS:
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in (
+        "Timeout", "APITimeoutError", "APIConnectionError", "ConnectError", "ReadTimeout", "ConnectTimeout",
+    )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the provider's ``Retry-After`` hint in seconds, if the error carries one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        value = headers.get("retry-after") if headers is not None else None
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Waiter:
+    """A caller queued for a slot: a thread, or a task waiting on ``future`` in ``loop``."""
+    __slots__ = ("loop", "future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = None
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ModelLimiter:
+    """
+    Token bucket plus adaptive concurrency limit for one provider/model.
+
+    A call needs a token (refilled at ``rate`` per second up to ``burst``)
+    and a free concurrency slot. The concurrency limit follows AIMD: it
+    grows by about one slot per limit's worth of successful calls, halves on
+    a 429 (which also halves the rate and pauses new calls for the
+    provider's ``Retry-After``), and shrinks by 10% when latency climbs
+    above ``latency_tolerance`` times the best latency seen recently. The
+    rate recovers gradually after each success.
+
+    Threads and asyncio tasks wait in one first-come, first-served queue:
+    only its head may take a slot, and it is woken (through its condition,
+    or its future via ``call_soon_threadsafe``) when one may be free.
+
+    Parameters
+    ----------
+    rate : float
+        Sustained calls per second; 0 disables the token bucket.
+    burst : int
+        Bucket capacity.
+    max_concurrency, min_concurrency : int
+        Bounds of the adaptive concurrency limit, which starts at the maximum.
+    latency_tolerance : float
+        Latency increase over the baseline treated as provider saturation.
+    clock : Callable[[], float]
+        Monotonic clock, replaceable in tests.
+    """
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: int = 10,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        latency_tolerance: float = 3.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.latency_tolerance = latency_tolerance
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._tokens = float(self.burst)
+        self._refilled = clock()
+        self._paused_until = 0.0
+        self._decreased_at = float("-inf")
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._queue: Deque[_Waiter] = deque()
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._stats = {
+            "calls": 0, "throttled": 0, "errors": 0, "retries": 0,
+            "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+        }
+
+    def _try_acquire(self) -> float:
+        # Called with the condition held; returns 0 once a token and a slot
+        # are taken, else how long to wait before trying again.
+        now = self._clock()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            return float("inf")
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def _acquired(self, started: float) -> None:
+        waited = self._clock() - started
+        self._stats["calls"] += 1
+        self._stats["wait_seconds"] += waited
+        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+
+    @property
+    def waiting(self) -> int:
+        """Callers queued for a slot."""
+        return len(self._queue)
+
+    def _wake_head(self) -> None:
+        # Called with the condition held whenever the head may now get a
+        # slot: after a release or a limit change, or when the head changed.
+        while self._queue and self._queue[0].loop is not None:
+            head = self._queue[0]
+            try:
+                head.loop.call_soon_threadsafe(_resolve, head.future)
+                break
+            except RuntimeError:
+                # Its event loop is closed, so it will never come back for the slot
+                self._queue.popleft()
+        self._cond.notify_all()
+
+    def _leave(self, waiter: _Waiter) -> None:
+        # Called with the condition held when a waiter gives up (cancelled, interrupted)
+        if waiter in self._queue:
+            was_head = self._queue[0] is waiter
+            self._queue.remove(waiter)
+            if was_head:
+                self._wake_head()
+
+    def acquire(self) -> None:
+        """Block until a call may start."""
+        started = self._clock()
+        waiter = _Waiter()
+        with self._cond:
+            self._queue.append(waiter)
+            try:
+                while True:
+                    delay = self._try_acquire() if self._queue[0] is waiter else float("inf")
+                    if delay == 0:
+                        break
+                    self._cond.wait(None if delay == float("inf") else delay)
+            except BaseException:
+                self._leave(waiter)
+                raise
+            self._queue.popleft()
+            # Another slot may be free too
+            self._wake_head()
+            self._acquired(started)
+
+    async def aacquire(self) -> None:
+        """Wait, without blocking the event loop, until a call may start."""
+        started = self._clock()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop)
+        waiter.future = loop.create_future()
+        with self._cond:
+            self._queue.append(waiter)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_acquire() if self._queue[0] is waiter else float("inf")
+                    if delay == 0:
+                        self._queue.popleft()
+                        self._wake_head()
+                        self._acquired(started)
+                        return
+                    if waiter.future.done():
+                        # Replaced under the lock, so a release from here on resolves the new one
+                        waiter.future = loop.create_future()
+                await asyncio.wait((waiter.future,), timeout=None if delay == float("inf") else delay)
+        except BaseException:
+            with self._cond:
+                self._leave(waiter)
+            raise
+
+    def release(self, latency: Optional[float], error: Optional[BaseException] = None) -> None:
+        """
+        Free the call's slot and adapt the limits to its outcome.
+
+        Parameters
+        ----------
+        latency : float or None
+            Time the provider took, in seconds; ``None`` if the call says
+            nothing about the provider (e.g. a stream the caller abandoned),
+            which then only frees the slot.
+        error : BaseException, optional
+            The exception the call raised, if any.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if error is not None and is_rate_limited(error):
+                self._stats["throttled"] += 1
+                now = self._clock()
+                # Calls already in flight at the last decrease were sent under
+                # the old limit; their 429s must not halve it again.
+                if now - (latency or 0.0) >= self._decreased_at:
+                    self._decreased_at = now
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    if self.rate > 0:
+                        self.rate = max(self.max_rate / 16, self.rate / 2)
+                        self._tokens = min(self._tokens, 0.0)
+                pause = retry_after(error)
+                if pause:
+                    self._paused_until = max(self._paused_until, self._clock() + pause)
+            elif error is not None:
+                self._stats["errors"] += 1
+            elif latency is not None:
+                self._observe_latency(latency)
+            self._wake_head()
+
+    def record_retry(self) -> None:
+        """Count a retried call."""
+        with self._cond:
+            self._stats["retries"] += 1
+
+    def _observe_latency(self, latency: float) -> None:
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        # The baseline tracks the best recent latency and drifts up slowly,
+        # so a provider that gets permanently slower resets it.
+        self._baseline = latency if self._baseline is None else min(self._baseline * 1.01, latency)
+        if self._latency > self.latency_tolerance * self._baseline:
+            self.limit = max(self.min_concurrency, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        if self.rate > 0:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return limiter metrics.
+
+        Returns
+        -------
+        dict
+            ``calls``, ``throttled`` (429 responses), ``errors``, ``retries``,
+            ``wait_seconds`` (total queueing time), ``max_wait_seconds``,
+            ``avg_wait_seconds``, ``queue_depth`` (callers waiting),
+            ``in_flight``, ``concurrency_limit``, ``rate`` and
+            ``latency_seconds`` (smoothed).
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                queue_depth=self.waiting,
+                in_flight=self.in_flight,
+                concurrency_limit=round(self.limit, 2),
+                rate=self.rate,
+                latency_seconds=self._latency,
+            )
+        stats["avg_wait_seconds"] = stats["wait_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+
+class RateController:
+    """
+    Per-model :class:`ModelLimiter` registry with retrying call wrappers.
+
+    Every caller in the process that targets the same model shares its
+    limiter. Retryable failures (see :func:`is_retryable`) are retried up to
+    ``max_retries`` times after jittered exponential backoff, or the
+    provider's ``Retry-After`` if longer.
+
+    Parameters
+    ----------
+    max_retries : int
+        Retries per call.
+    backoff : float
+        First retry delay in seconds, doubled per attempt.
+    max_backoff : float
+        Upper bound on one retry delay in seconds.
+    **limiter_options
+        Passed to each new :class:`ModelLimiter`.
+    """
+    def __init__(self, max_retries: int = 4, backoff: float = 0.5, max_backoff: float = 30.0, **limiter_options):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter_options = limiter_options
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model: str) -> ModelLimiter:
+        """Return the limiter for ``model``, creating it on first use."""
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limiter = self._limiters[model] = ModelLimiter(**self.limiter_options)
+            return limiter
+
+    def _delay(self, attempt: int, error: BaseException) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        return max(delay, min(retry_after(error) or 0.0, self.max_backoff))
+
+    def call(self, model: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` under ``model``'s limits, retrying transient failures."""
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except BaseException as e:
+                limiter.release(time.monotonic() - started, e)
+                if not isinstance(e, Exception) or attempt == self.max_retries or not is_retryable(e):
+                    raise
+                limiter.record_retry()
+                time.sleep(self._delay(attempt, e))
+            else:
+                limiter.release(time.monotonic() - started)
+                return result
+
+    async def acall(self, model: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of :meth:`call` for a coroutine function ``fn``."""
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            await limiter.aacquire()
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except BaseException as e:
+                limiter.release(time.monotonic() - started, e)
+                if not isinstance(e, Exception) or attempt == self.max_retries or not is_retryable(e):
+                    raise
+                limiter.record_retry()
+                await asyncio.sleep(self._delay(attempt, e))
+            else:
+                limiter.release(time.monotonic() - started)
+                return result
+
+    def stream(self, model: str, fn: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        """
+        Generator variant of :meth:`call` for a streaming ``fn``.
+
+        The slot is held until the stream is exhausted or closed. Failures
+        before the first item are retried; later ones are raised, since the
+        caller has already received part of the response.
+
+        Only the time spent waiting on the provider for each item counts as
+        the call's latency, not the time the caller (e.g. a slow SSE client)
+        takes between items. A stream closed before its end frees the slot
+        without adapting the limits.
+        """
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            provider_seconds = 0.0
+            finished = False
+            error: Optional[BaseException] = None
+            delivered = False
+            items: Optional[Iterator[Any]] = None
+            try:
+                items = iter(fn())
+                while True:
+                    started = time.monotonic()
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        finished = True
+                        return
+                    finally:
+                        provider_seconds += time.monotonic() - started
+                    delivered = True
+                    yield item
+            except Exception as e:
+                error = e
+                if delivered or attempt == self.max_retries or not is_retryable(e):
+                    raise
+            finally:
+                if not finished and error is None:
+                    close = getattr(items, "close", None)
+                    if close is not None:
+                        close()
+                limiter.release(provider_seconds if finished or error is not None else None, error)
+            limiter.record_retry()
+            time.sleep(self._delay(attempt, error))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return :meth:`ModelLimiter.stats` for every model called so far."""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {model: limiter.stats() for model, limiter in limiters.items()}
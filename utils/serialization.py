@@ -0,0 +1,60 @@
+import json
+import mmap
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library produces the same JSON, only slower
+    orjson = None
+
+_BYTES_LIKE = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def _default(value: Any) -> Any:
+    """Encode the types JSON has no form for: byte payloads as text, everything else via str()."""
+    if isinstance(value, _BYTES_LIKE):
+        return bytes(value).decode("utf-8", errors="replace")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize ``value`` to compact UTF-8 JSON.
+
+    Uses ``orjson`` when it is installed and the standard library otherwise;
+    both produce plain JSON, so either side of a process boundary (a job
+    row, an HTTP body) can read what the other wrote. Byte payloads such
+    as raw logs are written as text, with undecodable bytes replaced.
+
+    Parameters
+    ----------
+    value : Any
+        Dicts, lists, strings, numbers, booleans and ``None``; other values
+        go through the fallback described above.
+
+    Returns
+    -------
+    bytes
+        The encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """
+    Parse JSON written by :func:`dumps` (or anything else).
+
+    Parameters
+    ----------
+    data : bytes, bytearray, memoryview or str
+        Encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for it and share its result or
+    exception. Nothing is cached: once the leader finishes, the next call
+    for the key runs again. Thread callers (:meth:`do`) and coroutine
+    callers (:meth:`ado`) are tracked separately.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def _count(self, leader: bool) -> None:
+        self._stats["calls"] += 1
+        self._stats["executions" if leader else "coalesced"] += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` once for all concurrent callers with the same ``key``.
+
+        Parameters
+        ----------
+        key : Hashable
+            Deduplication key, e.g. a failure signature.
+        fn : Callable[[], Any]
+            Work to run if no call for ``key`` is in flight.
+
+        Returns
+        -------
+        tuple
+            ``(result, shared)`` where ``shared`` is True if this caller
+            waited on another caller's execution.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Async variant of :meth:`do` for callers on the same event loop.
+
+        Parameters
+        ----------
+        key : Hashable
+            Deduplication key.
+        fn : Callable[[], Awaitable[Any]]
+            Coroutine function to await if no call for ``key`` is in flight.
+
+        Returns
+        -------
+        tuple
+            ``(result, shared)`` as for :meth:`do`.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            future = self._async_calls.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[flight_key] = loop.create_future()
+            self._count(leader)
+        if not leader:
+            # Shielded so a cancelled waiter does not cancel the shared call.
+            return await asyncio.shield(future), True
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved: the leader re-raises it, waiters are optional.
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._async_calls[flight_key]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return coalescing metrics.
+
+        Returns
+        -------
+        dict
+            ``calls``, ``executions``, ``coalesced`` (calls that shared
+            another call's execution), ``in_flight`` and ``coalesce_rate``.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._async_calls)
+        stats["coalesce_rate"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
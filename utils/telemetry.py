@@ -1,30 +1,378 @@
-# utils/telemetry.py - OpenTelemetry integration for tracing and metrics
+# utils/telemetry.py - span sampling, buffering and export for the tracing pipeline
+#
+# Process-wide setup happens once, in observability.init_telemetry(); this
+# module only provides the building blocks it wires together.
+
+import base64
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, Sampler, TraceIdRatioBased
+from opentelemetry.trace import StatusCode
+
+_TRACE_ID_LIMIT = 1 << 64
+_ID_FIELDS = frozenset(("traceId", "spanId", "parentSpanId"))
+
+
+def head_sampler(ratio: float) -> Optional[Sampler]:
+    """
+    Return a sampler keeping ``ratio`` of new traces, or None to keep all.
+
+    Child spans follow their parent's decision, so a trace is either
+    recorded whole or not at all, and unsampled spans cost almost nothing.
+    """
+    return None if ratio >= 1.0 else ParentBased(TraceIdRatioBased(max(ratio, 0.0)))
+
+
+def _hex_ids(value):
+    # OTLP/JSON encodes trace and span ids as hex, not protobuf's base64
+    if isinstance(value, dict):
+        return {
+            key: base64.b64decode(item).hex() if key in _ID_FIELDS and isinstance(item, str) else _hex_ids(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_hex_ids(item) for item in value]
+    return value
+
+
+class OTLPFileSpanExporter(SpanExporter):
+    """
+    Append spans to a file as OTLP/JSON, one export request per line.
+
+    This is the OpenTelemetry file exporter format, readable by the
+    collector's ``otlpjsonfile`` receiver.
+
+    Parameters
+    ----------
+    path : str
+        File to append to.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        from google.protobuf import json_format
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+        request = _hex_ids(json_format.MessageToDict(encode_spans(spans)))
+        line = json.dumps(request, separators=(",", ":"))
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class SpanExportBuffer(SpanProcessor):
+    """
+    Bounded span queue drained by a background export thread.
+
+    Ending a span only enqueues it; when the queue is full the span is
+    dropped (and counted) instead of blocking the request. The worker
+    exports in batches of up to ``batch_size`` every ``interval_seconds``,
+    or sooner once a full batch is waiting. It is restarted after ``fork``.
+
+    Parameters
+    ----------
+    exporters : Sequence[SpanExporter]
+        Receive every batch; one failing exporter does not affect the others.
+    max_spans : int
+        Queue capacity.
+    batch_size : int
+        Most spans per export call.
+    interval_seconds : float
+        Longest time a span waits before it is exported.
+    """
+    def __init__(
+        self,
+        exporters: Sequence[SpanExporter],
+        max_spans: int = 2048,
+        batch_size: int = 512,
+        interval_seconds: float = 2.0,
+    ):
+        self.exporters = list(exporters)
+        self.max_spans = max_spans
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._queue: "queue.Queue[ReadableSpan]" = queue.Queue(max_spans)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._exporting = False
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"queued": 0, "dropped": 0, "exported": 0, "batches": 0, "export_errors": 0}
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid() or self._stop.is_set():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="SpanExporter", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def on_start(self, span, parent_context=None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        with self._lock:
+            self._stats["queued"] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def _drain(self) -> List[ReadableSpan]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[ReadableSpan]) -> None:
+        errors = 0
+        for exporter in self.exporters:
+            try:
+                if exporter.export(batch) != SpanExportResult.SUCCESS:
+                    errors += 1
+            except Exception:
+                errors += 1
+        with self._lock:
+            self._stats["exported"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["export_errors"] += errors
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            with self._idle:
+                self._exporting = True
+            try:
+                while True:
+                    batch = self._drain()
+                    if not batch:
+                        break
+                    self._export(batch)
+            finally:
+                with self._idle:
+                    self._exporting = False
+                    self._idle.notify_all()
+            if self._stop.is_set():
+                return
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Export everything queued so far; return False on timeout."""
+        if self._pid != os.getpid():
+            # No worker in this process: export inline
+            batch = self._drain()
+            while batch:
+                self._export(batch)
+                batch = self._drain()
+            return True
+        deadline = timeout_millis / 1000
+        with self._idle:
+            self._wake.set()
+            return self._idle.wait_for(lambda: self._queue.empty() and not self._exporting, deadline)
+
+    def shutdown(self) -> None:
+        self.force_flush()
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(5)
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return export metrics.
+
+        Returns
+        -------
+        dict
+            ``queued``, ``dropped`` (queue full), ``exported``, ``batches``,
+            ``export_errors`` and ``pending`` (spans waiting now).
+        """
+        with self._lock:
+            return dict(self._stats, pending=self._queue.qsize())
+
+
+class TailSampler(SpanProcessor):
+    """
+    Decide per trace, once its local root span ends, whether to export it.
+
+    Traces with an error or a root slower than ``slow_seconds`` are always
+    kept; the rest are kept at ``ratio``, chosen by trace id so every span
+    of a trace gets the same decision. Spans of undecided traces are held
+    in memory, at most ``max_spans`` overall: beyond that the oldest trace
+    is decided early from what it has. Spans ending after their trace was
+    decided follow the decision.
+
+    Parameters
+    ----------
+    downstream : SpanProcessor
+        Receives the spans of kept traces (e.g. a :class:`SpanExportBuffer`).
+    ratio : float
+        Share of ordinary traces kept; 1 forwards every span at once.
+    slow_seconds : float
+        Root duration from which a trace is always kept.
+    max_spans : int
+        Most spans held for undecided traces.
+    """
+    def __init__(self, downstream: SpanProcessor, ratio: float = 1.0, slow_seconds: float = 5.0,
+                 max_spans: int = 4096, max_decisions: int = 10000):
+        self.downstream = downstream
+        self.ratio = ratio
+        self.slow_seconds = slow_seconds
+        self.max_spans = max_spans
+        self.max_decisions = max_decisions
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self._held = 0
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._stats = {"traces_kept": 0, "traces_dropped": 0, "spans_dropped": 0}
+
+    def on_start(self, span, parent_context=None) -> None:
+        pass
+
+    def _keep(self, trace_id: int, spans: List[ReadableSpan], root: Optional[ReadableSpan]) -> bool:
+        if any(span.status.status_code == StatusCode.ERROR for span in spans):
+            return True
+        if root is not None and root.end_time and root.start_time:
+            if (root.end_time - root.start_time) / 1e9 >= self.slow_seconds:
+                return True
+        return (trace_id % _TRACE_ID_LIMIT) < self.ratio * _TRACE_ID_LIMIT
+
+    def _decide(self, trace_id: int, spans: List[ReadableSpan], root: Optional[ReadableSpan]) -> List[ReadableSpan]:
+        # Called with the lock held; returns the spans to forward.
+        keep = self._keep(trace_id, spans, root)
+        self._decided[trace_id] = keep
+        if len(self._decided) > self.max_decisions:
+            self._decided.popitem(last=False)
+        self._stats["traces_kept" if keep else "traces_dropped"] += 1
+        if not keep:
+            self._stats["spans_dropped"] += len(spans)
+        return spans if keep else []
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if self.ratio >= 1.0:
+            self.downstream.on_end(span)
+            return
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+        forward: List[ReadableSpan] = []
+        with self._lock:
+            decision = self._decided.get(trace_id)
+            if decision is not None:
+                if decision:
+                    forward = [span]
+                else:
+                    self._stats["spans_dropped"] += 1
+            else:
+                spans = self._pending.setdefault(trace_id, [])
+                spans.append(span)
+                self._held += 1
+                if is_root:
+                    self._held -= len(spans)
+                    forward = self._decide(trace_id, self._pending.pop(trace_id), span)
+                while self._held > self.max_spans and self._pending:
+                    oldest, spans = self._pending.popitem(last=False)
+                    self._held -= len(spans)
+                    forward += self._decide(oldest, spans, None)
+        for kept in forward:
+            self.downstream.on_end(kept)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.downstream.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self.downstream.shutdown()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return sampling metrics.
+
+        Returns
+        -------
+        dict
+            ``traces_kept``, ``traces_dropped``, ``spans_dropped`` and
+            ``pending_spans`` (held for undecided traces).
+        """
+        with self._lock:
+            return dict(self._stats, pending_spans=self._held)
+
+
+def build_exporters(names: Sequence[str], file_path: str = "traces.jsonl") -> List[SpanExporter]:
+    """
+    Create span exporters by name.
+
+    Parameters
+    ----------
+    names : Sequence[str]
+        ``monocle`` (monocle's exporters, chosen by ``MONOCLE_EXPORTER``),
+        ``otlp-file`` (see :class:`OTLPFileSpanExporter`), ``memory``
+        (an ``InMemorySpanExporter``, for tests) or ``console``.
+    file_path : str
+        Output file of the ``otlp-file`` exporter.
+
+    Raises
+    ------
+    ValueError
+        For an unknown exporter name.
+    """
+    exporters: List[SpanExporter] = []
+    for name in names:
+        if name == "monocle":
+            from monocle_apptrace.exporters.monocle_exporters import get_monocle_exporter
+            exporters.extend(get_monocle_exporter())
+        elif name == "otlp-file":
+            exporters.append(OTLPFileSpanExporter(file_path))
+        elif name == "memory":
+            from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+            exporters.append(InMemorySpanExporter())
+        elif name == "console":
+            from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+            exporters.append(ConsoleSpanExporter())
+        else:
+            raise ValueError(f"Unknown trace exporter: {name}")
+    return exporters
 
-from opentelemetry import trace, metrics
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.trace.export import ConsoleSpanExporter, BatchSpanProcessor
-from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
 
 def init_telemetry():
     """
-    Initialize OpenTelemetry for distributed tracing and metrics.
-    
+    Initialize telemetry for this process (kept for older entry points).
+
+    Delegates to :func:`observability.init_telemetry`, the single setup.
+
     Returns:
         tuple: (tracer, meter) for creating spans and recording metrics
     """
-    # Set up tracing
-    trace_provider = TracerProvider()
-    trace_provider.add_span_processor(
-        BatchSpanProcessor(ConsoleSpanExporter())
-    )
-    trace.set_tracer_provider(trace_provider)
-    tracer = trace.get_tracer(__name__)
-    
-    # Set up metrics
-    metric_reader = PeriodicExportingMetricReader(ConsoleMetricExporter())
-    meter_provider = MeterProvider(metric_readers=[metric_reader])
-    metrics.set_meter_provider(meter_provider)
-    meter = metrics.get_meter(__name__)
-    
-    return tracer, meter
+    from opentelemetry import metrics
+    from observability import init_telemetry as init_process_telemetry
+    init_process_telemetry("multiagent-orchestrator")
+    return trace.get_tracer(__name__), metrics.get_meter(__name__)
@@ -0,0 +1,383 @@
+import atexit
+import json
+import os
+import threading
+import weakref
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from utils.failure_classifier import tokenize
+
+FORMAT_VERSION = 1
+
+# Indexes with a path, saved at exit without being kept alive until then
+_persistent: "weakref.WeakSet[VectorIndex]" = weakref.WeakSet()
+
+
+@atexit.register
+def _save_all() -> None:
+    for index in list(_persistent):
+        if index._pending:
+            index.save()
+
+
+@lru_cache(maxsize=65536)
+def _bucket(token: str, dim: int):
+    # crc32 is stable across processes, unlike hash(); one bit picks the sign
+    # so colliding tokens cancel out on average instead of adding up.
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+class HashingVectorizer:
+    """
+    Map failure text to fixed-size, L2-normalized vectors without a fitted vocabulary.
+
+    Tokens (see :func:`utils.failure_classifier.tokenize`) are hashed into
+    ``dim`` signed buckets with sublinear term frequency, so any text can
+    be embedded locally and vectors from different processes are comparable.
+
+    Parameters
+    ----------
+    dim : int
+        Vector size.
+    """
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """Return ``(len(texts), dim)`` float32 unit vectors (zero for empty text)."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[int, float] = {}
+            for token in tokenize(text):
+                index, sign = _bucket(token, self.dim)
+                counts[index] = counts.get(index, 0.0) + sign
+            if counts:
+                vectors[row, list(counts)] = list(counts.values())
+        np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """
+    Nearest-neighbour index of past failures and their root-cause analyses.
+
+    Each entry is keyed by failure signature and holds the embedded failure
+    text, a short excerpt of it and the latest analysis; adding a known
+    signature replaces its entry. Search is exact by default: one
+    matrix-vector product over all entries and a partial sort. After
+    :meth:`partition`, searches given ``nprobe`` only score entries in the
+    ``nprobe`` clusters nearest the query (an inverted-file index), plus
+    entries added since.
+
+    Parameters
+    ----------
+    dim : int
+        Embedding size (see :class:`HashingVectorizer`).
+    path : str, optional
+        ``.npz`` file to load on start-up and save to; ``None`` keeps the
+        index in memory only. Several processes may share the file: each
+        save merges in the entries the others saved since (see :meth:`save`).
+    autosave_every : int
+        Save after this many additions (and at interpreter exit).
+    """
+    def __init__(self, dim: int = 256, path: Optional[str] = None, autosave_every: int = 100):
+        self.vectorizer = HashingVectorizer(dim)
+        self.path = path
+        self.autosave_every = autosave_every
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._signatures: List[str] = []
+        self._texts: List[str] = []
+        self._analyses: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._partitioned = 0
+        # Signatures added or replaced here since the last save
+        self._pending: set = set()
+        if path:
+            if os.path.exists(path):
+                self.load(path)
+            _persistent.add(self)
+
+    @property
+    def dim(self) -> int:
+        return self.vectorizer.dim
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self._vectors):
+            grown = np.zeros((max(size, 2 * len(self._vectors), 64), self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+    def add(self, signature: str, text: str, analysis: str) -> None:
+        """
+        Store (or replace) the analysis of a failure.
+
+        Parameters
+        ----------
+        signature : str
+            Failure signature (see :func:`utils.fingerprint.failure_signature`).
+        text : str
+            Failure text (see :func:`utils.failure_classifier.failure_text`).
+        analysis : str
+            Root-cause analysis to offer for similar failures.
+        """
+        self.add_vectors([signature], self.vectorizer.transform([text]), [text], [analysis])
+
+    def add_vectors(
+        self,
+        signatures: Sequence[str],
+        vectors: np.ndarray,
+        texts: Sequence[str],
+        analyses: Sequence[str],
+    ) -> None:
+        """Bulk variant of :meth:`add` for already embedded failures."""
+        with self._lock:
+            for signature, vector, text, analysis in zip(signatures, vectors, texts, analyses):
+                row = self._rows.get(signature)
+                if row is None:
+                    row = self._rows[signature] = self._size
+                    self._reserve(row + 1)
+                    self._size += 1
+                    self._signatures.append(signature)
+                    self._texts.append(text[:400])
+                    self._analyses.append(analysis)
+                else:
+                    self._texts[row] = text[:400]
+                    self._analyses[row] = analysis
+                self._vectors[row] = vector
+                self._pending.add(signature)
+            save = self.path and len(self._pending) >= self.autosave_every
+        if save:
+            self.save()
+
+    def search(self, text: str, k: int = 3, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return the ``k`` entries most similar to ``text``, best first.
+
+        Parameters
+        ----------
+        text : str
+            Failure text.
+        k : int
+            Neighbours to return.
+        nprobe : int, optional
+            Clusters to scan if the index is partitioned; exact search
+            otherwise.
+
+        Returns
+        -------
+        list of dict
+            ``signature``, ``similarity`` (cosine, -1 to 1), ``text`` and
+            ``analysis`` per neighbour.
+        """
+        return self.search_vector(self.vectorizer.transform([text])[0], k, nprobe)
+
+    def search_vector(self, query: np.ndarray, k: int = 3, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """:meth:`search` for an already embedded query."""
+        with self._lock:
+            # Rows are only ever appended or overwritten in place, so views
+            # taken here stay valid while the lock is released.
+            vectors = self._vectors[:self._size]
+            centroids, order, offsets, partitioned = self._centroids, self._order, self._offsets, self._partitioned
+        if not len(vectors) or k <= 0 or not query.any():
+            return []
+        if nprobe and centroids is not None:
+            nearest = np.argsort(centroids @ query)[::-1][:nprobe]
+            rows = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in nearest]
+                                  + [np.arange(partitioned, len(vectors))])
+            scores = vectors[rows] @ query
+        else:
+            rows = None
+            scores = vectors @ query
+        k = min(k, len(scores))
+        if not k:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        best_rows = rows[best] if rows is not None else best
+        with self._lock:
+            return [
+                {
+                    "signature": self._signatures[row],
+                    "similarity": round(float(scores[i]), 4),
+                    "text": self._texts[row],
+                    "analysis": self._analyses[row],
+                }
+                for i, row in zip(best.tolist(), best_rows.tolist())
+            ]
+
+    def partition(self, n_lists: Optional[int] = None, iterations: int = 8, sample: int = 100_000, seed: int = 0) -> None:
+        """
+        Cluster the entries (spherical k-means) for approximate search.
+
+        Entries added later are scanned exactly until the next call.
+
+        Parameters
+        ----------
+        n_lists : int, optional
+            Number of clusters (default: about the square root of the size).
+        iterations : int
+            k-means iterations over the sample.
+        sample : int
+            Entries used to fit the centroids.
+        seed : int
+            Random seed for the sample and initial centroids.
+        """
+        with self._lock:
+            vectors = self._vectors[:self._size]
+        n_lists = min(n_lists or max(int(len(vectors) ** 0.5), 1), len(vectors))
+        if not n_lists:
+            return
+        rng = np.random.default_rng(seed)
+        fit = vectors[rng.choice(len(vectors), min(sample, len(vectors)), replace=False)]
+        centroids = fit[rng.choice(len(fit), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(fit @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, fit)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), 65536)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        with self._lock:
+            self._centroids, self._order, self._offsets = centroids, order, offsets
+            self._partitioned = len(vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return ``entries``, ``dim`` and ``partitions`` (0 when search is exact)."""
+        with self._lock:
+            return {
+                "entries": self._size,
+                "dim": self.dim,
+                "partitions": 0 if self._centroids is None else len(self._centroids),
+            }
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Write the index to ``path`` (default: the configured path) atomically.
+
+        Saving to the configured path first merges in what other processes
+        saved there: entries this index does not know are appended and
+        entries it has not changed since its last save are refreshed, so
+        concurrent workers add to the file instead of overwriting each
+        other. An exclusive ``fcntl`` lock (where available) on
+        ``<path>.lock`` serializes the read-merge-write across processes.
+        """
+        path = path or self.path
+        if not path:
+            return
+        with _locked(path):
+            if path == self.path and os.path.exists(path):
+                self._merge(*_read(path, self.dim)[:2])
+            with self._lock:
+                metadata = {
+                    "format_version": FORMAT_VERSION,
+                    "signatures": list(self._signatures),
+                    "texts": list(self._texts),
+                    "analyses": list(self._analyses),
+                    "partitioned": self._partitioned,
+                }
+                arrays = {"vectors": self._vectors[:self._size].copy()}
+                if self._centroids is not None:
+                    arrays.update(centroids=self._centroids, order=self._order, offsets=self._offsets)
+                self._pending.clear()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, metadata=np.frombuffer(json.dumps(metadata).encode("utf-8"), dtype=np.uint8), **arrays)
+            os.replace(tmp_path, path)
+
+    def _merge(self, metadata: Dict[str, Any], vectors: np.ndarray) -> None:
+        """Take in saved entries, except those changed here since the last save."""
+        with self._lock:
+            for signature, vector, text, analysis in zip(
+                metadata["signatures"], vectors, metadata["texts"], metadata["analyses"]
+            ):
+                if signature in self._pending:
+                    continue
+                row = self._rows.get(signature)
+                if row is None:
+                    # Appended past the partitioned rows, so found by exact scan
+                    row = self._rows[signature] = self._size
+                    self._reserve(row + 1)
+                    self._size += 1
+                    self._signatures.append(signature)
+                    self._texts.append(text)
+                    self._analyses.append(analysis)
+                else:
+                    self._texts[row] = text
+                    self._analyses[row] = analysis
+                self._vectors[row] = vector
+
+    def load(self, path: str) -> None:
+        """Replace the index contents with those saved at ``path``."""
+        metadata, vectors, partitions = _read(path, self.dim)
+        with self._lock:
+            self._vectors = np.array(vectors, dtype=np.float32)
+            self._size = len(vectors)
+            self._signatures = metadata["signatures"]
+            self._texts = metadata["texts"]
+            self._analyses = metadata["analyses"]
+            self._rows = {signature: row for row, signature in enumerate(self._signatures)}
+            self._centroids, self._order, self._offsets = partitions
+            self._partitioned = metadata["partitioned"] if partitions[0] is not None else 0
+            self._pending.clear()
+
+
+def _read(path: str, dim: int):
+    """Return (metadata, vectors, (centroids, order, offsets)) saved at ``path``."""
+    with np.load(path, allow_pickle=False) as data:
+        metadata = json.loads(data["metadata"].tobytes().decode("utf-8"))
+        if metadata.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format: {metadata.get('format_version')}")
+        vectors = data["vectors"]
+        if vectors.shape[1] != dim:
+            raise ValueError(f"Vector index {path} has dimension {vectors.shape[1]}, expected {dim}")
+        partitions = (data["centroids"], data["order"], data["offsets"]) if "centroids" in data else (None,) * 3
+    return metadata, vectors, partitions
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on ``<path>.lock`` across processes (where ``fcntl`` exists)."""
+    # Closing the file releases the lock
+    with open(path + ".lock", "w") as handle:
+        try:
+            import fcntl
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        yield
+
+
+def load_incident_index() -> VectorIndex:
+    """
+    Create a :class:`VectorIndex` from configuration.
+
+    Persistence is enabled when ``RCA_INDEX_PATH`` is set. If that file
+    cannot be loaded the index runs in memory only, leaving the file as is.
+    """
+    from utils.config import RCA_INDEX_DIM, RCA_INDEX_PATH, logger
+    try:
+        return VectorIndex(RCA_INDEX_DIM, RCA_INDEX_PATH or None)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not load vector index {RCA_INDEX_PATH}: {e}")
+        return VectorIndex(RCA_INDEX_DIM)